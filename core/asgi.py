@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Rotas das TVs com as views assíncronas (painel/views_api_async.py)
+os.environ.setdefault('PAINEL_API_ASYNC', 'True')
 
 application = get_asgi_application()
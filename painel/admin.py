@@ -1,11 +1,14 @@
-import pandas as pd
 from django.contrib import admin
 from django.urls import path, reverse
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib import messages
 from django.utils.html import format_html
-from .models import FamiliaProduto, Produto, VideoTemplate, Dispositivo, VideoPropaganda
+from .models import FamiliaProduto, Produto, VideoTemplate, Dispositivo, VideoPropaganda, ImportacaoPlanilha
 from .forms import ImportarProdutosForm
+from .cache import etags_em_cache
+from .payload import FORMATO_COLUNAR
+from .tarefas import enfileirar, progresso_gravacao, recuperar_importacoes_travadas, recuperar_videos_travados
+from .telemetria import online
 
 # --- ADMIN DE PRODUTOS (COM IMPORTAÇÃO EXCEL E ORDENAÇÃO) ---
 @admin.register(Produto)
@@ -26,11 +29,12 @@ class ProdutoAdmin(admin.ModelAdmin):
         return f"R$ {obj.preco}".replace('.', ',')
     preco_formatado.short_description = 'Preço'
 
-    # --- Lógica de Importação Excel (Mantida) ---
+    # --- Lógica de Importação Excel (em segundo plano, ver painel/tarefas.py) ---
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
             path('importar-excel/', self.admin_site.admin_view(self.importar_excel_view), name='importar_produtos_excel'),
+            path('importar-excel/<int:importacao_id>/', self.admin_site.admin_view(self.importacao_view), name='importacao_planilha_status'),
         ]
         return custom_urls + urls
 
@@ -38,13 +42,13 @@ class ProdutoAdmin(admin.ModelAdmin):
         if request.method == "POST":
             form = ImportarProdutosForm(request.POST, request.FILES)
             if form.is_valid():
-                arquivo = request.FILES['arquivo_excel']
-                try:
-                    self.processar_arquivo(arquivo)
-                    self.message_user(request, "Importação concluída com sucesso!", level=messages.SUCCESS)
-                    return redirect('..')
-                except Exception as e:
-                    self.message_user(request, f"Erro ao processar arquivo: {str(e)}", level=messages.ERROR)
+                # Só registra o arquivo: a leitura e a gravação rodam fora do request
+                importacao = ImportacaoPlanilha.objects.create(
+                    arquivo=request.FILES['arquivo_excel'],
+                    criado_por=request.user
+                )
+                enfileirar(importacao)
+                return redirect('admin:importacao_planilha_status', importacao.pk)
         else:
             form = ImportarProdutosForm()
 
@@ -55,66 +59,59 @@ class ProdutoAdmin(admin.ModelAdmin):
         }
         return render(request, 'admin/importar_excel.html', context)
 
-    def processar_arquivo(self, arquivo):
-        df = pd.read_excel(arquivo)
-        df.columns = [str(c).strip().upper() for c in df.columns]
-
-        col_codigo = 'CÓDIGO DO PRODUTO'
-        col_descricao = 'DESCRIÇÃO DO PRODUTO'
-        col_preco = 'PREÇO UNITÁRIO DE VENDA'
-        col_familia = 'FAMÍLIA DE PRODUTO'
-        
-        colunas_esperadas = [col_codigo, col_descricao, col_preco, col_familia]
-        
-        for col in colunas_esperadas:
-            if col not in df.columns:
-                colunas_encontradas = ", ".join(df.columns)
-                raise ValueError(f"A coluna '{col}' não foi encontrada. Colunas lidas: {colunas_encontradas}")
-
-        produtos_atualizados = 0
-        produtos_criados = 0
-
-        for index, row in df.iterrows():
-            codigo = str(row[col_codigo]).strip()
-            descricao = str(row[col_descricao]).strip()
-            familia_nome = str(row[col_familia]).strip().upper()
-            
-            valor_raw = row[col_preco]
-            if pd.isna(valor_raw): continue
-
-            if isinstance(valor_raw, str):
-                valor_raw = valor_raw.replace('R$', '').replace(' ', '').replace('.', '').replace(',', '.').strip()
-            
-            try:
-                preco = float(valor_raw)
-            except ValueError:
-                continue
-
-            familia_obj, _ = FamiliaProduto.objects.get_or_create(nome=familia_nome)
-
-            obj, created = Produto.objects.update_or_create(
-                codigo=codigo,
-                defaults={
-                    'descricao': descricao,
-                    'preco': preco,
-                    'familia': familia_obj
-                }
-            )
-            
-            if created: produtos_criados += 1
-            else: produtos_atualizados += 1
-                
-        return True
+    def importacao_view(self, request, importacao_id):
+        """Acompanhamento da importação: progresso, prévia, erros e confirmação."""
+        importacao = get_object_or_404(ImportacaoPlanilha, pk=importacao_id)
+
+        if request.method == "POST":
+            novo_status = ImportacaoPlanilha.CONFIRMADA if 'confirmar' in request.POST else ImportacaoPlanilha.CANCELADA
+            alterou = ImportacaoPlanilha.objects.filter(
+                pk=importacao.pk, status=ImportacaoPlanilha.AGUARDANDO_CONFIRMACAO
+            ).update(status=novo_status)
+
+            if not alterou:
+                self.message_user(request, "Esta importação não está mais aguardando confirmação.", level=messages.WARNING)
+            elif novo_status == ImportacaoPlanilha.CONFIRMADA:
+                enfileirar(importacao)
+                self.message_user(request, "Importação confirmada. As alterações estão sendo gravadas.", level=messages.SUCCESS)
+            else:
+                self.message_user(request, "Importação cancelada.", level=messages.INFO)
+            return redirect('admin:importacao_planilha_status', importacao.pk)
+
+        # Esta página se atualiza sozinha: quem acompanha uma importação que
+        # travou (processo reiniciado) a vê voltar para a fila
+        if importacao.em_andamento and recuperar_importacoes_travadas():
+            importacao.refresh_from_db()
+        if importacao.status == ImportacaoPlanilha.GRAVANDO:
+            importacao.linhas_processadas = progresso_gravacao(importacao) or importacao.linhas_processadas
+
+        context = {
+            'opts': self.model._meta,
+            'title': f'Importação #{importacao.pk}',
+            'importacao': importacao,
+            'previa': importacao.previa,
+            'resumo': importacao.previa.get('resumo', {}),
+        }
+        return render(request, 'admin/importacao_status.html', context)
 
 # --- ADMIN DE FAMÍLIAS ---
 @admin.register(FamiliaProduto)
 class FamiliaProdutoAdmin(admin.ModelAdmin):
     list_display = ('nome',)
 
+class VideoProcessadoAdmin(admin.ModelAdmin):
+    readonly_fields = ('status_processamento', 'erro_processamento')
+
+    def changelist_view(self, request, extra_context=None):
+        # Quem confere a lista vê os vídeos travados (processo reiniciado
+        # no meio do ffmpeg) voltarem para a fila
+        recuperar_videos_travados()
+        return super().changelist_view(request, extra_context)
+
 # --- ADMIN DE TEMPLATES ---
 @admin.register(VideoTemplate)
-class VideoTemplateAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'duracao', 'botao_editor')
+class VideoTemplateAdmin(VideoProcessadoAdmin):
+    list_display = ('nome', 'duracao', 'status_processamento', 'botao_editor')
     
     def botao_editor(self, obj):
         url = reverse('editor_visual', args=[obj.id])
@@ -126,8 +123,8 @@ class VideoTemplateAdmin(admin.ModelAdmin):
 
 # --- ADMIN DE PROPAGANDAS (Onde deu o erro) ---
 @admin.register(VideoPropaganda)
-class VideoPropagandaAdmin(admin.ModelAdmin):
-    list_display = ('ordem', 'descricao', 'duracao', 'ativo')
+class VideoPropagandaAdmin(VideoProcessadoAdmin):
+    list_display = ('ordem', 'descricao', 'duracao', 'ativo', 'status_processamento')
     
     # CORREÇÃO: Definimos 'descricao' como o link para editar
     list_display_links = ('descricao',)
@@ -139,5 +136,58 @@ class VideoPropagandaAdmin(admin.ModelAdmin):
 class DispositivoAdmin(admin.ModelAdmin):
     list_display = ('nome', 'codigo_acesso', 'uuid', 'modo_exibicao', 'orientacao')
     readonly_fields = ('uuid', 'codigo_acesso')
-    fields = ('nome', 'codigo_acesso', 'uuid', 'modo_exibicao', 'orientacao', 'exibir_apenas_familias', 'exibir_propagandas')
-    filter_horizontal = ('exibir_apenas_familias', 'exibir_propagandas') # Facilita seleção de muitos itens
\ No newline at end of file
+    fields = ('nome', 'codigo_acesso', 'uuid', 'modo_exibicao', 'orientacao', 'itens_por_pagina', 'exibir_apenas_familias', 'exibir_propagandas')
+    filter_horizontal = ('exibir_apenas_familias', 'exibir_propagandas') # Facilita seleção de muitos itens
+
+    # --- Situação da frota (heartbeats, ver painel/telemetria.py) ---
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path('frota/', self.admin_site.admin_view(self.frota_view), name='painel_frota'),
+        ]
+        return custom_urls + urls
+
+    def frota_view(self, request):
+        """Uma linha por TV: online, versão na tela, o que está exibindo e erros de vídeo."""
+        dispositivos = list(Dispositivo.objects.select_related('status').order_by('nome'))
+        # A TV usa o formato colunar: a versão dela é o ETag desse payload.
+        # Só o que está no cache (None = sem versão para comparar): a página
+        # não monta payloads
+        etags = etags_em_cache([dispositivo.uuid for dispositivo in dispositivos], FORMATO_COLUNAR)
+        linhas = []
+        for dispositivo in dispositivos:
+            status = getattr(dispositivo, 'status', None)
+            etag = etags[dispositivo.uuid]
+            linhas.append({
+                'dispositivo': dispositivo,
+                'status': status,
+                'online': online(status),
+                'em_dia': None if etag is None else bool(status and status.versao_payload == etag),
+            })
+
+        context = {
+            'opts': self.model._meta,
+            'title': 'Situação das TVs',
+            'linhas': linhas,
+            'total_online': sum(linha['online'] for linha in linhas),
+            'total_desatualizadas': sum(linha['online'] and linha['em_dia'] is False for linha in linhas),
+            'total_com_erros': sum(bool(linha['status'] and linha['status'].erros_video) for linha in linhas),
+        }
+        return render(request, 'admin/frota_status.html', context)
+
+# --- ADMIN DE IMPORTAÇÕES (histórico; o upload é feito pela lista de produtos) ---
+@admin.register(ImportacaoPlanilha)
+class ImportacaoPlanilhaAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'linhas_lidas', 'linhas_com_erro', 'criado_por', 'created_at', 'botao_acompanhar')
+    list_filter = ('status',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def botao_acompanhar(self, obj):
+        url = reverse('admin:importacao_planilha_status', args=[obj.pk])
+        return format_html('<a class="button" href="{}">Acompanhar</a>', url)
+    botao_acompanhar.short_description = 'Detalhes'
@@ -0,0 +1,359 @@
+"""
+Cache do payload da TV.
+
+O payload é montado e guardado por configuração, não por TV: TVs com a mesma
+impressão (modo, orientação, itens por página, famílias e propagandas, ver
+payload.impressao_config) usam o mesmo JSON renderizado e as mesmas versões
+comprimidas. Só nome e uuid são de cada TV: ficam no fim do objeto "config"
+e são emendados na resposta (montar_resposta), inclusive nos corpos gzip e
+brotli, sem comprimir o payload de novo.
+
+Cada TV tem uma entrada pequena com a impressão e o trecho dela. A invalidação
+é feita por "gerações": uma global (tudo), uma por dispositivo (configuração
+da TV, ou seja, a entrada pequena) e uma por impressão (conteúdo exibido
+pelas TVs com aquela configuração). As entradas carregam as gerações com que
+foram montadas; se alguma mudou, a entrada é descartada e remontada. Assim
+uma consulta da TV vira dois get_many.
+"""
+import hashlib
+import struct
+import uuid
+import zlib
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import Signal
+from rest_framework.renderers import JSONRenderer
+
+from .metricas import registrar_cache
+from .models import Dispositivo
+from .payload import CAMPOS_DISPOSITIVO, FORMATO_COMPLETO, impressao_config, montar_payload_formato
+from .serializers import DispositivoConfigSerializer
+
+try:
+    import brotli
+except ImportError:  # Opcional: sem ele o payload vai só em gzip
+    brotli = None
+
+CHAVE_GERACAO_GLOBAL = 'painel:geracao'
+
+# Resposta de uma TV.
+# conteudo: JSON já renderizado (bytes); etag: hash do conteúdo (versão do payload);
+# estrutura: hash de tudo menos a lista de produtos (usado pelo delta, ver painel/delta.py);
+# comprimidos: {'br'|'gzip': bytes}
+PayloadCache = namedtuple('PayloadCache', ['conteudo', 'etag', 'estrutura', 'comprimidos'])
+
+# Parte comum às TVs com a mesma configuração.
+# prefixo: JSON renderizado sem os campos da TV e sem o '}}' final;
+# crc: CRC-32 do prefixo (para o trailer do gzip);
+# comprimidos: prefixo comprimido uma vez, terminado num ponto em que dá para emendar
+PayloadCompartilhado = namedtuple('PayloadCompartilhado', ['prefixo', 'etag', 'estrutura', 'crc', 'comprimidos'])
+
+# Enviado depois do commit de cada invalidação, com uuids = TVs afetadas
+# (None = todas). Usado pela publicação estática (ver painel/publicacao.py).
+payload_alterado = Signal()
+
+# Abaixo disso não compensa comprimir
+TAMANHO_MINIMO_COMPRESSAO = 1024
+
+# Cabeçalho gzip fixo: sem nome de arquivo, mtime 0, sistema desconhecido
+CABECALHO_GZIP = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+
+def chave_geracao_dispositivo(device_uuid):
+    return f'painel:geracao:{device_uuid}'
+
+
+def chave_geracao_config(impressao):
+    return f'painel:geracao:cfg:{impressao}'
+
+
+def chave_dispositivo(device_uuid):
+    return f'painel:dispositivo:{device_uuid}'
+
+
+def chave_payload(impressao, formato=FORMATO_COMPLETO):
+    # v3: payload compartilhado por impressão da configuração (entradas antigas são ignoradas)
+    return f'painel:payload:v3:{impressao}:{formato}'
+
+
+def _tempo_cache():
+    return getattr(settings, 'PAINEL_CACHE_TIMEOUT', 3600)
+
+
+def _nova_geracao():
+    return uuid.uuid4().hex
+
+
+def _ler_geracoes(chaves):
+    """
+    Lê (ou inicializa, se o cache perdeu a chave) as gerações informadas.
+    """
+    valores = cache.get_many(chaves)
+    for chave in chaves:
+        if chave not in valores:
+            cache.add(chave, _nova_geracao(), None)
+    if len(valores) < len(chaves):
+        valores = cache.get_many(chaves)
+    return tuple(valores.get(chave) for chave in chaves)
+
+
+def _entrada_valida(valores, chave, chaves_geracao):
+    entrada = valores.get(chave)
+    geracao = tuple(valores.get(c) for c in chaves_geracao)
+    if entrada is not None and None not in geracao and entrada['geracao'] == geracao:
+        return entrada
+    return None
+
+
+def _carregar_dispositivo(device_uuid):
+    return (
+        Dispositivo.objects.filter(uuid=device_uuid)
+        .prefetch_related('exibir_apenas_familias', 'exibir_propagandas')
+        .first()
+    )
+
+
+def obter_payload(device_uuid, formato=FORMATO_COMPLETO):
+    """
+    Retorna o PayloadCache do painel do dispositivo no formato pedido, montando
+    e guardando no cache o que faltar. Retorna None se o dispositivo não existe.
+    """
+    partes = obter_partes(device_uuid, formato)
+    return montar_resposta(*partes) if partes else None
+
+
+async def aobter_payload(device_uuid, formato=FORMATO_COMPLETO):
+    """
+    obter_payload para as views assíncronas (views_api_async). Com tudo no
+    cache são só dois aget_many; faltando algo, monta com obter_payload numa
+    thread, como qualquer acesso ao ORM a partir do ASGI.
+    """
+    chaves_geracao = [CHAVE_GERACAO_GLOBAL, chave_geracao_dispositivo(device_uuid)]
+    chave = chave_dispositivo(device_uuid)
+    entrada = _entrada_valida(await cache.aget_many([*chaves_geracao, chave]), chave, chaves_geracao)
+    if entrada is not None:
+        chaves_geracao = [CHAVE_GERACAO_GLOBAL, chave_geracao_config(entrada['impressao'])]
+        chave = chave_payload(entrada['impressao'], formato)
+        compartilhado = _entrada_valida(await cache.aget_many([*chaves_geracao, chave]), chave, chaves_geracao)
+        if compartilhado is not None:
+            registrar_cache(acerto=True)
+            return montar_resposta(compartilhado['payload'], entrada['trecho'])
+    return await sync_to_async(obter_payload)(device_uuid, formato)
+
+
+def etags_em_cache(uuids, formato=FORMATO_COMPLETO):
+    """
+    {uuid: ETag do payload} só com o que já está no cache (None para as TVs
+    sem entrada válida), sem montar nada. Para acompanhamento, como a frota
+    no admin: duas leituras do cache para todas as TVs.
+    """
+    entradas = {}
+    chaves = {CHAVE_GERACAO_GLOBAL}
+    for device_uuid in uuids:
+        chaves.update((chave_geracao_dispositivo(device_uuid), chave_dispositivo(device_uuid)))
+    valores = cache.get_many(list(chaves))
+    for device_uuid in uuids:
+        chaves_geracao = [CHAVE_GERACAO_GLOBAL, chave_geracao_dispositivo(device_uuid)]
+        entradas[device_uuid] = _entrada_valida(valores, chave_dispositivo(device_uuid), chaves_geracao)
+
+    chaves = {CHAVE_GERACAO_GLOBAL}
+    for entrada in filter(None, entradas.values()):
+        chaves.update((chave_geracao_config(entrada['impressao']), chave_payload(entrada['impressao'], formato)))
+    valores = cache.get_many(list(chaves))
+
+    etags = {}
+    for device_uuid, entrada in entradas.items():
+        compartilhado = None
+        if entrada is not None:
+            chaves_geracao = [CHAVE_GERACAO_GLOBAL, chave_geracao_config(entrada['impressao'])]
+            compartilhado = _entrada_valida(valores, chave_payload(entrada['impressao'], formato), chaves_geracao)
+        etags[device_uuid] = compartilhado and etag_resposta(compartilhado['payload'], entrada['trecho'])
+    return etags
+
+
+def obter_partes(device_uuid, formato=FORMATO_COMPLETO):
+    """(PayloadCompartilhado, trecho da TV) ou None se o dispositivo não existe."""
+    chaves_geracao = [CHAVE_GERACAO_GLOBAL, chave_geracao_dispositivo(device_uuid)]
+    chave = chave_dispositivo(device_uuid)
+    entrada = _entrada_valida(cache.get_many([*chaves_geracao, chave]), chave, chaves_geracao)
+
+    dispositivo = None
+    if entrada is None:
+        # Lemos a geração ANTES de consultar o banco: se algo mudar nesse
+        # meio-tempo, a entrada já nasce velha e será refeita na próxima consulta.
+        geracao = _ler_geracoes(chaves_geracao)
+        dispositivo = _carregar_dispositivo(device_uuid)
+        if dispositivo is None:
+            return None
+        entrada = {
+            'geracao': geracao,
+            'impressao': impressao_config(dispositivo),
+            'trecho': trecho_dispositivo(dispositivo),
+        }
+        cache.set(chave, entrada, _tempo_cache())
+
+    compartilhado = _obter_compartilhado(entrada['impressao'], formato, device_uuid, dispositivo)
+    if compartilhado is None:
+        return None
+    return compartilhado, entrada['trecho']
+
+
+def _obter_compartilhado(impressao, formato, device_uuid, dispositivo=None):
+    chaves_geracao = [CHAVE_GERACAO_GLOBAL, chave_geracao_config(impressao)]
+    chave = chave_payload(impressao, formato)
+    entrada = _entrada_valida(cache.get_many([*chaves_geracao, chave]), chave, chaves_geracao)
+    if entrada is not None:
+        registrar_cache(acerto=True)
+        return entrada['payload']
+    registrar_cache(acerto=False)
+
+    geracao = _ler_geracoes(chaves_geracao)
+    if dispositivo is None:
+        dispositivo = _carregar_dispositivo(device_uuid)
+        if dispositivo is None:
+            return None
+
+    payload = montar_compartilhado(dispositivo, formato)
+    # Só guarda se a TV ainda tem a configuração da impressão: ela pode ter
+    # mudado depois que a entrada pequena foi lida do cache
+    if impressao_config(dispositivo) == impressao:
+        cache.set(chave, {'geracao': geracao, 'payload': payload}, _tempo_cache())
+    return payload
+
+
+# --- MONTAGEM ---
+
+def montar_compartilhado(dispositivo, formato=FORMATO_COMPLETO):
+    """Payload da configuração do dispositivo, sem os campos que são só dele."""
+    dados = montar_payload_formato(dispositivo, formato)
+    config = {campo: valor for campo, valor in dados['config'].items() if campo not in CAMPOS_DISPOSITIVO}
+    # "config" por último: o trecho de cada TV fecha o objeto (ver trecho_dispositivo)
+    dados = {**{chave: valor for chave, valor in dados.items() if chave != 'config'}, 'config': config}
+
+    renderer = JSONRenderer()
+    prefixo = renderer.render(dados)[:-2]
+    estrutura = renderer.render({chave: valor for chave, valor in dados.items() if chave != 'produtos'})
+    return PayloadCompartilhado(
+        prefixo, hashlib.sha1(prefixo).hexdigest(), hashlib.sha1(estrutura).hexdigest(),
+        zlib.crc32(prefixo), comprimir(prefixo),
+    )
+
+
+def trecho_dispositivo(dispositivo):
+    """',"nome":...,"uuid":...}}': os campos da TV, fechando o prefixo compartilhado."""
+    config = DispositivoConfigSerializer(dispositivo).data
+    renderizado = JSONRenderer().render({campo: config[campo] for campo in CAMPOS_DISPOSITIVO})
+    return b',' + renderizado[1:] + b'}'
+
+
+def montar_resposta(compartilhado, trecho):
+    """PayloadCache de uma TV: prefixo compartilhado + trecho dela (também nos comprimidos)."""
+    comprimidos = {}
+    if 'gzip' in compartilhado.comprimidos:
+        comprimidos['gzip'] = _emendar_gzip(compartilhado, trecho)
+    if 'br' in compartilhado.comprimidos and len(trecho) <= 1 << 16:
+        comprimidos['br'] = _emendar_brotli(compartilhado.comprimidos['br'], trecho)
+
+    return PayloadCache(
+        compartilhado.prefixo + trecho, etag_resposta(compartilhado, trecho), compartilhado.estrutura, comprimidos,
+    )
+
+
+def etag_resposta(compartilhado, trecho):
+    return hashlib.sha1(compartilhado.etag.encode() + trecho).hexdigest()
+
+
+def comprimir(prefixo):
+    """
+    Versões gzip (deflate puro) e brotli (se instalado) do prefixo, terminadas
+    com flush: o fluxo fica alinhado em bytes e sem referências para a frente,
+    pronto para receber o trecho de cada TV.
+    """
+    if not getattr(settings, 'PAINEL_PAYLOAD_COMPRESSAO', True) or len(prefixo) < TAMANHO_MINIMO_COMPRESSAO:
+        return {}
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    comprimidos = {'gzip': compressor.compress(prefixo) + compressor.flush(zlib.Z_FULL_FLUSH)}
+    if brotli is not None:
+        compressor = brotli.Compressor(quality=5)
+        comprimidos['br'] = compressor.process(prefixo) + compressor.flush()
+    return {codificacao: dados for codificacao, dados in comprimidos.items() if len(dados) < len(prefixo)}
+
+
+def _emendar_gzip(compartilhado, trecho):
+    # O trecho vai como um segundo fluxo deflate (o último bloco); o CRC do
+    # prefixo já está calculado, então o custo é proporcional ao trecho
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    fim = compressor.compress(trecho) + compressor.flush()
+    tamanho = len(compartilhado.prefixo) + len(trecho)
+    trailer = struct.pack('<II', zlib.crc32(trecho, compartilhado.crc), tamanho & 0xFFFFFFFF)
+    return CABECALHO_GZIP + compartilhado.comprimidos['gzip'] + fim + trailer
+
+
+def _emendar_brotli(comprimido, trecho):
+    # Metabloco não comprimido com o trecho (ISLAST=0, MNIBBLES=4, MLEN-1,
+    # ISUNCOMPRESSED=1; 20 bits, completados até 3 bytes), seguido do
+    # metabloco final vazio (ISLAST=1, ISLASTEMPTY=1)
+    cabecalho = (((len(trecho) - 1) << 3) | (1 << 19)).to_bytes(3, 'little')
+    return comprimido + cabecalho + trecho + b'\x03'
+
+
+# --- INVALIDAÇÃO ---
+# Sempre depois do commit: se a TV consultar entre o save e o commit, ela
+# montaria o payload com os dados antigos sob a geração nova.
+
+def _ao_confirmar(chaves, uuids):
+    """chaves: {chave: geração} ou função que o monta já depois do commit."""
+    def aplicar():
+        cache.set_many(chaves() if callable(chaves) else chaves, None)
+        payload_alterado.send(sender=None, uuids=uuids)
+    transaction.on_commit(aplicar)
+
+
+def invalidar_todos():
+    """Mudança geral: todas as TVs precisam remontar o payload."""
+    _ao_confirmar({CHAVE_GERACAO_GLOBAL: _nova_geracao()}, None)
+
+
+def invalidar_dispositivos(uuids):
+    """
+    Mudou o conteúdo exibido por essas TVs (catálogo): o payload de cada
+    configuração delas é remontado (e serve às outras TVs configuradas igual).
+    """
+    uuids = list(uuids)
+    if not uuids:
+        return
+    dispositivos = (
+        Dispositivo.objects.filter(uuid__in=uuids)
+        .prefetch_related('exibir_apenas_familias', 'exibir_propagandas')
+    )
+    chaves = {chave_geracao_config(impressao_config(d)): _nova_geracao() for d in dispositivos}
+    if chaves:
+        _ao_confirmar(chaves, uuids)
+
+
+def invalidar_configuracao(uuids):
+    """
+    Mudou a configuração dessas TVs: a impressão (e o trecho) delas é refeita.
+    A geração da impressão nova também muda: o payload guardado para ela pode
+    ser de quando nenhuma TV a usava, e o catálogo só invalida as impressões
+    em uso (invalidar_dispositivos).
+    """
+    uuids = list(uuids)
+    if not uuids:
+        return
+
+    def chaves():
+        # Depois do commit, para ler a configuração nova
+        dispositivos = (
+            Dispositivo.objects.filter(uuid__in=uuids)
+            .prefetch_related('exibir_apenas_familias', 'exibir_propagandas')
+        )
+        return {
+            **{chave_geracao_dispositivo(u): _nova_geracao() for u in uuids},
+            **{chave_geracao_config(impressao_config(d)): _nova_geracao() for d in dispositivos},
+        }
+    _ao_confirmar(chaves, uuids)
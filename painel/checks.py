@@ -0,0 +1,22 @@
+"""
+Verificações de configuração do app (rodam no `manage.py check` e na subida).
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def verificar_cache_compartilhado(app_configs, **kwargs):
+    # A invalidação do payload (signals) só limpa o cache do processo que
+    # gravou a mudança; com LocMemCache os outros workers não ficam sabendo
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or not backend.endswith('LocMemCache'):
+        return []
+    return [Warning(
+        "O cache padrão é LocMemCache (um por processo): com mais de um worker, "
+        "os outros continuam entregando o payload antigo até ele expirar "
+        f"(PAINEL_CACHE_TIMEOUT = {settings.PAINEL_CACHE_TIMEOUT}s).",
+        hint="Configure um cache compartilhado (CACHE_BACKEND/CACHE_LOCATION: Redis, Memcached ou "
+             "banco) ou rode um worker só.",
+        id='painel.W001',
+    )]
@@ -0,0 +1,105 @@
+"""
+Sincronização incremental da TV (api/painel/<uuid>/delta/?since=<versao>).
+
+A versão entregue à TV é "<instante>.<estrutura>": o momento da consulta (em
+microssegundos) e o hash de tudo que não é a lista de produtos no payload
+compacto (config, filtro de famílias, templates e playlist). Com a mesma
+estrutura, basta mandar os produtos das famílias da TV com updated_at
+posterior e os códigos que saíram da tela (ocultos, apagados ou que mudaram
+de família, ver ProdutoRemovido). Se a estrutura mudou, ou a versão é
+inválida ou mais antiga que a retenção dos removidos, a resposta vem só com
+"completo": a TV baixa o payload pela API normal (api/painel/<uuid>/), que
+sai do cache já comprimido e responde 304 se ela já tem aquele ETag.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import obter_payload
+from .models import Dispositivo, Produto, ProdutoRemovido
+from .midia import carregar_manifesto
+from .payload import FORMATO_COMPACTO, compactar_produto, nomes_midia_produtos, serializar_produtos
+
+
+def formatar_versao(momento, estrutura):
+    return f'{int(momento.timestamp() * 1_000_000)}.{estrutura}'
+
+
+def ler_versao(versao):
+    """Retorna (momento, estrutura) ou None se a versão for inválida."""
+    try:
+        micros, estrutura = (versao or '').split('.', 1)
+        momento = datetime.fromtimestamp(int(micros) / 1_000_000, tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        return None
+    return momento, estrutura
+
+
+def retencao_removidos():
+    return timedelta(days=getattr(settings, 'PAINEL_DELTA_RETENCAO_DIAS', 7))
+
+
+def registrar_removidos(codigos):
+    """
+    Registra os produtos que saíram da tela de alguma TV (apagados ou que
+    mudaram de família) e descarta os registros fora da retenção.
+    """
+    ProdutoRemovido.objects.bulk_create([ProdutoRemovido(codigo=codigo) for codigo in codigos])
+    ProdutoRemovido.objects.filter(removido_em__lt=timezone.now() - retencao_removidos()).delete()
+
+
+def montar_delta(device_uuid, versao_cliente, formato=FORMATO_COMPACTO):
+    """
+    Monta a resposta do delta ou None se o dispositivo não existe. 'formato'
+    (compacto ou colunar) é o do payload completo cujo ETag vai na resposta;
+    os produtos alterados vão sempre compactos.
+    """
+    payload = obter_payload(device_uuid, formato)
+    if payload is None:
+        return None
+
+    agora = timezone.now()
+    resposta = {
+        "versao": formatar_versao(agora, payload.estrutura),
+        "etag": payload.etag,
+    }
+
+    desde = ler_versao(versao_cliente)
+    if desde is None or desde[1] != payload.estrutura or desde[0] < agora - retencao_removidos():
+        resposta["completo"] = True
+        return resposta
+
+    dispositivo = Dispositivo.objects.filter(uuid=device_uuid).first()
+    if dispositivo is None:
+        return None
+    familias = set(dispositivo.exibir_apenas_familias.values_list('id', flat=True))
+
+    # Margem para transações que gravaram um updated_at antigo mas só
+    # terminaram depois da última consulta da TV (ex.: importação longa)
+    limite = desde[0] - timedelta(seconds=getattr(settings, 'PAINEL_DELTA_MARGEM', 120))
+
+    # Produtos de outras famílias nunca estiveram nesta TV; os que saíram
+    # dela mudando de família estão em ProdutoRemovido
+    alterados = Produto.objects.filter(updated_at__gt=limite)
+    if familias:
+        alterados = alterados.filter(familia_id__in=familias)
+    alterados = alterados.select_related('familia', 'template_video').order_by('ordem', 'descricao')
+    visiveis = []
+    removidos = set()
+    for produto in alterados:
+        if produto.exibir_no_painel:
+            visiveis.append(produto)
+        else:
+            removidos.add(produto.codigo)
+
+    codigos_visiveis = {produto.codigo for produto in visiveis}
+    apagados = ProdutoRemovido.objects.filter(removido_em__gt=limite).values_list('codigo', flat=True)
+    removidos.update(codigo for codigo in apagados if codigo not in codigos_visiveis)
+
+    resposta["completo"] = False
+    manifesto = carregar_manifesto(nomes_midia_produtos(visiveis, dispositivo.orientacao))
+    dados = serializar_produtos(visiveis, dispositivo.orientacao, manifesto)
+    resposta["produtos"] = [compactar_produto(p) for p in dados]
+    resposta["removidos"] = sorted(removidos)
+    return resposta
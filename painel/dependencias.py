@@ -0,0 +1,128 @@
+"""
+Índice reverso do catálogo para as TVs: quais dispositivos exibem cada
+família e cada propaganda.
+
+Com ele uma alteração invalida só o payload das TVs afetadas (ver
+painel/signals.py) em vez de todas. Cada família/propaganda tem sua entrada
+no cache do Django, montada na primeira consulta a partir das tabelas M2M
+(exibir_apenas_familias / exibir_propagandas, que já são indexadas pelos dois
+lados), então o custo é proporcional às TVs afetadas, não à frota.
+
+As entradas carregam a versão do índice com que foram montadas. Qualquer
+mudança na seleção das TVs (ou TV criada/apagada) troca a versão e as
+entradas são remontadas sob demanda, no mesmo esquema de gerações do
+painel/cache.py.
+"""
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Dispositivo, Produto, VideoPropaganda, VideoTemplate
+
+CHAVE_VERSAO = 'painel:indice:versao'
+
+FAMILIA = 'familia'
+PROPAGANDA = 'propaganda'
+# TVs sem filtro de família: exibem o catálogo inteiro (uma entrada só)
+CATALOGO_INTEIRO = 'catalogo'
+
+
+def _chave(tipo, pk):
+    return f'painel:indice:{tipo}:{pk}'
+
+
+def _nova_versao():
+    return uuid.uuid4().hex
+
+
+def _montar(tipo, ids):
+    """{pk: frozenset(uuids)} a partir do banco."""
+    if tipo == CATALOGO_INTEIRO:
+        uuids = Dispositivo.objects.filter(exibir_apenas_familias__isnull=True).values_list('uuid', flat=True)
+        return {0: frozenset(uuids)}
+
+    if tipo == FAMILIA:
+        ligacoes = Dispositivo.exibir_apenas_familias.through.objects.filter(familiaproduto_id__in=ids)
+        campo = 'familiaproduto_id'
+    else:
+        ligacoes = Dispositivo.exibir_propagandas.through.objects.filter(videopropaganda_id__in=ids)
+        campo = 'videopropaganda_id'
+
+    dispositivos = defaultdict(set)
+    for pk, device_uuid in ligacoes.values_list(campo, 'dispositivo__uuid'):
+        dispositivos[pk].add(device_uuid)
+    return {pk: frozenset(dispositivos[pk]) for pk in ids}
+
+
+def _consultar(tipo, ids):
+    ids = {pk for pk in ids if pk is not None}
+    if not ids:
+        return set()
+
+    chaves = {_chave(tipo, pk): pk for pk in ids}
+    valores = cache.get_many([CHAVE_VERSAO, *chaves])
+    versao = valores.get(CHAVE_VERSAO)
+    if versao is None:
+        cache.add(CHAVE_VERSAO, _nova_versao(), None)
+        versao = cache.get(CHAVE_VERSAO)
+
+    afetados = set()
+    faltando = []
+    for chave, pk in chaves.items():
+        entrada = valores.get(chave)
+        if entrada is not None and entrada[0] == versao:
+            afetados |= entrada[1]
+        else:
+            faltando.append(pk)
+
+    if faltando:
+        # A versão foi lida antes de consultar o banco: se o índice mudar
+        # durante a montagem, a entrada já nasce velha
+        montados = _montar(tipo, faltando)
+        cache.set_many({_chave(tipo, pk): (versao, uuids) for pk, uuids in montados.items()}, None)
+        for uuids in montados.values():
+            afetados |= uuids
+    return afetados
+
+
+def invalidar_indice():
+    """Mudou a seleção de alguma TV: o índice é remontado sob demanda (depois do commit)."""
+    transaction.on_commit(lambda: cache.set(CHAVE_VERSAO, _nova_versao(), None))
+
+
+# --- CONSULTAS ---
+
+def dispositivos_das_familias(familia_ids):
+    """TVs que exibem produtos dessas famílias (inclusive as sem filtro de família)."""
+    familia_ids = {pk for pk in familia_ids if pk is not None}
+    if not familia_ids:
+        return set()
+    return _consultar(FAMILIA, familia_ids) | _consultar(CATALOGO_INTEIRO, [0])
+
+
+def dispositivos_com_familia(familia_id):
+    """TVs que selecionaram a família no filtro."""
+    return _consultar(FAMILIA, [familia_id])
+
+
+def dispositivos_das_propagandas(propaganda_ids):
+    return _consultar(PROPAGANDA, propaganda_ids)
+
+
+def dispositivos_do_template(template):
+    """TVs que exibem algum produto em destaque com este template."""
+    familias = (
+        Produto.objects.filter(template_video=template, exibir_no_painel=True)
+        .values_list('familia_id', flat=True).distinct()
+    )
+    return dispositivos_das_familias(familias)
+
+
+def dispositivos_do_video(video):
+    if isinstance(video, VideoTemplate):
+        return dispositivos_do_template(video)
+    if isinstance(video, VideoPropaganda):
+        return dispositivos_das_propagandas([video.pk])
+    return set()
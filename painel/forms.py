@@ -1,10 +1,10 @@
 from django import forms
 
 class ImportarProdutosForm(forms.Form):
-    arquivo_excel = forms.FileField(label='Selecione o arquivo Excel (.xlsx)')
+    arquivo_excel = forms.FileField(label='Selecione o arquivo Excel (.xlsx) ou CSV (.csv)')
     
     def clean_arquivo_excel(self):
         arquivo = self.cleaned_data.get('arquivo_excel')
-        if not arquivo.name.endswith('.xlsx'):
-            raise forms.ValidationError("O arquivo deve ser um Excel (.xlsx)")
+        if not arquivo.name.lower().endswith(('.xlsx', '.csv')):
+            raise forms.ValidationError("O arquivo deve ser um Excel (.xlsx) ou CSV (.csv)")
         return arquivo
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Versões reduzidas das imagens dos produtos, uma por orientação de TV.
+
+As fotos chegam do jeito que a equipe tirou (às vezes vários MB). No upload
+geramos uma cópia em WebP (ou JPEG, se o Pillow não tiver WebP) no tamanho
+máximo em que a imagem aparece no overlay do vídeo e guardamos os nomes em
+Produto.imagem_derivadas. O payload da TV usa a versão da orientação dela;
+sem derivada (imagem antiga ou falha ao gerar) vai a original.
+"""
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+logger = logging.getLogger(__name__)
+
+HORIZONTAL = 'horizontal'
+VERTICAL = 'vertical'
+
+# Maior lado, em pixels, de cada derivada. O overlay ocupa 'img_width' % da
+# largura da tela (1920px na horizontal, 1080px na vertical).
+TAMANHOS = {
+    HORIZONTAL: 800,
+    VERTICAL: 640,
+}
+
+QUALIDADE = 80
+
+
+def variante_da_orientacao(orientacao):
+    """Dispositivo.orientacao -> chave da derivada."""
+    return VERTICAL if (orientacao or '').startswith('VERTICAL') else HORIZONTAL
+
+
+def nome_imagem(produto, orientacao):
+    """Nome no storage da imagem que a TV dessa orientação deve receber."""
+    if not produto.imagem:
+        return None
+    derivadas = produto.imagem_derivadas or {}
+    if derivadas.get('origem') == produto.imagem.name:
+        return derivadas.get(variante_da_orientacao(orientacao)) or produto.imagem.name
+    return produto.imagem.name
+
+
+def _formato():
+    return ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+
+
+def _reduzir(imagem, lado, formato):
+    copia = imagem.copy()
+    copia.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+    if formato == 'JPEG' and copia.mode != 'RGB':
+        # JPEG não tem transparência: fundo branco
+        fundo = Image.new('RGB', copia.size, (255, 255, 255))
+        fundo.paste(copia, mask=copia.convert('RGBA').split()[-1])
+        copia = fundo
+
+    saida = io.BytesIO()
+    copia.save(saida, formato, quality=QUALIDADE)
+    return saida.getvalue()
+
+
+def gerar_derivadas(produto, storage=default_storage):
+    """
+    Gera as derivadas da imagem atual do produto e retorna o novo valor de
+    imagem_derivadas ({'origem': nome, <variante>: nome}), ou None se não
+    houver imagem ou ela não puder ser lida.
+    """
+    if not produto.imagem:
+        return None
+
+    try:
+        with storage.open(produto.imagem.name, 'rb') as arquivo:
+            imagem = Image.open(arquivo)
+            # Fotos de celular vêm deitadas com a rotação só no EXIF
+            imagem = ImageOps.exif_transpose(imagem)
+            if imagem.mode not in ('RGB', 'RGBA'):
+                imagem = imagem.convert('RGBA' if 'transparency' in imagem.info or imagem.mode in ('LA', 'PA') else 'RGB')
+            imagem.load()
+    except (OSError, UnidentifiedImageError):
+        logger.warning("Não foi possível gerar derivadas de %s", produto.imagem.name)
+        return None
+
+    formato, extensao = _formato()
+    base = os.path.splitext(os.path.basename(produto.imagem.name))[0]
+    derivadas = {'origem': produto.imagem.name}
+    for variante, lado in TAMANHOS.items():
+        nome = f"produtos/derivadas/{base}_{variante}.{extensao}"
+        derivadas[variante] = storage.save(nome, ContentFile(_reduzir(imagem, lado, formato)))
+    return derivadas
+
+
+def apagar_derivadas(derivadas, storage=default_storage):
+    for variante in TAMANHOS:
+        nome = (derivadas or {}).get(variante)
+        if nome:
+            storage.delete(nome)
@@ -0,0 +1,382 @@
+"""
+Importação da planilha de preços do ERP.
+
+Tudo é feito por conjuntos: a limpeza dos preços usa operações de coluna do
+pandas, os produtos existentes são carregados por pedaço e as gravações vão
+em bulk_create/bulk_update dentro de uma única transação.
+
+A planilha é lida em pedaços (openpyxl em modo read-only para .xlsx, pandas
+com chunksize para .csv), então a memória usada não depende do tamanho do
+arquivo: cada pedaço é comparado, gravado e descartado.
+
+A importação é feita em duas etapas: calcular_alteracoes() compara a planilha
+com o banco (prévia) e importar_planilha() grava apenas o que mudou, para não
+mexer no updated_at (e no cache das TVs) de produtos iguais.
+"""
+import math
+from collections import namedtuple
+from decimal import Decimal
+
+import openpyxl
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidar_dispositivos
+from .delta import registrar_removidos
+from .dependencias import dispositivos_das_familias
+from .models import FamiliaProduto, Produto
+
+COL_CODIGO = 'CÓDIGO DO PRODUTO'
+COL_DESCRICAO = 'DESCRIÇÃO DO PRODUTO'
+COL_PRECO = 'PREÇO UNITÁRIO DE VENDA'
+COL_FAMILIA = 'FAMÍLIA DE PRODUTO'
+
+COLUNAS_ESPERADAS = [COL_CODIGO, COL_DESCRICAO, COL_PRECO, COL_FAMILIA]
+
+# Linhas por pedaço lido da planilha (e por lote de gravação)
+TAMANHO_LOTE = 1000
+
+ResultadoImportacao = namedtuple('ResultadoImportacao', ['criados', 'atualizados', 'ignorados'])
+
+
+# --- LEITURA EM PEDAÇOS ---
+
+def _validar_colunas(colunas):
+    for col in COLUNAS_ESPERADAS:
+        if col not in colunas:
+            colunas_encontradas = ", ".join(colunas)
+            raise ValueError(f"A coluna '{col}' não foi encontrada. Colunas lidas: {colunas_encontradas}")
+
+
+def _ler_xlsx(arquivo, tamanho):
+    livro = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = livro.active.iter_rows(values_only=True)
+        colunas = [str(c).strip().upper() for c in next(linhas, ())]
+        _validar_colunas(colunas)
+
+        lote, numeros = [], []
+        # O índice de cada pedaço é o número da linha no Excel (cabeçalho = 1)
+        for numero, linha in enumerate(linhas, 2):
+            if all(valor is None for valor in linha):
+                continue
+            linha = tuple(linha[:len(colunas)]) + (None,) * (len(colunas) - len(linha))
+            lote.append(linha)
+            numeros.append(numero)
+            if len(lote) == tamanho:
+                yield pd.DataFrame(lote, columns=colunas, index=numeros, dtype=object)
+                lote, numeros = [], []
+        if lote:
+            # dtype=object: sem isso um pedaço com uma célula vazia vira float
+            # e o código 123 chega como "123.0"
+            yield pd.DataFrame(lote, columns=colunas, index=numeros, dtype=object)
+    finally:
+        livro.close()
+
+
+def _ler_csv(arquivo, tamanho):
+    # Exportações do ERP vêm em UTF-8 ou Latin-1; o separador é detectado
+    inicio = arquivo.read(64 * 1024)
+    arquivo.seek(0)
+    try:
+        inicio.decode('utf-8')
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        encoding = 'latin-1'
+
+    pedacos = pd.read_csv(arquivo, sep=None, engine='python', dtype=str, encoding=encoding, chunksize=tamanho)
+    for lote in pedacos:
+        lote.columns = [str(c).strip().upper() for c in lote.columns]
+        _validar_colunas(lote.columns)
+        lote.index = lote.index + 2
+        yield lote
+
+
+def ler_planilha(arquivo, nome=None, tamanho=TAMANHO_LOTE):
+    """
+    Gera DataFrames de até 'tamanho' linhas, com as colunas já validadas e o
+    índice igual ao número da linha no arquivo. Aceita .xlsx e .csv.
+    """
+    nome = nome or getattr(arquivo, 'name', None) or ''
+    if nome.lower().endswith('.csv'):
+        return _ler_csv(arquivo, tamanho)
+    return _ler_xlsx(arquivo, tamanho)
+
+
+# --- LIMPEZA ---
+
+def limpar_precos(coluna):
+    """
+    Converte a coluna de preços para número. Textos no formato brasileiro
+    ("R$ 1.234,56") ou com ponto decimal ("12.50", comum em CSV); o ponto só
+    é separador de milhar quando há vírgula decimal ou mais de um ponto.
+    Células já numéricas são mantidas. O que não for conversível vira NaN
+    (linha ignorada).
+    """
+    coluna = coluna.infer_objects()  # Pedaços do xlsx chegam como object
+    if not pd.api.types.is_numeric_dtype(coluna):
+        texto = coluna.str.replace(r'R\$|\s', '', regex=True)
+        brasileiro = texto.str.contains(',', regex=False, na=False) | (texto.str.count(r'\.') > 1)
+        convertido = texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+        texto = texto.where(~brasileiro, convertido)
+        coluna = texto.where(texto.notna(), coluna)
+    return pd.to_numeric(coluna, errors='coerce')
+
+
+def _texto(valor):
+    """
+    Célula como texto. Vazia vira '' (nunca 'nan') e número inteiro lido como
+    float pelo Excel volta a ser inteiro (123.0 -> '123').
+    """
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+def normalizar_planilha(df):
+    """
+    Devolve (dados, erros). 'dados' tem as colunas codigo, descricao, familia e
+    preco já limpas, sem códigos repetidos (vale a última ocorrência, como na
+    importação linha a linha). 'erros' lista as linhas ignoradas: código ou
+    descrição vazios e preço inválido.
+    """
+    dados = pd.DataFrame({
+        'codigo': df[COL_CODIGO].map(_texto),
+        'descricao': df[COL_DESCRICAO].map(_texto),
+        'familia': df[COL_FAMILIA].map(_texto).str.upper(),
+        'preco': limpar_precos(df[COL_PRECO]).round(2),
+    })
+
+    erros = []
+    invalidos = pd.Series(False, index=dados.index)
+    for mascara, coluna, mensagem in (
+        (dados['codigo'] == '', df[COL_CODIGO], 'Código vazio'),
+        (dados['descricao'] == '', df[COL_DESCRICAO], 'Descrição vazia'),
+        (dados['preco'].isna(), df[COL_PRECO], 'Preço inválido'),
+    ):
+        mascara &= ~invalidos  # Um erro por linha
+        erros += [
+            {'linha': int(linha), 'codigo': codigo, 'valor': _texto(valor), 'erro': mensagem}
+            for linha, codigo, valor in zip(df.index[mascara], dados['codigo'][mascara], coluna[mascara])
+        ]
+        invalidos |= mascara
+
+    erros.sort(key=lambda erro: erro['linha'])
+    dados = dados[~invalidos]
+    return dados.drop_duplicates('codigo', keep='last'), erros
+
+
+def resolver_familias(nomes, familias):
+    """
+    Completa o mapa 'familias' ({nome: id}, reaproveitado entre os pedaços),
+    criando numa tacada só as famílias que faltam. Outra importação (ou o
+    admin) pode criar a mesma família ao mesmo tempo: o conflito é ignorado e
+    os ids são sempre relidos pelo nome.
+    """
+    faltando = set(nomes) - familias.keys()
+    if faltando:
+        FamiliaProduto.objects.bulk_create(
+            [FamiliaProduto(nome=nome) for nome in faltando], batch_size=TAMANHO_LOTE, ignore_conflicts=True,
+        )
+        familias.update(FamiliaProduto.objects.filter(nome__in=faltando).values_list('nome', 'id'))
+    return familias
+
+
+# --- COMPARAÇÃO ---
+
+class PlanoImportacao:
+    """
+    Comparação da planilha com o banco. Guarda o total de cada tipo de
+    alteração e, para a prévia no admin, no máximo 'limite' exemplos de cada
+    um (None = todos).
+    """
+
+    def __init__(self, limite=None):
+        self.limite = limite
+        self.linhas_lidas = 0
+        self.inalterados = 0
+        self.total_alterados = 0  # Produtos existentes com ao menos uma mudança
+        self.totais = {'novos': 0, 'precos': 0, 'renomeados': 0, 'familias': 0, 'ausentes': 0, 'erros': 0}
+
+        self.novos = []          # {codigo, descricao, preco, familia}
+        self.precos = []         # {codigo, descricao, antes, depois}
+        self.renomeados = []     # {codigo, antes, depois}
+        self.familias = []       # {codigo, descricao, antes, depois}
+        self.ausentes = []       # {codigo, descricao} (só informativo, nada é apagado)
+        self.erros = []          # {linha, codigo, valor, erro}
+
+    def registrar(self, tipo, item):
+        self.totais[tipo] += 1
+        lista = getattr(self, tipo)
+        if self.limite is None or len(lista) < self.limite:
+            lista.append(item)
+
+    @property
+    def ignorados(self):
+        return self.totais['erros']
+
+    @property
+    def tem_alteracoes(self):
+        return bool(self.totais['novos'] or self.total_alterados)
+
+    @property
+    def resumo(self):
+        return {
+            'novos': self.totais['novos'],
+            'precos': self.totais['precos'],
+            'renomeados': self.totais['renomeados'],
+            'familias': self.totais['familias'],
+            'ausentes': self.totais['ausentes'],
+            'inalterados': self.inalterados,
+            'ignorados': self.ignorados,
+        }
+
+    def previa(self):
+        """Resumo e os exemplos de cada lista, para conferência no admin."""
+        return {
+            'resumo': self.resumo,
+            'tem_alteracoes': self.tem_alteracoes,
+            'limite': self.limite,
+            'novos': self.novos,
+            'precos': self.precos,
+            'renomeados': self.renomeados,
+            'familias': self.familias,
+            'ausentes': self.ausentes,
+        }
+
+
+def _comparar_pedaco(df, plano, nomes_familias):
+    """
+    Compara um pedaço da planilha com o banco e registra as alterações no plano.
+    Devolve (novos, alterados, codigos): listas de (Produto, nome da família),
+    já com os valores novos aplicados, e os códigos vistos no pedaço.
+    """
+    dados, erros = normalizar_planilha(df)
+    plano.linhas_lidas += len(df)
+    for erro in erros:
+        plano.registrar('erros', erro)
+
+    existentes = Produto.objects.in_bulk(list(dados['codigo']), field_name='codigo')
+
+    novos = []
+    alterados = []
+    for codigo, descricao, familia, preco in dados.itertuples(index=False, name=None):
+        preco = Decimal(f'{preco:.2f}')
+        produto = existentes.get(codigo)
+
+        if produto is None:
+            plano.registrar('novos', {'codigo': codigo, 'descricao': descricao, 'preco': preco, 'familia': familia})
+            novos.append((Produto(codigo=codigo, descricao=descricao, preco=preco), familia))
+            continue
+
+        mudou = False
+        if produto.preco != preco:
+            plano.registrar('precos', {'codigo': codigo, 'descricao': descricao, 'antes': produto.preco, 'depois': preco})
+            produto.preco = preco
+            mudou = True
+        if produto.descricao != descricao:
+            plano.registrar('renomeados', {'codigo': codigo, 'antes': produto.descricao, 'depois': descricao})
+            produto.descricao = descricao
+            mudou = True
+        familia_atual = nomes_familias.get(produto.familia_id)
+        if familia_atual != familia:
+            plano.registrar('familias', {'codigo': codigo, 'descricao': descricao, 'antes': familia_atual, 'depois': familia})
+            mudou = True
+
+        if mudou:
+            plano.total_alterados += 1
+            alterados.append((produto, familia))
+        else:
+            plano.inalterados += 1
+
+    return novos, alterados, set(dados['codigo'])
+
+
+def calcular_alteracoes(lotes, progresso=None, limite=None):
+    """
+    Monta o PlanoImportacao (sem gravar nada) a partir dos pedaços de
+    ler_planilha(). 'progresso', se informado, é chamado com o número de
+    linhas já lidas a cada pedaço.
+    """
+    plano = PlanoImportacao(limite)
+    nomes_familias = dict(FamiliaProduto.objects.values_list('id', 'nome'))
+
+    codigos_planilha = set()
+    for df in lotes:
+        _, _, codigos = _comparar_pedaco(df, plano, nomes_familias)
+        codigos_planilha |= codigos
+        if progresso:
+            progresso(plano.linhas_lidas)
+
+    for codigo, descricao in Produto.objects.order_by('codigo').values_list('codigo', 'descricao').iterator():
+        if codigo not in codigos_planilha:
+            plano.registrar('ausentes', {'codigo': codigo, 'descricao': descricao})
+
+    return plano
+
+
+# --- GRAVAÇÃO ---
+
+def _gravar_pedaco(novos, alterados, familias, agora):
+    """Grava o pedaço e devolve os ids das famílias afetadas (antes e depois)."""
+    resolver_familias({familia for _, familia in novos + alterados}, familias)
+
+    afetadas = set()
+    mudaram_de_familia = []
+    for produto, familia in novos:
+        produto.familia_id = familias[familia]
+        afetadas.add(produto.familia_id)
+    for produto, familia in alterados:
+        if produto.exibir_no_painel:
+            afetadas.add(produto.familia_id)
+        if produto.familia_id != familias[familia]:
+            mudaram_de_familia.append(produto.codigo)
+        produto.familia_id = familias[familia]
+        if produto.exibir_no_painel:
+            afetadas.add(produto.familia_id)
+        # bulk_update não passa pelo auto_now
+        produto.updated_at = agora
+
+    Produto.objects.bulk_create([produto for produto, _ in novos], batch_size=TAMANHO_LOTE)
+    Produto.objects.bulk_update(
+        [produto for produto, _ in alterados], ['descricao', 'preco', 'familia', 'updated_at'], batch_size=TAMANHO_LOTE
+    )
+    if mudaram_de_familia:
+        registrar_removidos(mudaram_de_familia)
+    return afetadas
+
+
+def importar_planilha(arquivo, nome=None, progresso=None):
+    """
+    Lê, compara e grava pedaço por pedaço, numa única transação, só o que é
+    novo ou mudou. 'progresso', se informado, é chamado com o número de
+    linhas gravadas a cada pedaço (ainda dentro da transação).
+    """
+    plano = PlanoImportacao(limite=0)
+    nomes_familias = dict(FamiliaProduto.objects.values_list('id', 'nome'))
+    familias = {nome: pk for pk, nome in nomes_familias.items()}
+    inicio = timezone.now()
+    afetadas = set()
+
+    with transaction.atomic():
+        for df in ler_planilha(arquivo, nome):
+            novos, alterados, _ = _comparar_pedaco(df, plano, nomes_familias)
+            afetadas |= _gravar_pedaco(novos, alterados, familias, inicio)
+            if progresso:
+                progresso(plano.linhas_lidas)
+
+        # O delta das TVs (painel/delta.py) busca por updated_at: com o
+        # horário do início, uma importação mais longa que PAINEL_DELTA_MARGEM
+        # gravaria horários anteriores a versões já entregues e as TVs não
+        # veriam essas linhas. Então tudo o que foi gravado é carimbado de
+        # novo aqui, logo antes do commit (uma consulta, pelo índice).
+        Produto.objects.filter(updated_at__gte=inicio).update(updated_at=timezone.now())
+
+        # Operações em lote não disparam os signals do cache: avisa só as
+        # TVs que exibem as famílias mexidas
+        invalidar_dispositivos(dispositivos_das_familias(afetadas))
+
+    return ResultadoImportacao(plano.totais['novos'], plano.total_alterados, plano.ignorados)
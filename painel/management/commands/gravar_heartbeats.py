@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from painel.telemetria import gravar_heartbeats
+
+
+class Command(BaseCommand):
+    help = "Grava no banco os heartbeats das TVs guardados no cache (use com PAINEL_HEARTBEAT_EM_THREAD=False)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uma-vez', action='store_true', help="Grava o que estiver pendente e sai")
+        parser.add_argument('--intervalo', type=float, default=30, help="Segundos entre gravações")
+
+    def handle(self, *args, **options):
+        while True:
+            gravados = gravar_heartbeats()
+            if gravados:
+                self.stdout.write(f"{gravados} heartbeat(s) gravado(s).")
+
+            if options['uma_vez']:
+                break
+            time.sleep(options['intervalo'])
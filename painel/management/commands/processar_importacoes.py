@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from painel.tarefas import executar_importacao, proxima_importacao
+
+
+class Command(BaseCommand):
+    help = "Processa as importações de planilha pendentes (use com PAINEL_IMPORTACAO_EM_THREAD=False)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uma-vez', action='store_true', help="Processa o que estiver na fila e sai")
+        parser.add_argument('--intervalo', type=float, default=5, help="Segundos entre verificações da fila")
+
+    def handle(self, *args, **options):
+        while True:
+            importacao_id = proxima_importacao()
+            if importacao_id is not None:
+                executar_importacao(importacao_id)
+                self.stdout.write(f"Importação #{importacao_id} processada.")
+                continue
+
+            if options['uma_vez']:
+                break
+            time.sleep(options['intervalo'])
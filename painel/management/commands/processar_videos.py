@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from painel.tarefas import executar_video, proximo_video
+
+
+class Command(BaseCommand):
+    help = "Processa os vídeos enviados pendentes (use com PAINEL_VIDEOS_EM_THREAD=False)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uma-vez', action='store_true', help="Processa o que estiver na fila e sai")
+        parser.add_argument('--intervalo', type=float, default=5, help="Segundos entre verificações da fila")
+
+    def handle(self, *args, **options):
+        while True:
+            pendente = proximo_video()
+            if pendente is not None:
+                modelo, video_id = pendente
+                executar_video(modelo, video_id)
+                self.stdout.write(f"{modelo._meta.verbose_name} #{video_id} processado.")
+                continue
+
+            if options['uma_vez']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from painel.publicacao import limpar_payloads, publicar
+
+
+class Command(BaseCommand):
+    help = "Publica no storage o payload de todas as TVs (ver painel/publicacao.py) e apaga payloads antigos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dispositivo', action='append', help="UUID de uma TV (pode repetir); padrão: todas")
+        parser.add_argument('--forcar', action='store_true', help="Regrava os ponteiros mesmo sem mudança")
+        parser.add_argument('--sem-limpeza', action='store_true', help="Não apaga os payloads fora de uso")
+
+    def handle(self, *args, **options):
+        em_uso = publicar(options['dispositivo'], forcar=options['forcar'])
+        self.stdout.write(f"{len(em_uso)} payload(s) em uso.")
+
+        # A limpeza só sabe o que está em uso quando todas as TVs foram publicadas
+        if not options['dispositivo'] and not options['sem_limpeza']:
+            apagados = limpar_payloads(em_uso)
+            self.stdout.write(f"{apagados} payload(s) antigo(s) apagado(s).")
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from painel.cache import invalidar_todos
+from painel.imagens import TAMANHOS, gerar_derivadas
+from painel.midia import registrar_midia
+from painel.models import ArquivoMidia, Produto, VideoPropaganda, VideoTemplate
+
+
+class Command(BaseCommand):
+    help = (
+        "Registra no manifesto de mídias os arquivos enviados antes dele existir "
+        "e gera as versões reduzidas das imagens que ainda não têm."
+    )
+
+    def handle(self, *args, **options):
+        nomes = [t.arquivo_video.name for t in VideoTemplate.objects.all()]
+        nomes += [p.arquivo_video.name for p in VideoPropaganda.objects.all()]
+
+        derivadas_geradas = 0
+        for produto in Produto.objects.exclude(imagem='').exclude(imagem__isnull=True).only('imagem', 'imagem_derivadas'):
+            nomes.append(produto.imagem.name)
+            if (produto.imagem_derivadas or {}).get('origem') != produto.imagem.name:
+                derivadas = gerar_derivadas(produto)
+                if derivadas:
+                    Produto.objects.filter(pk=produto.pk).update(imagem_derivadas=derivadas)
+                    nomes += [derivadas[variante] for variante in TAMANHOS]
+                    derivadas_geradas += 1
+
+        antes = ArquivoMidia.objects.count()
+        for nome in nomes:
+            registrar_midia(nome)
+
+        # O payload das TVs passa a usar as URLs versionadas e as derivadas
+        invalidar_todos()
+        self.stdout.write(
+            f"{ArquivoMidia.objects.count() - antes} arquivo(s) registrado(s), "
+            f"derivadas geradas para {derivadas_geradas} imagem(ns)."
+        )
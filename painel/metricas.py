@@ -0,0 +1,131 @@
+"""
+Instrumentação da API das TVs.
+
+As views de views_api (e views_api_async) são marcadas com @instrumentar('<endpoint>') e o
+MetricasMiddleware (painel/middleware.py) mede cada requisição marcada:
+latência (histograma por endpoint), consultas ao banco (quantidade e tempo),
+e bytes enviados, sem rótulo por TV (UUIDs são a credencial das TVs e
+qualquer UUID na URL viraria uma série nova). O cache do payload conta
+acertos e faltas (registrar_cache). Tudo fica em memória, por processo, e é exposto em texto
+no formato do Prometheus em /metrics/ (cada worker do gunicorn responde pelos
+seus próprios números).
+
+Uma amostra das requisições (PAINEL_METRICAS_AMOSTRAGEM) vira uma linha de
+log em JSON no logger 'painel.requisicoes'; erros e requisições lentas
+(PAINEL_METRICAS_LENTO_MS) são sempre logados.
+"""
+import logging
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+logger = logging.getLogger('painel.requisicoes')
+
+# Limites (ms) dos baldes do histograma de latência
+LIMITES_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histograma:
+    def __init__(self):
+        self.baldes = [0] * (len(LIMITES_MS) + 1)  # último = acima do maior limite
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.baldes[bisect_left(LIMITES_MS, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+class Registro:
+    """Contadores de um processo. Os métodos podem ser chamados de várias threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.zerar()
+
+    def zerar(self):
+        with self._lock:
+            self.requisicoes = defaultdict(int)       # (endpoint, status) -> n
+            self.latencia = defaultdict(Histograma)   # endpoint -> histograma (ms)
+            self.consultas = defaultdict(int)         # endpoint -> nº de consultas
+            self.tempo_banco = defaultdict(float)     # endpoint -> ms no banco
+            self.bytes = defaultdict(int)             # endpoint -> bytes enviados
+            self.cache = {'acerto': 0, 'falta': 0}
+
+    def registrar_requisicao(self, medida):
+        endpoint = medida['endpoint']
+        with self._lock:
+            self.requisicoes[(endpoint, medida['status'])] += 1
+            self.latencia[endpoint].observar(medida['ms'])
+            self.consultas[endpoint] += medida['consultas']
+            self.tempo_banco[endpoint] += medida['ms_banco']
+            self.bytes[endpoint] += medida['bytes'] or 0
+
+    def registrar_cache(self, acerto):
+        with self._lock:
+            self.cache['acerto' if acerto else 'falta'] += 1
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus."""
+        with self._lock:
+            linhas = [
+                '# TYPE painel_requisicoes_total counter',
+                *(f'painel_requisicoes_total{{endpoint="{e}",status="{s}"}} {n}'
+                  for (e, s), n in sorted(self.requisicoes.items())),
+                '# TYPE painel_latencia_ms histogram',
+            ]
+            for endpoint, hist in sorted(self.latencia.items()):
+                acumulado = 0
+                for limite, quantidade in zip(LIMITES_MS + ('+Inf',), hist.baldes):
+                    acumulado += quantidade
+                    linhas.append(f'painel_latencia_ms_bucket{{endpoint="{endpoint}",le="{limite}"}} {acumulado}')
+                linhas.append(f'painel_latencia_ms_sum{{endpoint="{endpoint}"}} {hist.soma:.3f}')
+                linhas.append(f'painel_latencia_ms_count{{endpoint="{endpoint}"}} {hist.total}')
+
+            linhas.append('# TYPE painel_consultas_banco_total counter')
+            linhas += [f'painel_consultas_banco_total{{endpoint="{e}"}} {n}' for e, n in sorted(self.consultas.items())]
+            linhas.append('# TYPE painel_tempo_banco_ms_total counter')
+            linhas += [f'painel_tempo_banco_ms_total{{endpoint="{e}"}} {ms:.3f}' for e, ms in sorted(self.tempo_banco.items())]
+            linhas.append('# TYPE painel_bytes_enviados_total counter')
+            linhas += [f'painel_bytes_enviados_total{{endpoint="{e}"}} {n}' for e, n in sorted(self.bytes.items())]
+            linhas.append('# TYPE painel_cache_payload_total counter')
+            linhas += [f'painel_cache_payload_total{{resultado="{r}"}} {n}' for r, n in self.cache.items()]
+        return '\n'.join(linhas) + '\n'
+
+
+registro = Registro()
+
+
+def registrar_cache(acerto):
+    registro.registrar_cache(acerto)
+
+
+def instrumentar(endpoint):
+    """
+    Marca a view para o MetricasMiddleware medir. Usar por fora do @api_view,
+    para receber o HttpRequest do Django.
+    """
+    def marcar(request, kwargs):
+        request.metricas = {
+            'endpoint': endpoint,
+            'dispositivo': str(kwargs['device_uuid']) if 'device_uuid' in kwargs else None,
+        }
+
+    def decorador(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper_async(request, *args, **kwargs):
+                marcar(request, kwargs)
+                return await view(request, *args, **kwargs)
+            return wrapper_async
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            marcar(request, kwargs)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorador
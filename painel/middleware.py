@@ -0,0 +1,96 @@
+import json
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.middleware.gzip import GZipMiddleware
+
+from .metricas import logger as logger_requisicoes, registro
+
+
+class CompressaoMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware que não mexe no stream de eventos (SSE): comprimido, cada
+    evento ficaria preso no buffer do gzip em vez de chegar na hora à TV.
+    Respostas que já vêm comprimidas (payload do cache) passam direto.
+    """
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        return super().process_response(request, response)
+
+
+class _ContadorConsultas:
+    def __init__(self):
+        self.quantidade = 0
+        self.ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.quantidade += 1
+            self.ms += (time.perf_counter() - inicio) * 1000
+
+
+class MetricasMiddleware:
+    """
+    Mede as views marcadas com @instrumentar (ver painel/metricas.py).
+    Funciona nos dois modos, para não obrigar o ASGI a passar cada
+    requisição por uma thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        contador = _ContadorConsultas()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(contador):
+            response = self.get_response(request)
+        return self.registrar(request, response, contador, inicio)
+
+    async def __acall__(self, request):
+        contador = _ContadorConsultas()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(contador):
+            response = await self.get_response(request)
+        return self.registrar(request, response, contador, inicio)
+
+    def registrar(self, request, response, contador, inicio):
+        ms = (time.perf_counter() - inicio) * 1000
+
+        marcacao = getattr(request, 'metricas', None)
+        if marcacao is None:
+            return response
+
+        medida = {
+            **marcacao,
+            'metodo': request.method,
+            'status': response.status_code,
+            'ms': round(ms, 3),
+            'consultas': contador.quantidade,
+            'ms_banco': round(contador.ms, 3),
+            # Streaming (SSE): tamanho desconhecido
+            'bytes': None if response.streaming else len(response.content),
+        }
+        registro.registrar_requisicao(medida)
+        self.logar(medida)
+        return response
+
+    def logar(self, medida):
+        amostragem = getattr(settings, 'PAINEL_METRICAS_AMOSTRAGEM', 0.01)
+        lento = medida['ms'] >= getattr(settings, 'PAINEL_METRICAS_LENTO_MS', 1000)
+        if medida['status'] >= 500 or lento or random.random() < amostragem:
+            logger_requisicoes.info(json.dumps(medida, ensure_ascii=False))
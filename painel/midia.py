@@ -0,0 +1,121 @@
+"""
+Manifesto das mídias exibidas nas TVs (vídeos dos templates, propagandas e
+imagens dos produtos).
+
+Hash, tamanho, tipo e duração de cada arquivo são calculados uma vez, quando
+o arquivo é enviado (ver signals), e guardados em ArquivoMidia. O payload usa
+o hash para versionar as URLs (?v=<hash>): arquivo novo = URL nova, então a
+TV pode guardar cada URL em cache para sempre.
+"""
+import hashlib
+import logging
+import mimetypes
+import shutil
+import subprocess
+
+from django.core.files.storage import default_storage
+
+from .models import ArquivoMidia
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_BLOCO = 1024 * 1024
+
+# Caracteres do hash usados na URL versionada
+TAMANHO_VERSAO = 16
+
+
+def _origem_ffprobe(nome, storage):
+    try:
+        return storage.path(nome)
+    except NotImplementedError:
+        # Storage remoto (Cloudinary): o ffprobe lê direto da URL
+        url = storage.url(nome)
+        return url if url.startswith(('http://', 'https://')) else None
+
+
+def sondar_duracao(origem):
+    """
+    Duração do vídeo em segundos via ffprobe ('origem' = caminho local ou
+    URL), ou None se não der para medir.
+    """
+    ffprobe = shutil.which('ffprobe')
+    if not ffprobe or not origem:
+        return None
+
+    try:
+        saida = subprocess.run(
+            [ffprobe, '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', origem],
+            capture_output=True, text=True, timeout=60, check=True,
+        ).stdout
+        return round(float(saida.strip()), 3)
+    except (subprocess.SubprocessError, OSError, ValueError):
+        logger.warning("Não foi possível medir a duração de %s", origem)
+        return None
+
+
+def calcular_metadados(nome, storage=default_storage):
+    """Lê o arquivo uma vez, em blocos, e devolve os campos de ArquivoMidia."""
+    sha = hashlib.sha256()
+    tamanho = 0
+    with storage.open(nome, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO), b''):
+            sha.update(bloco)
+            tamanho += len(bloco)
+
+    tipo_mime = mimetypes.guess_type(nome)[0] or ''
+    return {
+        'hash_conteudo': sha.hexdigest(),
+        'tamanho': tamanho,
+        'tipo_mime': tipo_mime,
+        'duracao': sondar_duracao(_origem_ffprobe(nome, storage)) if tipo_mime.startswith('video/') else None,
+    }
+
+
+def registrar_midia(nome, storage=default_storage):
+    """
+    Garante o registro do arquivo no manifesto. Os nomes no storage não se
+    repetem (o Django acrescenta um sufixo), então um arquivo já registrado
+    não é lido de novo.
+    """
+    if not nome or ArquivoMidia.objects.filter(caminho=nome).exists():
+        return None
+    try:
+        metadados = calcular_metadados(nome, storage)
+    except OSError:
+        logger.warning("Arquivo de mídia não encontrado: %s", nome)
+        return None
+    midia, _ = ArquivoMidia.objects.get_or_create(caminho=nome, defaults=metadados)
+    return midia
+
+
+def url_versionada(midia):
+    return f"{default_storage.url(midia.caminho)}?v={midia.hash_conteudo[:TAMANHO_VERSAO]}"
+
+
+def carregar_manifesto(nomes):
+    """
+    Entradas do manifesto dos arquivos informados, numa consulta, indexadas
+    pela URL original (sem versão).
+    """
+    nomes = {nome for nome in nomes if nome}
+    if not nomes:
+        return {}
+    return {
+        default_storage.url(midia.caminho): item_manifesto(None, midia)
+        for midia in ArquivoMidia.objects.filter(caminho__in=nomes)
+    }
+
+
+def item_manifesto(url, midia):
+    """Entrada do manifesto enviada à TV (sem metadados se o arquivo não foi registrado)."""
+    if midia is None:
+        return {'url': url, 'hash': None, 'tamanho': None, 'tipo_mime': None, 'duracao': None}
+    return {
+        'url': url_versionada(midia),
+        'hash': midia.hash_conteudo,
+        'tamanho': midia.tamanho,
+        'tipo_mime': midia.tipo_mime,
+        'duracao': midia.duracao,
+    }
@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-18 14:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('painel', '0010_produto_ordem_videopropaganda_ordem_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['exibir_no_painel', 'familia', 'ordem'], name='produto_painel_idx'),
+        ),
+    ]
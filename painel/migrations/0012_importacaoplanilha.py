@@ -0,0 +1,39 @@
+# Generated by Django 5.0 on 2026-10-18 15:00
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('painel', '0011_produto_painel_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoPlanilha',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arquivo', models.FileField(upload_to='importacoes/')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Na fila para análise'), ('ANALISANDO', 'Analisando planilha'), ('AGUARDANDO_CONFIRMACAO', 'Aguardando confirmação'), ('CONFIRMADA', 'Na fila para gravação'), ('GRAVANDO', 'Gravando alterações'), ('CONCLUIDA', 'Concluída'), ('CANCELADA', 'Cancelada'), ('ERRO', 'Erro')], db_index=True, default='PENDENTE', max_length=30)),
+                ('linhas_lidas', models.IntegerField(default=0)),
+                ('linhas_processadas', models.IntegerField(default=0)),
+                ('linhas_com_erro', models.IntegerField(default=0)),
+                ('erros', models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Linhas recusadas da planilha')),
+                ('previa', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Resumo das alterações para conferência')),
+                ('mensagem', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finalizado_em', models.DateTimeField(blank=True, null=True)),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Importação de Planilha',
+                'verbose_name_plural': 'Importações de Planilhas',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('painel', '0013_produtoremovido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArquivoMidia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('caminho', models.CharField(help_text='Nome do arquivo no storage', max_length=255, unique=True)),
+                ('hash_conteudo', models.CharField(help_text='SHA-256 do conteúdo', max_length=64)),
+                ('tamanho', models.BigIntegerField(help_text='Tamanho em bytes')),
+                ('tipo_mime', models.CharField(blank=True, max_length=100)),
+                ('duracao', models.FloatField(blank=True, help_text='Duração em segundos (vídeos, se o ffprobe estiver disponível)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Arquivo de Mídia',
+                'verbose_name_plural': 'Arquivos de Mídia',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('painel', '0014_arquivomidia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produto',
+            name='imagem_derivadas',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
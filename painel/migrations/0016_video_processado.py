@@ -0,0 +1,63 @@
+# Generated by Django 5.0 on 2026-10-18 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('painel', '0015_produto_imagem_derivadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videopropaganda',
+            name='erro_processamento',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='videopropaganda',
+            name='processado_de',
+            field=models.CharField(blank=True, editable=False, help_text='Arquivo original que gerou o vídeo processado', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='videopropaganda',
+            name='status_processamento',
+            field=models.CharField(choices=[('PENDENTE', 'Aguardando processamento'), ('PROCESSANDO', 'Processando'), ('PRONTO', 'Pronto'), ('ERRO', 'Erro no processamento')], default='PENDENTE', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='videopropaganda',
+            name='video_processado',
+            field=models.FileField(blank=True, editable=False, upload_to='videos_processados/'),
+        ),
+        migrations.AddField(
+            model_name='videotemplate',
+            name='erro_processamento',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='videotemplate',
+            name='processado_de',
+            field=models.CharField(blank=True, editable=False, help_text='Arquivo original que gerou o vídeo processado', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='videotemplate',
+            name='status_processamento',
+            field=models.CharField(choices=[('PENDENTE', 'Aguardando processamento'), ('PROCESSANDO', 'Processando'), ('PRONTO', 'Pronto'), ('ERRO', 'Erro no processamento')], default='PENDENTE', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='videotemplate',
+            name='video_processado',
+            field=models.FileField(blank=True, editable=False, upload_to='videos_processados/'),
+        ),
+        migrations.AlterField(
+            model_name='videopropaganda',
+            name='duracao',
+            field=models.IntegerField(default=15, help_text='Duração em segundos. Medida automaticamente após o upload (caso o vídeo não tenha metadados, fica este valor)'),
+        ),
+        migrations.AlterField(
+            model_name='videotemplate',
+            name='duracao',
+            field=models.IntegerField(default=15, help_text='Duração do vídeo em segundos (Padrão para produtos). Medida automaticamente após o upload'),
+        ),
+    ]
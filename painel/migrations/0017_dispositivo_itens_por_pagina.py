@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('painel', '0016_video_processado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dispositivo',
+            name='itens_por_pagina',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Produtos por página da tabela. Vazio = padrão da orientação (18 na horizontal, 15 na vertical)', null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0 on 2026-10-18 15:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('painel', '0017_dispositivo_itens_por_pagina'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusDispositivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_contato', models.DateTimeField()),
+                ('versao_payload', models.CharField(blank=True, help_text='ETag do payload que está na tela', max_length=64)),
+                ('item_atual', models.CharField(blank=True, help_text='O que a TV estava exibindo', max_length=200)),
+                ('erros_video', models.PositiveIntegerField(default=0, help_text='Vídeos que falharam desde que a tela foi aberta')),
+                ('ultimo_erro', models.CharField(blank=True, max_length=255)),
+                ('tempo_ligada', models.PositiveIntegerField(default=0, help_text='Segundos desde que a tela foi aberta')),
+                ('endereco_ip', models.GenericIPAddressField(blank=True, null=True)),
+                ('dispositivo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='status', to='painel.dispositivo')),
+            ],
+            options={
+                'verbose_name': 'Status do Dispositivo',
+                'verbose_name_plural': 'Status dos Dispositivos',
+            },
+        ),
+    ]
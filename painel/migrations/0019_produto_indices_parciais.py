@@ -0,0 +1,25 @@
+# Generated by Django 5.0 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('painel', '0018_statusdispositivo'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='produto',
+            name='produto_painel_idx',
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(condition=models.Q(('exibir_no_painel', True)), fields=['familia', 'ordem', 'descricao'], name='produto_painel_familia_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(condition=models.Q(('exibir_no_painel', True)), fields=['ordem', 'descricao'], name='produto_painel_ordem_idx'),
+        ),
+    ]
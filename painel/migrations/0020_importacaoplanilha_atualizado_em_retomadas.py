@@ -0,0 +1,25 @@
+# Generated by Django 5.0 on 2026-10-18 18:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('painel', '0019_produto_indices_parciais'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importacaoplanilha',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Último sinal de vida (reserva ou progresso)'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='importacaoplanilha',
+            name='retomadas',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Vezes que voltou para a fila depois de travar'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-18 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('painel', '0020_importacaoplanilha_atualizado_em_retomadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videopropaganda',
+            name='processando_desde',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='videopropaganda',
+            name='retomadas',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Vezes que voltou para a fila depois de travar'),
+        ),
+        migrations.AddField(
+            model_name='videotemplate',
+            name='processando_desde',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='videotemplate',
+            name='retomadas',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Vezes que voltou para a fila depois de travar'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 import uuid
 import random
 import string
+from django.conf import settings
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 
 # Validador simples para garantir que porcentagens fiquem entre 0 e 100
 def validar_porcentagem(value):
@@ -24,7 +26,41 @@ class FamiliaProduto(models.Model):
         return self.nome
 
 
-class VideoTemplate(models.Model):
+class VideoProcessado(models.Model):
+    """
+    Campos da versão do vídeo preparada para as TVs (H.264 com bitrate
+    limitado, ver painel/videos.py). Processada em segundo plano após o upload.
+    """
+    PENDENTE = 'PENDENTE'
+    PROCESSANDO = 'PROCESSANDO'
+    PRONTO = 'PRONTO'
+    ERRO = 'ERRO'
+    STATUS_PROCESSAMENTO = [
+        (PENDENTE, 'Aguardando processamento'),
+        (PROCESSANDO, 'Processando'),
+        (PRONTO, 'Pronto'),
+        (ERRO, 'Erro no processamento'),
+    ]
+
+    video_processado = models.FileField(upload_to='videos_processados/', blank=True, editable=False)
+    processado_de = models.CharField(max_length=255, blank=True, editable=False, help_text="Arquivo original que gerou o vídeo processado")
+    status_processamento = models.CharField(max_length=20, choices=STATUS_PROCESSAMENTO, default=PENDENTE, editable=False)
+    erro_processamento = models.TextField(blank=True, editable=False)
+    processando_desde = models.DateTimeField(null=True, editable=False)
+    retomadas = models.PositiveSmallIntegerField(default=0, editable=False, help_text="Vezes que voltou para a fila depois de travar")
+
+    class Meta:
+        abstract = True
+
+    @property
+    def video_exibicao(self):
+        """Arquivo que a TV deve tocar: a versão processada, se pronta, ou o original."""
+        if self.status_processamento == self.PRONTO and self.video_processado:
+            return self.video_processado
+        return self.arquivo_video
+
+
+class VideoTemplate(VideoProcessado):
     nome = models.CharField(max_length=100)
     arquivo_video = models.FileField(upload_to='templates_video/')
 
@@ -42,7 +78,7 @@ class VideoTemplate(models.Model):
     img_left = models.FloatField(default=10, validators=[validar_porcentagem])
     img_width = models.FloatField(default=20, validators=[validar_porcentagem])
 
-    duracao = models.IntegerField(default=15, help_text="Duração do vídeo em segundos (Padrão para produtos)")
+    duracao = models.IntegerField(default=15, help_text="Duração do vídeo em segundos (Padrão para produtos). Medida automaticamente após o upload")
 
     estilos_css = models.JSONField(default=dict, blank=True)
     elementos_extras = models.JSONField(default=list, blank=True)
@@ -50,15 +86,13 @@ class VideoTemplate(models.Model):
     def __str__(self):
         return self.nome
 
-class VideoPropaganda(models.Model):
+class VideoPropaganda(VideoProcessado):
     """
     Vídeos institucionais ou de parceiros que não dependem de um produto.
     """
     descricao = models.CharField(max_length=100, help_text="Nome interno para identificação")
     arquivo_video = models.FileField(upload_to='propagandas/')
-    duracao = models.IntegerField(default=15, help_text="Duração em segundos (caso o vídeo não tenha metadados)")
-    ativo = models.BooleanField(default=True)
-    duracao = models.IntegerField(default=15, help_text="Duração em segundos")
+    duracao = models.IntegerField(default=15, help_text="Duração em segundos. Medida automaticamente após o upload (caso o vídeo não tenha metadados, fica este valor)")
     ordem = models.IntegerField(default=0, help_text="Ordem de exibição na playlist")
     ativo = models.BooleanField(default=True, help_text="Se desmarcado, não aparecerá na TV")
 
@@ -75,6 +109,8 @@ class Produto(models.Model):
     familia = models.ForeignKey(FamiliaProduto, on_delete=models.CASCADE, related_name='produtos')
     ordem = models.IntegerField(default=0, help_text="Ordem de exibição na TV (Menor número aparece primeiro)")
     imagem = models.ImageField(upload_to='produtos/', blank=True, null=True)
+    # Versões reduzidas da imagem por orientação de TV (ver painel/imagens.py)
+    imagem_derivadas = models.JSONField(default=dict, blank=True, editable=False)
     
     em_oferta = models.BooleanField(default=False)
     exibir_no_painel = models.BooleanField(default=True)
@@ -83,15 +119,63 @@ class Produto(models.Model):
     template_video = models.ForeignKey(VideoTemplate, on_delete=models.SET_NULL, null=True, blank=True, help_text="Selecione um template para exibir este produto como oferta em vídeo")
 
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ['descricao']
+        indexes = [
+            # Consulta do painel (payload.montar_payload): só os ativos, já na
+            # ordem de exibição, sem ordenar no banco. Parciais: os ocultos
+            # não ocupam o índice. Com filtro de famílias da TV:
+            models.Index(
+                fields=['familia', 'ordem', 'descricao'], condition=models.Q(exibir_no_painel=True),
+                name='produto_painel_familia_idx',
+            ),
+            # ... e sem filtro (catálogo inteiro)
+            models.Index(
+                fields=['ordem', 'descricao'], condition=models.Q(exibir_no_painel=True),
+                name='produto_painel_ordem_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.codigo} - {self.descricao}"
 
 
+class ProdutoRemovido(models.Model):
+    """
+    Registro de produtos apagados ou que mudaram de família, para a
+    sincronização incremental das TVs (api/painel/<uuid>/delta/) saber o que
+    tirar da tela. Registros mais
+    antigos que PAINEL_DELTA_RETENCAO são descartados.
+    """
+    codigo = models.CharField(max_length=50)
+    removido_em = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.codigo} (removido em {self.removido_em:%d/%m/%Y %H:%M})"
+
+
+class ArquivoMidia(models.Model):
+    """
+    Manifesto das mídias usadas pelas TVs (vídeos dos templates e propagandas,
+    imagens dos produtos). Calculado uma vez, no upload (ver painel/midia.py).
+    """
+    caminho = models.CharField(max_length=255, unique=True, help_text="Nome do arquivo no storage")
+    hash_conteudo = models.CharField(max_length=64, help_text="SHA-256 do conteúdo")
+    tamanho = models.BigIntegerField(help_text="Tamanho em bytes")
+    tipo_mime = models.CharField(max_length=100, blank=True)
+    duracao = models.FloatField(null=True, blank=True, help_text="Duração em segundos (vídeos, se o ffprobe estiver disponível)")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Arquivo de Mídia"
+        verbose_name_plural = "Arquivos de Mídia"
+
+    def __str__(self):
+        return self.caminho
+
+
 def gerar_codigo_curto():
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
 
@@ -114,7 +198,103 @@ class Dispositivo(models.Model):
         ('MISTO', 'Tabela + Vídeos Intercalados')
     ], default='TABELA')
 
+    itens_por_pagina = models.PositiveSmallIntegerField(
+        null=True, blank=True,
+        help_text="Produtos por página da tabela. Vazio = padrão da orientação (18 na horizontal, 15 na vertical)"
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Padrão de itens por página: 2 colunas x 9 linhas (horizontal), 1 coluna x 15 linhas (vertical)
+    ITENS_POR_PAGINA_HORIZONTAL = 18
+    ITENS_POR_PAGINA_VERTICAL = 15
+
+    def __str__(self):
+        return f"{self.nome} ({self.get_orientacao_display()})"
+
+    @property
+    def itens_por_pagina_exibicao(self):
+        if self.itens_por_pagina:
+            return self.itens_por_pagina
+        if self.orientacao.startswith('VERTICAL'):
+            return self.ITENS_POR_PAGINA_VERTICAL
+        return self.ITENS_POR_PAGINA_HORIZONTAL
+
+
+class StatusDispositivo(models.Model):
+    """
+    Último heartbeat recebido de cada TV. Não é gravado a cada ping: os
+    heartbeats ficam no cache e são gravados em lote (ver painel/telemetria.py).
+    """
+    dispositivo = models.OneToOneField(Dispositivo, on_delete=models.CASCADE, related_name='status')
+    ultimo_contato = models.DateTimeField()
+    versao_payload = models.CharField(max_length=64, blank=True, help_text="ETag do payload que está na tela")
+    item_atual = models.CharField(max_length=200, blank=True, help_text="O que a TV estava exibindo")
+    erros_video = models.PositiveIntegerField(default=0, help_text="Vídeos que falharam desde que a tela foi aberta")
+    ultimo_erro = models.CharField(max_length=255, blank=True)
+    tempo_ligada = models.PositiveIntegerField(default=0, help_text="Segundos desde que a tela foi aberta")
+    endereco_ip = models.GenericIPAddressField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Status do Dispositivo"
+        verbose_name_plural = "Status dos Dispositivos"
+
+    def __str__(self):
+        return f"{self.dispositivo.nome} (visto em {self.ultimo_contato:%d/%m/%Y %H:%M})"
+
+    @property
+    def tempo_ligada_exibicao(self):
+        horas, resto = divmod(self.tempo_ligada, 3600)
+        return f"{horas}h {resto // 60:02d}min"
+
+
+class ImportacaoPlanilha(models.Model):
+    """
+    Importação de preços rodando em segundo plano (ver painel/tarefas.py).
+    O upload só cria o registro; a análise e a gravação acontecem fora do request.
+    """
+    PENDENTE = 'PENDENTE'
+    ANALISANDO = 'ANALISANDO'
+    AGUARDANDO_CONFIRMACAO = 'AGUARDANDO_CONFIRMACAO'
+    CONFIRMADA = 'CONFIRMADA'
+    GRAVANDO = 'GRAVANDO'
+    CONCLUIDA = 'CONCLUIDA'
+    CANCELADA = 'CANCELADA'
+    ERRO = 'ERRO'
+
+    arquivo = models.FileField(upload_to='importacoes/')
+    status = models.CharField(max_length=30, choices=[
+        (PENDENTE, 'Na fila para análise'),
+        (ANALISANDO, 'Analisando planilha'),
+        (AGUARDANDO_CONFIRMACAO, 'Aguardando confirmação'),
+        (CONFIRMADA, 'Na fila para gravação'),
+        (GRAVANDO, 'Gravando alterações'),
+        (CONCLUIDA, 'Concluída'),
+        (CANCELADA, 'Cancelada'),
+        (ERRO, 'Erro'),
+    ], default=PENDENTE, db_index=True)
+
+    linhas_lidas = models.IntegerField(default=0)
+    linhas_processadas = models.IntegerField(default=0)
+    linhas_com_erro = models.IntegerField(default=0)
+    erros = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder, help_text="Linhas recusadas da planilha")
+    previa = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder, help_text="Resumo das alterações para conferência")
+    mensagem = models.TextField(blank=True)
+
+    criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True, help_text="Último sinal de vida (reserva ou progresso)")
+    retomadas = models.PositiveSmallIntegerField(default=0, help_text="Vezes que voltou para a fila depois de travar")
+    finalizado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Importação de Planilha"
+        verbose_name_plural = "Importações de Planilhas"
+        ordering = ['-created_at']
+
+    @property
+    def em_andamento(self):
+        return self.status in (self.PENDENTE, self.ANALISANDO, self.CONFIRMADA, self.GRAVANDO)
+
     def __str__(self):
-        return f"{self.nome} ({self.get_orientacao_display()})"
\ No newline at end of file
+        return f"Importação #{self.pk} ({self.get_status_display()})"
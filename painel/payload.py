@@ -0,0 +1,226 @@
+import hashlib
+import json
+from decimal import Decimal
+
+from .imagens import nome_imagem
+from .midia import carregar_manifesto, item_manifesto
+from .models import Produto
+from .serializers import ProdutoSerializer, DispositivoConfigSerializer
+
+# Formatos do payload (negociados pelos renderers em painel/renderers.py)
+FORMATO_COMPLETO = 'json'
+FORMATO_COMPACTO = 'compacto'
+FORMATO_COLUNAR = 'colunar'
+FORMATOS = (FORMATO_COMPLETO, FORMATO_COMPACTO, FORMATO_COLUNAR)
+
+# Campos da config que são de cada TV. O resto do payload só depende da
+# impressão da configuração (ver impressao_config) e é montado uma vez para
+# todas as TVs configuradas igual (ver painel/cache.py).
+CAMPOS_DISPOSITIVO = ('nome', 'uuid')
+
+
+def impressao_config(dispositivo):
+    """
+    Hash de tudo na configuração da TV que muda o payload, menos os
+    CAMPOS_DISPOSITIVO. Usa .all() nas seleções para aproveitar prefetch_related.
+    """
+    partes = [
+        dispositivo.modo_exibicao,
+        dispositivo.orientacao,
+        dispositivo.itens_por_pagina_exibicao,
+        sorted(familia.pk for familia in dispositivo.exibir_apenas_familias.all()),
+        sorted(propaganda.pk for propaganda in dispositivo.exibir_propagandas.all()),
+    ]
+    return hashlib.sha1(json.dumps(partes).encode()).hexdigest()
+
+
+def montar_payload(dispositivo):
+    """
+    Monta o dicionário que a TV recebe em /api/painel/<uuid>/.
+    Não depende do request para poder ser guardado no cache e reaproveitado
+    por todas as consultas do mesmo dispositivo (URLs de mídia saem relativas).
+    """
+    titulo_exibicao = dispositivo.titulo_exibicao if hasattr(dispositivo, 'titulo_exibicao') else ""
+
+    payload = {
+        "config": {
+            **DispositivoConfigSerializer(dispositivo).data,
+            "titulo_exibicao": titulo_exibicao
+        },
+        "produtos": [],
+        "playlist_final": [],
+        "midias": []
+    }
+
+    # Query Produtos (Só os ativos). Família e template vêm no mesmo SELECT,
+    # senão o serializer faz 2 consultas extras por produto.
+    query_produtos = Produto.objects.filter(exibir_no_painel=True).select_related('familia', 'template_video')
+
+    # Filtro de famílias da TV (sem seleção = catálogo inteiro).
+    # Usa o índice (exibir_no_painel, familia, ordem) de Produto.
+    familias_alvo = sorted(dispositivo.exibir_apenas_familias.values_list('id', flat=True))
+    payload["config"]["familias"] = familias_alvo
+    if familias_alvo:
+        query_produtos = query_produtos.filter(familia_id__in=familias_alvo)
+    query_produtos = query_produtos.order_by('ordem', 'descricao')
+
+    produtos = list(query_produtos)
+    propagandas = list(dispositivo.exibir_propagandas.filter(ativo=True))
+
+    # Manifesto das mídias (hash/tamanho/duração calculados no upload, ver painel/midia.py)
+    nomes_midia = [prop.video_exibicao.name for prop in propagandas]
+    nomes_midia += nomes_midia_produtos(produtos, dispositivo.orientacao)
+    manifesto = carregar_manifesto(nomes_midia)
+
+    # Serializa todos (para a tabela)
+    dados_produtos = serializar_produtos(produtos, dispositivo.orientacao, manifesto)
+    payload["produtos"] = dados_produtos
+
+    # --- MONTAR PLAYLIST ORDENADA (Vídeos e Propagandas) ---
+    lista_mista = []
+
+    # 1. Adiciona Produtos com Vídeo (a duração vem do template)
+    for p in dados_produtos:
+        if p['template_video']:
+            item = p.copy()
+            item['tipo'] = 'produto'
+            item['ordem_visual'] = p.get('ordem', 0)
+            item['duracao'] = item['template_video'].get('duracao', 15)
+            lista_mista.append(item)
+
+    # 2. Adiciona Propagandas
+    for prop in propagandas:
+        lista_mista.append({
+            "tipo": "propaganda",
+            "url": _versionar(prop.video_exibicao.url, manifesto),
+            "descricao": prop.descricao,
+            "duracao": prop.duracao,
+            "ordem_visual": prop.ordem
+        })
+
+    # 3. Ordena a lista final pelo campo 'ordem_visual'
+    # Sort é estável, então itens com mesma ordem ficam na sequência de inserção
+    lista_mista.sort(key=lambda x: x['ordem_visual'])
+
+    payload["playlist_final"] = lista_mista
+
+    # 4. Manifesto na ordem da playlist (a TV baixa antes o que toca primeiro)
+    payload["midias"] = _montar_manifesto(lista_mista, manifesto)
+
+    return payload
+
+
+def nomes_midia_produtos(produtos, orientacao):
+    """Arquivos de mídia que os produtos levam para a TV (imagem e vídeo do template)."""
+    nomes = []
+    for produto in produtos:
+        nomes.append(nome_imagem(produto, orientacao))
+        if produto.template_video:
+            nomes.append(produto.template_video.video_exibicao.name)
+    return nomes
+
+
+def serializar_produtos(produtos, orientacao, manifesto):
+    """
+    ProdutoSerializer com a imagem da orientação da TV e as URLs de mídia
+    versionadas pelo hash (manifesto de carregar_manifesto()).
+    """
+    dados = ProdutoSerializer(produtos, many=True, context={'orientacao': orientacao}).data
+    for p in dados:
+        p['imagem'] = _versionar(p['imagem'], manifesto)
+        if p['template_video']:
+            p['template_video']['arquivo_video'] = _versionar(p['template_video']['arquivo_video'], manifesto)
+    return dados
+
+
+def _versionar(url, manifesto):
+    return manifesto[url]["url"] if url in manifesto else url
+
+
+def _montar_manifesto(playlist, manifesto):
+    por_url = {midia["url"]: midia for midia in manifesto.values()}
+    midias = []
+    vistas = set()
+    for item in playlist:
+        if item["tipo"] == "propaganda":
+            urls = [item["url"]]
+        else:
+            urls = [item["template_video"]["arquivo_video"], item.get("imagem")]
+        for url in urls:
+            if url and url not in vistas:
+                vistas.add(url)
+                midias.append(por_url.get(url) or item_manifesto(url, None))
+    return midias
+
+
+def compactar_produto(produto):
+    """Produto serializado com o template trocado pelo id."""
+    if produto["template_video"]:
+        return {**produto, "template_video": produto["template_video"]["id"]}
+    return produto
+
+
+def compactar_payload(payload):
+    """
+    Versão compacta do payload: cada VideoTemplate vai uma única vez no mapa
+    'templates' (chave = id) e produtos/playlist apontam para ele pelo id.
+    Os itens de produto da playlist também não repetem o produto, só o 'codigo'.
+    """
+    templates = {}
+    for p in payload["produtos"]:
+        template = p["template_video"]
+        if template:
+            templates[str(template["id"])] = template
+    produtos = [compactar_produto(p) for p in payload["produtos"]]
+
+    playlist = []
+    for item in payload["playlist_final"]:
+        if item["tipo"] == "produto":
+            item = {
+                "tipo": "produto",
+                "codigo": item["codigo"],
+                "template_video": item["template_video"]["id"],
+                "duracao": item["duracao"],
+                "ordem_visual": item["ordem_visual"]
+            }
+        playlist.append(item)
+
+    return {
+        "config": payload["config"],
+        "templates": templates,
+        "produtos": produtos,
+        "playlist_final": playlist,
+        "midias": payload["midias"]
+    }
+
+
+def colunar_produtos(produtos):
+    """
+    Lista de produtos (já compactados) em colunas: um array por campo, na
+    mesma ordem. Nomes de família vão uma vez em 'familias' e cada produto
+    leva o índice; preços vão em centavos (inteiros).
+    """
+    familias = {}
+    colunas = {campo: [] for campo in (
+        'codigo', 'descricao', 'preco_centavos', 'familia', 'imagem', 'em_oferta', 'template_video', 'ordem'
+    )}
+    for p in produtos:
+        colunas['codigo'].append(p['codigo'])
+        colunas['descricao'].append(p['descricao'])
+        colunas['preco_centavos'].append(int(Decimal(p['preco']) * 100))
+        colunas['familia'].append(familias.setdefault(p['familia_nome'], len(familias)))
+        colunas['imagem'].append(p['imagem'])
+        colunas['em_oferta'].append(1 if p['em_oferta'] else 0)
+        colunas['template_video'].append(p['template_video'])
+        colunas['ordem'].append(p['ordem'])
+
+    return {"total": len(produtos), "familias": list(familias), **colunas}
+
+
+def montar_payload_formato(dispositivo, formato=FORMATO_COMPLETO):
+    payload = montar_payload(dispositivo)
+    if formato in (FORMATO_COMPACTO, FORMATO_COLUNAR):
+        payload = compactar_payload(payload)
+    if formato == FORMATO_COLUNAR:
+        payload["produtos"] = colunar_produtos(payload["produtos"])
+    return payload
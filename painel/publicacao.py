@@ -0,0 +1,135 @@
+"""
+Publicação estática do payload das TVs no storage (MEDIA_ROOT, Cloudinary...).
+
+Com PAINEL_PUBLICACAO ligado, cada invalidação do cache (signal
+payload_alterado, ver painel/cache.py) republica em segundo plano as TVs
+afetadas:
+
+- payloads/<hash>.json: payload colunar de uma configuração, compartilhado
+  pelas TVs configuradas igual (sem nome/uuid). O nome é o hash do conteúdo,
+  então o arquivo nunca muda e pode ficar em cache (CDN/navegador) para sempre;
+- dispositivos/<uuid>.json: ponteiro minúsculo com a versão (ETag) e a URL do
+  payload atual da TV. É só isso que a TV consulta periodicamente.
+
+A TV recebe a URL do ponteiro no delta e, a partir daí, não passa mais pelo
+Django; se o ponteiro falhar, volta a usar a API, que continua valendo.
+O comando `publicar_payloads` publica todas as TVs e apaga payloads antigos.
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .cache import etag_resposta, obter_partes
+from .models import Dispositivo
+from .payload import FORMATO_COLUNAR
+
+PASTA = 'painel/publicado'
+
+# Formato que o tv_app.js usa
+FORMATO_PUBLICADO = FORMATO_COLUNAR
+
+
+def publicacao_ativa():
+    return getattr(settings, 'PAINEL_PUBLICACAO', False)
+
+
+def obter_storage():
+    """PAINEL_PUBLICACAO_STORAGE (caminho da classe) ou o storage padrão."""
+    caminho = getattr(settings, 'PAINEL_PUBLICACAO_STORAGE', None)
+    return import_string(caminho)() if caminho else default_storage
+
+
+def nome_ponteiro(device_uuid):
+    return f'{PASTA}/dispositivos/{device_uuid}.json'
+
+
+def nome_payload(etag):
+    return f'{PASTA}/payloads/{etag}.json'
+
+
+def url_ponteiro(device_uuid, storage=None):
+    return (storage or obter_storage()).url(nome_ponteiro(device_uuid))
+
+
+def chave_publicado(device_uuid):
+    # Última versão publicada da TV, para não regravar o ponteiro à toa
+    return f'painel:publicado:{device_uuid}'
+
+
+def _sobrescrever(storage, nome, conteudo, tentativas=3):
+    # O Storage do Django não sobrescreve: se outro processo gravar o mesmo
+    # nome entre o delete e o save, o save() acrescenta um sufixo e a TV
+    # continuaria lendo o ponteiro antigo. Apaga a cópia e tenta de novo.
+    for _ in range(tentativas):
+        storage.delete(nome)
+        salvo = storage.save(nome, ContentFile(conteudo))
+        if salvo == nome:
+            return
+        storage.delete(salvo)
+    raise OSError(f"Não foi possível sobrescrever {nome} no storage")
+
+
+def publicar(uuids=None, storage=None, forcar=False):
+    """
+    Publica o payload das TVs informadas (todas, se None). Retorna os nomes
+    dos payloads em uso por essas TVs. Com forcar, regrava até os ponteiros
+    que já estavam na versão atual.
+    """
+    storage = storage or obter_storage()
+    if uuids is None:
+        uuids = Dispositivo.objects.values_list('uuid', flat=True)
+
+    publicados = {}
+    for device_uuid in list(uuids):
+        partes = obter_partes(device_uuid, FORMATO_PUBLICADO)
+        if partes is None:
+            # TV apagada: sem ponteiro, ela volta para a API
+            storage.delete(nome_ponteiro(device_uuid))
+            cache.delete(chave_publicado(device_uuid))
+            continue
+
+        compartilhado, trecho = partes
+        if compartilhado.etag not in publicados:
+            nome = nome_payload(compartilhado.etag)
+            if not storage.exists(nome):
+                # Fecha o objeto "config" sem os campos da TV
+                nome = storage.save(nome, ContentFile(compartilhado.prefixo + b'}}'))
+            publicados[compartilhado.etag] = nome
+
+        etag = etag_resposta(compartilhado, trecho)
+        if not forcar and cache.get(chave_publicado(device_uuid)) == etag:
+            continue
+        ponteiro = {'etag': etag, 'url': storage.url(publicados[compartilhado.etag])}
+        _sobrescrever(storage, nome_ponteiro(device_uuid), json.dumps(ponteiro).encode())
+        cache.set(chave_publicado(device_uuid), etag, None)
+
+    return set(publicados.values())
+
+
+def limpar_payloads(em_uso, storage=None):
+    """
+    Apaga os payloads publicados que não estão em 'em_uso' e são mais velhos
+    que PAINEL_PUBLICACAO_RETENCAO_HORAS (a TV pode estar no meio da troca).
+    Retorna quantos apagou.
+    """
+    storage = storage or obter_storage()
+    limite = timezone.now() - timedelta(hours=getattr(settings, 'PAINEL_PUBLICACAO_RETENCAO_HORAS', 24))
+    pasta = f'{PASTA}/payloads'
+    try:
+        _, arquivos = storage.listdir(pasta)
+    except (NotImplementedError, FileNotFoundError):
+        return 0
+
+    apagados = 0
+    for arquivo in arquivos:
+        nome = f'{pasta}/{arquivo}'
+        if nome not in em_uso and storage.get_modified_time(nome) < limite:
+            storage.delete(nome)
+            apagados += 1
+    return apagados
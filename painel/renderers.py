@@ -0,0 +1,23 @@
+from rest_framework.renderers import JSONRenderer
+
+from .payload import FORMATO_COLUNAR, FORMATO_COMPACTO
+
+
+class PayloadCompactoRenderer(JSONRenderer):
+    """
+    Payload da TV com templates deduplicados (ver payload.compactar_payload).
+    Selecionado com ?format=compacto ou Accept: application/vnd.painel.compacto+json.
+    TVs antigas continuam pedindo application/json e recebem o formato completo.
+    """
+    media_type = 'application/vnd.painel.compacto+json'
+    format = FORMATO_COMPACTO
+
+
+class PayloadColunarRenderer(JSONRenderer):
+    """
+    Payload compacto com a lista de produtos em colunas (ver
+    payload.colunar_produtos). Selecionado com ?format=colunar ou
+    Accept: application/vnd.painel.colunar+json.
+    """
+    media_type = 'application/vnd.painel.colunar+json'
+    format = FORMATO_COLUNAR
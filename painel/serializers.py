@@ -1,5 +1,13 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
-from .models import Produto, FamiliaProduto, VideoTemplate, Dispositivo
+
+from .imagens import nome_imagem
+from .models import Produto, FamiliaProduto, VideoTemplate, Dispositivo, StatusDispositivo
+
+def formatar_preco(valor):
+    """Decimal -> "R$ 1.234,56"."""
+    return "R$ " + f"{valor:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+
 
 class FamiliaSerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,9 +15,15 @@ class FamiliaSerializer(serializers.ModelSerializer):
         fields = ['id', 'nome']
 
 class VideoTemplateSerializer(serializers.ModelSerializer):
+    # A TV toca a versão processada quando ela estiver pronta (ver painel/videos.py)
+    arquivo_video = serializers.SerializerMethodField()
+
     class Meta:
         model = VideoTemplate
-        fields = '__all__'
+        exclude = ['video_processado', 'processado_de', 'status_processamento', 'erro_processamento']
+
+    def get_arquivo_video(self, obj):
+        return obj.video_exibicao.url
 
 class ProdutoSerializer(serializers.ModelSerializer):
     # Serializamos a família para enviar o nome dela, não só o ID
@@ -18,19 +32,43 @@ class ProdutoSerializer(serializers.ModelSerializer):
     # Se o produto tiver um template de vídeo específico, enviamos os dados dele junto
     template_video = VideoTemplateSerializer(read_only=True)
 
+    # Versão reduzida da imagem para a orientação da TV (context['orientacao'])
+    imagem = serializers.SerializerMethodField()
+
+    # Preço já no formato da tela ("R$ 1.234,56"): poupa o Intl das TVs fracas
+    preco_exibicao = serializers.SerializerMethodField()
+
     class Meta:
         model = Produto
         fields = [
-            'codigo', 'descricao', 'preco', 
+            'codigo', 'descricao', 'preco', 'preco_exibicao',
             'familia_nome', 'imagem', 
             'em_oferta', 'template_video', 'ordem'
         ]
 
+    def get_preco_exibicao(self, obj):
+        return formatar_preco(obj.preco)
+
+    def get_imagem(self, obj):
+        nome = nome_imagem(obj, self.context.get('orientacao'))
+        return default_storage.url(nome) if nome else None
+
 class DispositivoConfigSerializer(serializers.ModelSerializer):
     """
     Este é o serializer que a TV vai receber.
     Ele diz qual o modo de operação e pode incluir dados extras.
     """
+    # Tamanho da página da tabela já resolvido (campo do dispositivo ou padrão da orientação)
+    itens_por_pagina = serializers.IntegerField(source='itens_por_pagina_exibicao', read_only=True)
+
     class Meta:
         model = Dispositivo
-        fields = ['nome', 'modo_exibicao', 'uuid', 'orientacao']
\ No newline at end of file
+        fields = ['nome', 'modo_exibicao', 'uuid', 'orientacao', 'itens_por_pagina']
+
+
+class HeartbeatSerializer(serializers.ModelSerializer):
+    """O que a TV manda no heartbeat (ver painel/telemetria.py)."""
+
+    class Meta:
+        model = StatusDispositivo
+        fields = ['versao_payload', 'item_atual', 'erros_video', 'ultimo_erro', 'tempo_ligada']
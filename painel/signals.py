@@ -0,0 +1,175 @@
+"""
+Invalidação do cache do payload da TV (ver painel/cache.py), só das TVs
+afetadas (índice reverso em painel/dependencias.py), manifesto das
+mídias (painel/midia.py), processamento dos vídeos (painel/videos.py) e
+registros da sincronização incremental (painel/delta.py) e republicação
+estática (painel/publicacao.py).
+Conectado em PainelConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import invalidar_configuracao, invalidar_dispositivos, payload_alterado
+from .delta import registrar_removidos
+from .dependencias import (
+    dispositivos_com_familia, dispositivos_das_familias, dispositivos_das_propagandas, dispositivos_do_template,
+    invalidar_indice,
+)
+from .imagens import TAMANHOS, apagar_derivadas, gerar_derivadas
+from .midia import registrar_midia
+from .tarefas import enfileirar_publicacao, enfileirar_video
+from .models import FamiliaProduto, Produto, VideoTemplate, VideoPropaganda, Dispositivo
+
+
+# --- CATÁLOGO (só as TVs que exibem o item alterado) ---
+@receiver(pre_save, sender=Produto)
+def guardar_exibicao_anterior(sender, instance, **kwargs):
+    # Produto que mudou de família sai da tela das TVs da família antiga
+    instance._exibicao_anterior = (
+        Produto.objects.filter(pk=instance.pk).values_list('familia_id', 'exibir_no_painel').first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Produto)
+def produto_alterado(sender, instance, **kwargs):
+    familias = {instance.familia_id} if instance.exibir_no_painel else set()
+    anterior = getattr(instance, '_exibicao_anterior', None)
+    if anterior and anterior[1]:
+        familias.add(anterior[0])
+    invalidar_dispositivos(dispositivos_das_familias(familias))
+    if anterior and anterior[0] != instance.familia_id:
+        # Sai do delta das TVs da família antiga (ver painel/delta.py)
+        registrar_removidos([instance.codigo])
+
+
+@receiver(post_delete, sender=Produto)
+def produto_apagado(sender, instance, **kwargs):
+    if instance.exibir_no_painel:
+        invalidar_dispositivos(dispositivos_das_familias([instance.familia_id]))
+
+
+@receiver(post_save, sender=FamiliaProduto)
+def familia_alterada(sender, instance, created, **kwargs):
+    if not created:
+        invalidar_dispositivos(dispositivos_das_familias([instance.pk]))
+
+
+@receiver(post_save, sender=VideoTemplate)
+def template_alterado(sender, instance, **kwargs):
+    invalidar_dispositivos(dispositivos_do_template(instance))
+
+
+@receiver(post_save, sender=VideoPropaganda)
+def propaganda_alterada(sender, instance, **kwargs):
+    invalidar_dispositivos(dispositivos_das_propagandas([instance.pk]))
+
+
+# Na exclusão as ligações (M2M, template dos produtos) somem sem m2m_changed:
+# as TVs afetadas são calculadas antes e o índice é refeito
+@receiver(pre_delete, sender=FamiliaProduto)
+def familia_apagada(sender, instance, **kwargs):
+    invalidar_dispositivos(dispositivos_das_familias([instance.pk]))
+    invalidar_indice()
+
+
+@receiver(pre_delete, sender=VideoTemplate)
+def template_apagado(sender, instance, **kwargs):
+    invalidar_dispositivos(dispositivos_do_template(instance))
+
+
+@receiver(pre_delete, sender=VideoPropaganda)
+def propaganda_apagada(sender, instance, **kwargs):
+    invalidar_dispositivos(dispositivos_das_propagandas([instance.pk]))
+    invalidar_indice()
+
+
+# --- MANIFESTO DE MÍDIAS (ver painel/midia.py) ---
+@receiver(post_save, sender=VideoTemplate)
+@receiver(post_save, sender=VideoPropaganda)
+def video_enviado(sender, instance, **kwargs):
+    registrar_midia(instance.arquivo_video.name)
+
+    # Arquivo novo: duração e versão para as TVs são refeitas em segundo plano
+    if instance.arquivo_video.name != instance.processado_de:
+        if instance.status_processamento != sender.PENDENTE or instance.retomadas:
+            instance.status_processamento = sender.PENDENTE
+            instance.retomadas = 0
+            sender.objects.filter(pk=instance.pk).update(status_processamento=sender.PENDENTE, retomadas=0)
+        enfileirar_video(instance)
+
+
+@receiver(post_save, sender=Produto)
+def imagem_enviada(sender, instance, **kwargs):
+    registrar_midia(instance.imagem.name)
+
+    # Derivadas por orientação (ver painel/imagens.py), só quando a imagem muda
+    derivadas = instance.imagem_derivadas or {}
+    if derivadas.get('origem') == (instance.imagem.name or None):
+        return
+    # As antigas só saem depois do commit: num rollback o produto continua
+    # apontando para elas
+    antigas = derivadas
+    transaction.on_commit(lambda: apagar_derivadas(antigas))
+    derivadas = gerar_derivadas(instance) or {}
+    for variante in TAMANHOS:
+        registrar_midia(derivadas.get(variante))
+    instance.imagem_derivadas = derivadas
+    # update() para não disparar os signals de novo
+    Produto.objects.filter(pk=instance.pk).update(imagem_derivadas=derivadas)
+
+
+# --- SINCRONIZAÇÃO INCREMENTAL (ver painel/delta.py) ---
+@receiver(post_delete, sender=Produto)
+def registrar_produto_removido(sender, instance, **kwargs):
+    registrar_removidos([instance.codigo])
+
+
+@receiver(post_save, sender=FamiliaProduto)
+def familia_renomeada(sender, instance, created, **kwargs):
+    # O nome da família vai em cada produto: marca os produtos como alterados
+    if not created:
+        Produto.objects.filter(familia=instance).update(updated_at=timezone.now())
+
+
+# --- CONFIGURAÇÃO DA TV ---
+@receiver(post_save, sender=Dispositivo)
+def dispositivo_alterado(sender, instance, created, **kwargs):
+    invalidar_configuracao([instance.uuid])
+    if created:
+        # TV nova começa sem filtro de família: entra no "catálogo inteiro"
+        invalidar_indice()
+
+
+@receiver(post_delete, sender=Dispositivo)
+def dispositivo_apagado(sender, instance, **kwargs):
+    invalidar_configuracao([instance.uuid])
+    invalidar_indice()
+
+
+@receiver(m2m_changed, sender=Dispositivo.exibir_apenas_familias.through)
+@receiver(m2m_changed, sender=Dispositivo.exibir_propagandas.through)
+def selecao_dispositivo_alterada(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # Pelo lado da família/propaganda o clear não informa quais TVs perdeu:
+        # pegamos do índice antes de apagar
+        if isinstance(instance, FamiliaProduto):
+            invalidar_configuracao(dispositivos_com_familia(instance.pk))
+        else:
+            invalidar_configuracao(dispositivos_das_propagandas([instance.pk]))
+    if not action.startswith('post_'):
+        return
+
+    invalidar_indice()
+    if not reverse:
+        invalidar_configuracao([instance.uuid])
+    elif action != 'post_clear':
+        invalidar_configuracao(Dispositivo.objects.filter(pk__in=pk_set).values_list('uuid', flat=True))
+
+
+# --- PUBLICAÇÃO ESTÁTICA (ver painel/publicacao.py) ---
+@receiver(payload_alterado)
+def republicar_payloads(sender, uuids, **kwargs):
+    enfileirar_publicacao(uuids)
@@ -9,6 +9,9 @@ document.addEventListener('DOMContentLoaded', () => {
 
     let deviceUUID = localStorage.getItem('tv_device_uuid');
     let dadosCache = null;
+    let etagAtual = null; // Versão do payload que está na tela (ETag)
+    let versaoDelta = null; // Cursor da sincronização incremental
+    let urlPonteiro = null; // Ponteiro publicado no storage (ver painel/publicacao.py)
     
     let modoAtual = 'TABELA';
     let paginaTabelaAtual = 0;
@@ -19,6 +22,15 @@ document.addEventListener('DOMContentLoaded', () => {
     let MODO_VERTICAL = false;
 
     const TEMPO_PAGINA_TABELA = 12000; 
+    const TEMPO_VERIFICACAO_SEGURANCA = 10 * 60000;
+    const TEMPO_HEARTBEAT = 60000;
+    const TEMPO_PONTEIRO = 30000;
+
+    // Telemetria enviada no heartbeat (ver painel/telemetria.py)
+    const inicioTela = Date.now();
+    let itemAtual = '';
+    let errosVideo = 0;
+    let ultimoErroVideo = '';
 
     // --- SETUP ---
     if(inputCodigo) inputCodigo.placeholder = "CÓDIGO DE 6 DÍGITOS";
@@ -65,64 +77,317 @@ document.addEventListener('DOMContentLoaded', () => {
     function iniciarApp() {
         setupScreen.style.display = 'none';
         appScreen.style.display = 'flex';
-        carregarDados();
-        setInterval(carregarDados, 60000); 
+        carregarDados().then(enviarHeartbeat).then(assinarMudancas);
+        // Rede de segurança caso o canal de avisos caia sem percebermos
+        setInterval(carregarDados, TEMPO_VERIFICACAO_SEGURANCA);
+        setInterval(enviarHeartbeat, TEMPO_HEARTBEAT);
+    }
+
+    // --- HEARTBEAT ---
+    // Avisa o servidor que a TV está viva e o que ela está exibindo.
+    // Falhas são ignoradas: o próximo vai em um minuto.
+    function enviarHeartbeat() {
+        fetch(`/api/painel/${deviceUUID}/heartbeat/`, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({
+                versao_payload: (etagAtual || '').replace(/"/g, ''),
+                item_atual: itemAtual.slice(0, 200),
+                erros_video: errosVideo,
+                ultimo_erro: ultimoErroVideo.slice(0, 255),
+                tempo_ligada: Math.round((Date.now() - inicioTela) / 1000),
+            }),
+        }).catch(() => {});
+    }
+
+    // --- AVISO DE MUDANÇAS ---
+    // O servidor avisa quando a versão (ETag) do payload muda; só então buscamos
+    // os dados. Com SSE indisponível (servidor WSGI responde 204) usamos
+    // /aguardar/: long-poll no ASGI; no WSGI ele responde na hora e o
+    // Retry-After diz quando voltar.
+    function assinarMudancas() {
+        if (urlPonteiro) return acompanharPublicacao();
+        if (!window.EventSource) return aguardarMudancas();
+
+        const eventos = new EventSource(`/api/painel/${deviceUUID}/eventos/?format=colunar`);
+        eventos.addEventListener('versao', (e) => {
+            if (e.data !== etagAtual) carregarDados();
+        });
+        eventos.onerror = () => {
+            // CLOSED = o servidor recusou o stream; erros de rede reconectam sozinhos
+            if (eventos.readyState === EventSource.CLOSED) aguardarMudancas();
+        };
+    }
+
+    async function aguardarMudancas() {
+        while (true) {
+            try {
+                const versao = encodeURIComponent(etagAtual || '');
+                const response = await fetch(`/api/painel/${deviceUUID}/aguardar/?format=colunar&versao=${versao}`, { cache: 'no-store' });
+                if (response.status === 200) {
+                    const anterior = etagAtual;
+                    await carregarDados();
+                    // Se a busca falhou, não martela o servidor
+                    if (etagAtual === anterior) throw new Error("Falha ao atualizar dados");
+                } else if (response.status === 204) {
+                    const retry = parseInt(response.headers.get('Retry-After'), 10);
+                    if (retry > 0) await new Promise(resolve => setTimeout(resolve, retry * 1000));
+                } else {
+                    throw new Error("Erro API");
+                }
+            } catch (e) {
+                console.error(e);
+                await new Promise(resolve => setTimeout(resolve, 10000));
+            }
+        }
+    }
+
+    // --- PUBLICAÇÃO ESTÁTICA ---
+    // Com a publicação ligada, a TV só consulta o ponteiro (arquivo estático com
+    // a versão e a URL do payload) e baixa o payload quando a versão muda, sem
+    // passar pelo Django. Se o storage falhar, busca pela API como antes.
+    async function acompanharPublicacao() {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, TEMPO_PONTEIRO));
+            try {
+                const resposta = await fetch(urlPonteiro, { cache: 'no-store' });
+                if (!resposta.ok) throw new Error("Erro ponteiro");
+                const ponteiro = await resposta.json();
+                if ('"' + ponteiro.etag + '"' === etagAtual) continue;
+
+                const payload = await fetch(ponteiro.url);
+                if (!payload.ok) throw new Error("Erro payload publicado");
+                const data = await payload.json();
+                data.produtos = decodificarColunas(data.produtos);
+                aplicarPayloadCompleto(resolverPayloadCompacto(data));
+                etagAtual = '"' + ponteiro.etag + '"';
+                guardarParaOffline();
+            } catch (e) {
+                console.error(e);
+                await carregarDados();
+            }
+        }
     }
 
     // --- BUSCA DE DADOS ---
     async function carregarDados() {
         try {
-            const response = await fetch(`/api/painel/${deviceUUID}/`);
+            // Delta: só o que mudou desde a versão que já temos
+            const since = versaoDelta ? `&since=${encodeURIComponent(versaoDelta)}` : '';
+            const response = await fetch(`/api/painel/${deviceUUID}/delta/?format=colunar${since}`, { cache: 'no-store' });
             if (!response.ok) throw new Error("Erro API");
-            const data = await response.json();
-
-            // 1. Configurações Visuais
-            if (data.config && data.config.titulo_exibicao) {
-                elTitulo.innerText = data.config.titulo_exibicao;
+            const delta = await response.json();
+            if (delta.ponteiro) urlPonteiro = delta.ponteiro;
+
+            if (!delta.completo) {
+                versaoDelta = delta.versao;
+                etagAtual = '"' + delta.etag + '"';
+                if (delta.produtos.length || delta.removidos.length) {
+                    aplicarDelta(delta);
+                    guardarParaOffline();
+                }
+                return;
             }
 
-            // 2. DETECÇÃO DE ORIENTAÇÃO (CRÍTICO)
-            document.body.classList.remove('rotacao-90', 'rotacao-270');
-            elConteudo.classList.remove('layout-vertical'); // Reseta
-            
-            const ori = data.config.orientacao;
-            if (ori === 'VERTICAL_DIR') {
-                document.body.classList.add('rotacao-90');
-                MODO_VERTICAL = true;
-            } else if (ori === 'VERTICAL_ESQ') {
-                document.body.classList.add('rotacao-270');
-                MODO_VERTICAL = true;
-            } else {
-                MODO_VERTICAL = false;
+            // 1ª carga ou mudança de estrutura: payload completo pela API normal
+            // (colunar, já comprimido no servidor); 304 se já é o que está na tela
+            const headers = dadosCache !== null && etagAtual ? { 'If-None-Match': etagAtual } : {};
+            const completo = await fetch(`/api/painel/${deviceUUID}/?format=colunar`, { cache: 'no-store', headers });
+            if (completo.status === 304) {
+                versaoDelta = delta.versao;
+                return;
             }
+            if (!completo.ok) throw new Error("Erro API");
+
+            const data = await completo.json();
+            etagAtual = (completo.headers.get('ETag') || '').replace(/^W\//, '') || '"' + delta.etag + '"';
+            versaoDelta = delta.versao;
+            data.produtos = decodificarColunas(data.produtos);
+            aplicarPayloadCompleto(resolverPayloadCompacto(data));
+            guardarParaOffline();
+        } catch (e) {
+            console.error(e);
+            // Sem rede logo ao ligar: mostra o último payload bom guardado
+            if (dadosCache === null) await restaurarUltimoPayload();
+        }
+    }
+
+    function aplicarPayloadCompleto(data) {
+        // 1. Configurações Visuais
+        if (data.config && data.config.titulo_exibicao) {
+            elTitulo.innerText = data.config.titulo_exibicao;
+        }
+
+        // 2. DETECÇÃO DE ORIENTAÇÃO (CRÍTICO)
+        document.body.classList.remove('rotacao-90', 'rotacao-270');
+        elConteudo.classList.remove('layout-vertical'); // Reseta
+        
+        const ori = data.config.orientacao;
+        if (ori === 'VERTICAL_DIR') {
+            document.body.classList.add('rotacao-90');
+            MODO_VERTICAL = true;
+        } else if (ori === 'VERTICAL_ESQ') {
+            document.body.classList.add('rotacao-270');
+            MODO_VERTICAL = true;
+        } else {
+            MODO_VERTICAL = false;
+        }
+
+        // Capacidade da página: vem do servidor (campo do dispositivo ou padrão da orientação)
+        if (MODO_VERTICAL) {
+            ITENS_POR_PAGINA = data.config.itens_por_pagina || 15; // 1 Coluna x 15 Linhas
+            elConteudo.classList.add('layout-vertical');
+        } else {
+            ITENS_POR_PAGINA = data.config.itens_por_pagina || 18; // 2 Colunas x 9 Linhas
+        }
+
+        // 3. Atualiza Dados e Inicia Ciclo
+        console.log("Novos dados/configuração recebidos! Vertical:", MODO_VERTICAL);
+        const primeiraCarga = dadosCache === null;
+        dadosCache = data;
+        montarPaginas();
 
-            // Define capacidade da página baseado na orientação
-            if (MODO_VERTICAL) {
-                ITENS_POR_PAGINA = 15; // 1 Coluna x 15 Linhas
-                elConteudo.classList.add('layout-vertical');
+        if (primeiraCarga) {
+            if (dadosCache.config.modo_exibicao === 'VIDEO') {
+                modoAtual = 'VIDEO';
             } else {
-                ITENS_POR_PAGINA = 18; // 2 Colunas x 9 Linhas
+                modoAtual = 'TABELA';
             }
+            proximoPassoCiclo();
+        }
+    }
 
-            // 3. Verifica Mudanças e Inicia Ciclo
-            const hashNovo = JSON.stringify(data.produtos) + JSON.stringify(data.playlist_final) + data.config.modo_exibicao + data.config.orientacao;
-            const hashAntigo = dadosCache ? (JSON.stringify(dadosCache.produtos) + JSON.stringify(dadosCache.playlist_final) + dadosCache.config.modo_exibicao + dadosCache.config.orientacao) : "";
-
-            if (hashNovo !== hashAntigo) {
-                console.log("Novos dados/configuração recebidos! Vertical:", MODO_VERTICAL);
-                const primeiraCarga = dadosCache === null;
-                dadosCache = data;
-                
-                if (primeiraCarga) {
-                    if (dadosCache.config.modo_exibicao === 'VIDEO') {
-                        modoAtual = 'VIDEO';
-                    } else {
-                        modoAtual = 'TABELA';
-                    }
-                    proximoPassoCiclo();
-                }
-            }
-        } catch (e) { console.error(e); }
+    // --- MODO OFFLINE ---
+    // O Service Worker (tv_sw.js) guarda as mídias; aqui guardamos o último
+    // payload bom, no formato compacto, para a TV voltar a exibir sem rede.
+    const CACHE_DADOS = 'painel-dados-v1';
+    const CHAVE_ULTIMO_PAYLOAD = '/tv/ultimo-payload.json';
+
+    async function guardarParaOffline() {
+        enviarMidiasAoCache();
+        if (!window.caches) return;
+        try {
+            const snapshot = {
+                versao: versaoDelta,
+                etag: etagAtual,
+                config: dadosCache.config,
+                templates: dadosCache.templates,
+                playlist_final: dadosCache.playlist_compacta,
+                midias: dadosCache.midias,
+                produtos: dadosCache.produtos.map(p => ({
+                    ...p, template_video: p.template_video ? p.template_video.id : null
+                }))
+            };
+            const cache = await caches.open(CACHE_DADOS);
+            await cache.put(CHAVE_ULTIMO_PAYLOAD, new Response(JSON.stringify(snapshot), {
+                headers: { 'Content-Type': 'application/json' }
+            }));
+        } catch (e) { console.warn('Não foi possível guardar o payload offline', e); }
+    }
+
+    async function restaurarUltimoPayload() {
+        if (!window.caches) return;
+        try {
+            const salvo = await caches.match(CHAVE_ULTIMO_PAYLOAD, { cacheName: CACHE_DADOS });
+            if (!salvo || dadosCache !== null) return;
+            const snapshot = await salvo.json();
+            console.log("Sem conexão: exibindo o último payload guardado.");
+            // Guarda o cursor: ao voltar a rede, o delta parte daqui
+            versaoDelta = snapshot.versao;
+            etagAtual = snapshot.etag;
+            aplicarPayloadCompleto(resolverPayloadCompacto(snapshot));
+        } catch (e) { console.warn('Payload offline indisponível', e); }
+    }
+
+    // Manda ao Service Worker o manifesto de mídias (na ordem da playlist, com
+    // URLs versionadas pelo hash): ele baixa as novas e descarta as que saíram
+    function enviarMidiasAoCache() {
+        if (!('serviceWorker' in navigator) || !dadosCache || !dadosCache.midias) return;
+
+        const urls = dadosCache.midias.map(m => m.url);
+        navigator.serviceWorker.ready
+            .then(reg => reg.active && reg.active.postMessage({ tipo: 'midias', urls }))
+            .catch(e => console.warn(e));
+    }
+
+    // Formato colunar: um array por campo, famílias por índice e preços em
+    // centavos. Decodificado uma vez por payload para a lista que o player usa.
+    function decodificarColunas(colunas) {
+        if (Array.isArray(colunas)) return colunas;
+
+        const produtos = new Array(colunas.total);
+        for (let i = 0; i < colunas.total; i++) {
+            const centavos = colunas.preco_centavos[i];
+            produtos[i] = {
+                codigo: colunas.codigo[i],
+                descricao: colunas.descricao[i],
+                preco: (centavos / 100).toFixed(2),
+                preco_exibicao: formatarCentavos(centavos),
+                familia_nome: colunas.familias[colunas.familia[i]],
+                imagem: colunas.imagem[i],
+                em_oferta: colunas.em_oferta[i] === 1,
+                template_video: colunas.template_video[i],
+                ordem: colunas.ordem[i]
+            };
+        }
+        return produtos;
+    }
+
+    // "R$ 1.234,56" sem passar pelo Intl (lento nas TVs mais fracas)
+    function formatarCentavos(centavos) {
+        const sinal = centavos < 0 ? '-' : '';
+        const abs = Math.abs(centavos);
+        const reais = String(Math.floor(abs / 100)).replace(/\B(?=(\d{3})+(?!\d))/g, '.');
+        return `${sinal}R$ ${reais},${String(abs % 100).padStart(2, '0')}`;
+    }
+
+    // O formato compacto manda cada template uma vez só (mapa 'templates') e os
+    // itens apontam para ele pelo id. Aqui remontamos os objetos que o player usa.
+    function resolverPayloadCompacto(data) {
+        if (!data.templates) return data;
+
+        data.produtos.forEach(p => {
+            if (p.template_video) p.template_video = data.templates[p.template_video];
+        });
+        data.playlist_compacta = data.playlist_final;
+        data.playlist_final = montarPlaylist(data);
+
+        return data;
+    }
+
+    function montarPlaylist(data) {
+        const produtosPorCodigo = {};
+        data.produtos.forEach(p => { produtosPorCodigo[p.codigo] = p; });
+
+        return data.playlist_compacta.map(item => {
+            if (item.tipo !== 'produto') return item;
+            return {
+                ...produtosPorCodigo[item.codigo],
+                ...item,
+                template_video: data.templates[item.template_video]
+            };
+        });
+    }
+
+    // Junta no dadosCache os produtos alterados/removidos vindos do delta.
+    // Mudanças de config, templates ou playlist sempre chegam como payload completo.
+    function aplicarDelta(delta) {
+        const removidos = new Set(delta.removidos);
+        const alterados = {};
+        delta.produtos.forEach(p => {
+            if (p.template_video) p.template_video = dadosCache.templates[p.template_video];
+            alterados[p.codigo] = p;
+        });
+
+        const produtos = dadosCache.produtos.filter(p => !removidos.has(p.codigo) && !alterados[p.codigo]);
+        produtos.push(...Object.values(alterados));
+        // Mesma ordem do servidor: ordem, depois descrição
+        produtos.sort((a, b) => (a.ordem - b.ordem) || (a.descricao < b.descricao ? -1 : a.descricao > b.descricao ? 1 : 0));
+
+        dadosCache.produtos = produtos;
+        dadosCache.playlist_final = montarPlaylist(dadosCache);
+        montarPaginas();
+        console.log(`Delta aplicado: ${delta.produtos.length} alterados, ${delta.removidos.length} removidos.`);
     }
 
     // --- CICLO DE EXIBIÇÃO ---
@@ -143,9 +408,10 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
 
-            const totalPaginas = Math.ceil(dadosCache.produtos.length / ITENS_POR_PAGINA);
+            const totalPaginas = paginasProntas.length;
             
             if (temProdutos) {
+                itemAtual = `Tabela, página ${paginaTabelaAtual + 1} de ${totalPaginas}`;
                 renderizarTabela(paginaTabelaAtual);
             } else {
                 elConteudo.innerHTML = "<h2>Aguardando produtos...</h2>";
@@ -193,51 +459,61 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    // --- RENDERIZADOR DA TABELA INTELIGENTE ---
-    function renderizarTabela(pagina) {
-        esconderOverlayVideo(); 
-        elConteudo.classList.add('fade'); 
+    // --- PÁGINAS DA TABELA ---
+    // As páginas são montadas uma vez a cada dado novo (e não a cada volta do
+    // ciclo); trocar de página é só trocar os nós já prontos.
+    let paginasProntas = [];
 
-        setTimeout(() => {
-            elConteudo.innerHTML = ''; 
+    function montarPaginas() {
+        paginasProntas = [];
+        for (let inicio = 0; inicio < dadosCache.produtos.length; inicio += ITENS_POR_PAGINA) {
+            paginasProntas.push(montarPagina(dadosCache.produtos.slice(inicio, inicio + ITENS_POR_PAGINA)));
+        }
+        if (paginaTabelaAtual >= paginasProntas.length) paginaTabelaAtual = 0;
+    }
+
+    function montarPagina(produtosReais) {
+        // LÓGICA DE COLUNAS
+        if (MODO_VERTICAL) {
+            // MODO 1 COLUNA (Vertical)
+            const col = document.createElement('div'); 
+            col.className = 'coluna';
+            col.style.gridTemplateRows = `repeat(${ITENS_POR_PAGINA}, 1fr)`; // Linhas conforme o dispositivo
             
-            const inicio = pagina * ITENS_POR_PAGINA;
-            const fim = inicio + ITENS_POR_PAGINA;
-            const produtosReais = dadosCache.produtos.slice(inicio, fim);
+            produtosReais.forEach(p => col.appendChild(criarItemHTML(p)));
             
-            // LÓGICA DE COLUNAS
-            if (MODO_VERTICAL) {
-                // MODO 1 COLUNA (Vertical)
-                const col = document.createElement('div'); 
-                col.className = 'coluna';
-                
-                produtosReais.forEach(p => col.appendChild(criarItemHTML(p)));
-                
-                // Preenche espaço vazio para manter layout
-                while (col.children.length < ITENS_POR_PAGINA) {
-                    col.appendChild(criarItemVazio());
-                }
-                
-                elConteudo.appendChild(col);
+            // Preenche espaço vazio para manter layout
+            while (col.children.length < ITENS_POR_PAGINA) {
+                col.appendChild(criarItemVazio());
+            }
+            
+            return [col];
+        }
 
-            } else {
-                // MODO 2 COLUNAS (Horizontal)
-                const col1 = document.createElement('div'); col1.className = 'coluna';
-                const col2 = document.createElement('div'); col2.className = 'coluna';
-                const itensPorCol = Math.ceil(ITENS_POR_PAGINA / 2); // 9
-
-                produtosReais.forEach((p, idx) => {
-                    if (idx < itensPorCol) col1.appendChild(criarItemHTML(p));
-                    else col2.appendChild(criarItemHTML(p));
-                });
+        // MODO 2 COLUNAS (Horizontal)
+        const col1 = document.createElement('div'); col1.className = 'coluna';
+        const col2 = document.createElement('div'); col2.className = 'coluna';
+        const itensPorCol = Math.ceil(ITENS_POR_PAGINA / 2); // 9
+        col1.style.gridTemplateRows = col2.style.gridTemplateRows = `repeat(${itensPorCol}, 1fr)`;
 
-                while (col1.children.length < itensPorCol) col1.appendChild(criarItemVazio());
-                while (col2.children.length < itensPorCol) col2.appendChild(criarItemVazio());
+        produtosReais.forEach((p, idx) => {
+            if (idx < itensPorCol) col1.appendChild(criarItemHTML(p));
+            else col2.appendChild(criarItemHTML(p));
+        });
 
-                elConteudo.appendChild(col1);
-                elConteudo.appendChild(col2);
-            }
-            
+        while (col1.children.length < itensPorCol) col1.appendChild(criarItemVazio());
+        while (col2.children.length < itensPorCol) col2.appendChild(criarItemVazio());
+
+        return [col1, col2];
+    }
+
+    // --- RENDERIZADOR DA TABELA INTELIGENTE ---
+    function renderizarTabela(pagina) {
+        esconderOverlayVideo(); 
+        elConteudo.classList.add('fade'); 
+
+        setTimeout(() => {
+            elConteudo.replaceChildren(...(paginasProntas[pagina] || []));
             elConteudo.classList.remove('fade');
         }, 500);
     }
@@ -246,7 +522,7 @@ document.addEventListener('DOMContentLoaded', () => {
         const div = document.createElement('div');
         div.className = `item-produto ${produto.em_oferta ? 'em-oferta' : ''}`;
         
-        const preco = parseFloat(produto.preco).toLocaleString('pt-BR', {style: 'currency', currency: 'BRL'});
+        const preco = produto.preco_exibicao || parseFloat(produto.preco).toLocaleString('pt-BR', {style: 'currency', currency: 'BRL'});
         // Ajuste no marquee: Em vertical temos mais largura (1080px vs 960px), então cabe mais texto antes de rodar
         const limiteChars = MODO_VERTICAL ? 28 : 22;
         const nomeClass = produto.descricao.length > limiteChars ? 'nome-container marquee' : 'nome-container';
@@ -272,16 +548,30 @@ document.addEventListener('DOMContentLoaded', () => {
 
         const isPropaganda = item.tipo === 'propaganda';
         const videoUrl = isPropaganda ? item.url : item.template_video.arquivo_video;
+        itemAtual = `${isPropaganda ? 'Propaganda' : 'Oferta'}: ${item.descricao}`;
 
         const video = document.createElement('video');
         video.id = 'video-bg';
         video.src = videoUrl;
         video.muted = true; video.autoplay = true; video.playsInline = true;
         
-        const duracaoSeguranca = (item.duracao || 15) * 1000 + 2000; 
-        const safetyTimeout = setTimeout(onComplete, duracaoSeguranca);
+        // Rede de segurança caso o 'ended' não venha (vídeo travado). A duração
+        // do payload é medida no servidor; quando o navegador lê os metadados,
+        // usamos a duração exata do arquivo.
+        let safetyTimeout = setTimeout(onComplete, (item.duracao || 15) * 1000 + 2000);
+        video.onloadedmetadata = () => {
+            if (!isFinite(video.duration)) return;
+            clearTimeout(safetyTimeout);
+            safetyTimeout = setTimeout(onComplete, video.duration * 1000 + 2000);
+        };
 
-        video.onerror = () => { clearTimeout(safetyTimeout); onComplete(); };
+        video.onerror = () => {
+            errosVideo++;
+            ultimoErroVideo = `${item.descricao}: código ${video.error ? video.error.code : '?'}`;
+            console.error('Falha ao tocar vídeo', videoUrl, video.error);
+            clearTimeout(safetyTimeout);
+            onComplete();
+        };
         video.onended = () => { clearTimeout(safetyTimeout); onComplete(); };
         elVideoContainer.appendChild(video);
 
@@ -317,7 +607,7 @@ document.addEventListener('DOMContentLoaded', () => {
         const elTit = createEl(item.descricao, template.titulo_top, template.titulo_left, { color: template.titulo_cor }, css['el-titulo']);
         if(elTit) elVideoContainer.appendChild(elTit);
         
-        const precoVal = parseFloat(item.preco).toLocaleString('pt-BR', {style: 'currency', currency: 'BRL'});
+        const precoVal = item.preco_exibicao || parseFloat(item.preco).toLocaleString('pt-BR', {style: 'currency', currency: 'BRL'});
         const elPreco = createEl(precoVal, template.preco_top, template.preco_left, { color: template.preco_cor }, css['el-preco']);
         if(elPreco) elVideoContainer.appendChild(elPreco);
 
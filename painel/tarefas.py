@@ -0,0 +1,320 @@
+"""
+Execução das importações, do processamento de vídeos e da gravação dos
+heartbeats das TVs em segundo plano.
+
+Não depende de broker: a fila é a própria tabela (ImportacaoPlanilha, ou o
+status_processamento dos vídeos). Por padrão cada processo do servidor tem um
+pool com uma thread que recebe os jobs logo após o commit do upload. Com
+PAINEL_IMPORTACAO_EM_THREAD / PAINEL_VIDEOS_EM_THREAD = False eles ficam só no
+banco e são executados pelos comandos `processar_importacoes` e
+`processar_videos`. Os heartbeats ficam no cache; com
+PAINEL_HEARTBEAT_EM_THREAD = False quem grava é o comando `gravar_heartbeats`.
+A publicação estática tem fila própria; sem thread, `publicar_payloads`.
+
+Cada etapa é "reservada" com um UPDATE condicional no status, então a thread e
+o comando podem conviver sem processar o mesmo job duas vezes. Se o processo
+morre no meio de uma etapa, o job fica parado nela: recuperar_importacoes_travadas()
+o devolve à fila depois de PAINEL_IMPORTACAO_TIMEOUT segundos sem progresso
+(recuperar_videos_travados(), o mesmo para os vídeos).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .cache import invalidar_dispositivos
+from .dependencias import dispositivos_do_video
+from .importacao import calcular_alteracoes, importar_planilha, ler_planilha
+from .midia import registrar_midia
+from .models import ImportacaoPlanilha, VideoPropaganda, VideoTemplate
+from .publicacao import publicacao_ativa, publicar
+from .telemetria import gravar_heartbeats
+from .videos import processar_video
+
+logger = logging.getLogger(__name__)
+
+# Quantas linhas de cada tipo de alteração (e de erro) ficam guardadas para a
+# prévia; os totais são guardados à parte
+LIMITE_PREVIA = 50
+
+# Uma thread por fila: a publicação não espera um vídeo longo terminar
+_executores = {}
+
+
+def _obter_executor(fila='tarefas'):
+    if fila not in _executores:
+        _executores[fila] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'painel-{fila}')
+    return _executores[fila]
+
+
+def enfileirar(importacao):
+    """Agenda a próxima etapa da importação para depois do commit."""
+    if getattr(settings, 'PAINEL_IMPORTACAO_EM_THREAD', True):
+        transaction.on_commit(lambda: _obter_executor().submit(_executar_em_thread, executar_importacao, importacao.pk))
+
+
+def _executar_em_thread(funcao, *args):
+    close_old_connections()
+    try:
+        funcao(*args)
+    finally:
+        close_old_connections()
+
+
+def _reservar(importacao_id, status_atual, novo_status):
+    return ImportacaoPlanilha.objects.filter(pk=importacao_id, status=status_atual).update(
+        status=novo_status, atualizado_em=timezone.now()
+    ) == 1
+
+
+# A gravação é uma transação só: o progresso salvo no registro só apareceria
+# no fim. Ele vai para o cache, (linhas gravadas, horário), e vale também como
+# sinal de vida para recuperar_importacoes_travadas().
+def chave_progresso_gravacao(importacao_id):
+    return f'painel:importacao:{importacao_id}:gravacao'
+
+
+def progresso_gravacao(importacao):
+    """Linhas já gravadas de uma importação em GRAVANDO, ou None."""
+    progresso = cache.get(chave_progresso_gravacao(importacao.pk))
+    return progresso[0] if progresso else None
+
+
+def _tempo_limite():
+    return timedelta(seconds=getattr(settings, 'PAINEL_IMPORTACAO_TIMEOUT', 900))
+
+
+def executar_importacao(importacao_id):
+    """
+    Executa a etapa pendente da importação (análise ou gravação).
+    Retorna False se não havia nada a fazer (ou outro processo já pegou).
+    """
+    if _reservar(importacao_id, ImportacaoPlanilha.PENDENTE, ImportacaoPlanilha.ANALISANDO):
+        etapa = _analisar
+    elif _reservar(importacao_id, ImportacaoPlanilha.CONFIRMADA, ImportacaoPlanilha.GRAVANDO):
+        etapa = _gravar
+    else:
+        return False
+
+    importacao = ImportacaoPlanilha.objects.get(pk=importacao_id)
+    try:
+        etapa(importacao)
+    except Exception as e:
+        logger.exception("Falha na importação #%s", importacao_id)
+        importacao.status = ImportacaoPlanilha.ERRO
+        importacao.mensagem = str(e)
+        importacao.finalizado_em = timezone.now()
+        importacao.save(update_fields=['status', 'mensagem', 'finalizado_em'])
+    return True
+
+
+def _analisar(importacao):
+    def progresso(linhas):
+        importacao.linhas_lidas = importacao.linhas_processadas = linhas
+        importacao.save(update_fields=['linhas_lidas', 'linhas_processadas', 'atualizado_em'])
+
+    with importacao.arquivo.open('rb') as arquivo:
+        lotes = ler_planilha(arquivo, importacao.arquivo.name)
+        plano = calcular_alteracoes(lotes, progresso, limite=LIMITE_PREVIA)
+
+    importacao.linhas_lidas = importacao.linhas_processadas = plano.linhas_lidas
+    importacao.linhas_com_erro = plano.ignorados
+    importacao.erros = plano.erros
+    importacao.previa = plano.previa()
+    importacao.status = ImportacaoPlanilha.AGUARDANDO_CONFIRMACAO
+    importacao.save()
+
+
+def _gravar(importacao):
+    chave = chave_progresso_gravacao(importacao.pk)
+    importacao.linhas_processadas = 0
+    importacao.save(update_fields=['linhas_processadas', 'atualizado_em'])
+
+    def progresso(linhas):
+        importacao.linhas_processadas = linhas
+        cache.set(chave, (linhas, timezone.now()), _tempo_limite().total_seconds())
+
+    # Compara de novo na hora de gravar: o banco pode ter mudado desde a prévia
+    with importacao.arquivo.open('rb') as arquivo:
+        resultado = importar_planilha(arquivo, importacao.arquivo.name, progresso)
+    cache.delete(chave)
+
+    importacao.status = ImportacaoPlanilha.CONCLUIDA
+    importacao.mensagem = (
+        f"{resultado.criados} criados, {resultado.atualizados} atualizados, {resultado.ignorados} ignorados."
+    )
+    importacao.finalizado_em = timezone.now()
+    importacao.save()
+
+
+def recuperar_importacoes_travadas():
+    """
+    Devolve à fila as importações paradas em ANALISANDO ou GRAVANDO sem sinal
+    de vida há mais de PAINEL_IMPORTACAO_TIMEOUT segundos: o processo morreu
+    no meio da etapa. Refazer é seguro, a análise não grava nada e a gravação
+    é uma transação só (foi desfeita). Depois de PAINEL_IMPORTACAO_RETOMADAS
+    retomadas a importação vai para ERRO. Retorna quantas foram recuperadas.
+    """
+    agora = timezone.now()
+    limite = agora - _tempo_limite()
+    travadas = ImportacaoPlanilha.objects.filter(
+        status__in=[ImportacaoPlanilha.ANALISANDO, ImportacaoPlanilha.GRAVANDO], atualizado_em__lt=limite,
+    )
+
+    recuperadas = 0
+    for importacao in travadas:
+        progresso = cache.get(chave_progresso_gravacao(importacao.pk))
+        if progresso and progresso[1] >= limite:
+            continue  # Gravação em andamento
+
+        # Condicional: outro processo pode ter recuperado ou avançado o job
+        mesma = ImportacaoPlanilha.objects.filter(
+            pk=importacao.pk, status=importacao.status, atualizado_em=importacao.atualizado_em,
+        )
+        if importacao.retomadas >= getattr(settings, 'PAINEL_IMPORTACAO_RETOMADAS', 2):
+            if mesma.update(
+                status=ImportacaoPlanilha.ERRO, finalizado_em=agora, atualizado_em=agora,
+                mensagem="A importação foi interrompida várias vezes no meio. Envie a planilha de novo.",
+            ):
+                logger.error("Importação #%s travada em %s: desistindo", importacao.pk, importacao.status)
+                recuperadas += 1
+            continue
+
+        novo_status = (
+            ImportacaoPlanilha.PENDENTE if importacao.status == ImportacaoPlanilha.ANALISANDO
+            else ImportacaoPlanilha.CONFIRMADA
+        )
+        if mesma.update(status=novo_status, retomadas=F('retomadas') + 1, atualizado_em=agora):
+            logger.warning("Importação #%s travada em %s: de volta à fila", importacao.pk, importacao.status)
+            enfileirar(importacao)
+            recuperadas += 1
+    return recuperadas
+
+
+def proxima_importacao():
+    """Id da importação mais antiga esperando alguma etapa (usado pelo comando)."""
+    recuperar_importacoes_travadas()
+    return (
+        ImportacaoPlanilha.objects
+        .filter(status__in=[ImportacaoPlanilha.PENDENTE, ImportacaoPlanilha.CONFIRMADA])
+        .order_by('created_at')
+        .values_list('pk', flat=True)
+        .first()
+    )
+
+
+# --- VÍDEOS (ver painel/videos.py) ---
+MODELOS_VIDEO = (VideoTemplate, VideoPropaganda)
+
+
+def enfileirar_video(video):
+    """Agenda o processamento do vídeo para depois do commit."""
+    if getattr(settings, 'PAINEL_VIDEOS_EM_THREAD', True):
+        transaction.on_commit(lambda: _obter_executor().submit(_executar_em_thread, executar_video, type(video), video.pk))
+
+
+def executar_video(modelo, video_id):
+    """
+    Processa o vídeo se ele estiver PENDENTE.
+    Retorna False se não havia nada a fazer (ou outro processo já pegou).
+    """
+    if not modelo.objects.filter(pk=video_id, status_processamento=modelo.PENDENTE).update(
+            status_processamento=modelo.PROCESSANDO, processando_desde=timezone.now()):
+        return False
+
+    video = modelo.objects.get(pk=video_id)
+    anterior = video.video_processado.name
+    try:
+        campos = processar_video(video)
+    except Exception as e:
+        logger.exception("Falha ao processar o vídeo %s #%s", modelo.__name__, video_id)
+        modelo.objects.filter(pk=video_id, status_processamento=modelo.PROCESSANDO).update(
+            status_processamento=modelo.ERRO, erro_processamento=str(e)
+        )
+        return True
+
+    # Só grava se o arquivo não foi trocado enquanto processávamos (o upload
+    # novo já deixou o vídeo PENDENTE de novo)
+    gravado = modelo.objects.filter(
+        pk=video_id, status_processamento=modelo.PROCESSANDO, arquivo_video=campos['processado_de']
+    ).update(status_processamento=modelo.PRONTO, erro_processamento='', **campos)
+
+    storage = video.video_processado.storage
+    if not gravado:
+        if campos['video_processado']:
+            storage.delete(campos['video_processado'])
+        return True
+
+    if anterior and anterior != campos['video_processado']:
+        storage.delete(anterior)
+    registrar_midia(campos['video_processado'])
+    # update() não dispara os signals: avisa as TVs que exibem o vídeo
+    # da URL e duração novas
+    invalidar_dispositivos(dispositivos_do_video(video))
+    return True
+
+
+def recuperar_videos_travados():
+    """
+    Devolve à fila (PENDENTE) os vídeos parados em PROCESSANDO há mais que o
+    dobro de PAINEL_VIDEO_TIMEOUT (o limite do ffmpeg): o processo que os
+    pegou morreu. Depois de PAINEL_VIDEO_RETOMADAS retomadas o vídeo vai para
+    ERRO e as TVs seguem com o original. Retorna quantos foram recuperados.
+    """
+    limite = timezone.now() - 2 * timedelta(seconds=getattr(settings, 'PAINEL_VIDEO_TIMEOUT', 1800))
+    recuperados = 0
+    for modelo in MODELOS_VIDEO:
+        travados = modelo.objects.filter(status_processamento=modelo.PROCESSANDO).filter(
+            Q(processando_desde__lt=limite) | Q(processando_desde__isnull=True)
+        )
+        for video in travados:
+            # Condicional: outro processo pode ter recuperado ou terminado o vídeo
+            mesmo = modelo.objects.filter(
+                pk=video.pk, status_processamento=modelo.PROCESSANDO, processando_desde=video.processando_desde,
+            )
+            if video.retomadas >= getattr(settings, 'PAINEL_VIDEO_RETOMADAS', 2):
+                if mesmo.update(
+                    status_processamento=modelo.ERRO,
+                    erro_processamento="O processamento foi interrompido várias vezes no meio.",
+                ):
+                    logger.error("%s #%s travado no processamento: desistindo", modelo.__name__, video.pk)
+                    recuperados += 1
+                continue
+
+            if mesmo.update(status_processamento=modelo.PENDENTE, retomadas=F('retomadas') + 1):
+                logger.warning("%s #%s travado no processamento: de volta à fila", modelo.__name__, video.pk)
+                enfileirar_video(video)
+                recuperados += 1
+    return recuperados
+
+
+def proximo_video():
+    """(modelo, id) do primeiro vídeo PENDENTE, ou None (usado pelo comando)."""
+    recuperar_videos_travados()
+    for modelo in MODELOS_VIDEO:
+        video_id = modelo.objects.filter(status_processamento=modelo.PENDENTE).values_list('pk', flat=True).first()
+        if video_id is not None:
+            return modelo, video_id
+    return None
+
+
+# --- HEARTBEATS (ver painel/telemetria.py) ---
+
+def enfileirar_gravacao_heartbeats():
+    """Agenda a gravação em lote dos heartbeats guardados no cache."""
+    if getattr(settings, 'PAINEL_HEARTBEAT_EM_THREAD', True):
+        # Fila própria: não espera atrás de importações e vídeos
+        _obter_executor('heartbeats').submit(_executar_em_thread, gravar_heartbeats)
+
+
+# --- PUBLICAÇÃO ESTÁTICA (ver painel/publicacao.py) ---
+
+def enfileirar_publicacao(uuids):
+    """Republica as TVs afetadas (None = todas). Chamado já depois do commit."""
+    if publicacao_ativa() and getattr(settings, 'PAINEL_PUBLICACAO_EM_THREAD', True):
+        _obter_executor('publicacao').submit(_executar_em_thread, publicar, uuids)
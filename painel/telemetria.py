@@ -0,0 +1,73 @@
+"""
+Heartbeat das TVs (api/painel/<uuid>/heartbeat/).
+
+Cada TV manda, a cada minuto, a versão do payload que está na tela, o item em
+exibição, os erros de vídeo e há quanto tempo está ligada. O request só guarda
+o último heartbeat do dispositivo no cache (sem tocar no banco); de tempos em
+tempos (PAINEL_HEARTBEAT_GRAVACAO segundos) um job em segundo plano lê todos
+os pendentes e grava em StatusDispositivo numa única consulta (upsert).
+
+Com o cache compartilhado entre os processos (Redis/Memcached) a gravação é
+feita por um processo só; com LocMemCache, cada processo grava os seus.
+Um heartbeat que chegue bem no meio da gravação pode se perder; o próximo
+chega um minuto depois.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Dispositivo, StatusDispositivo
+
+CHAVE_GRAVACAO = 'painel:heartbeat:gravacao'
+
+CAMPOS_STATUS = ['ultimo_contato', 'versao_payload', 'item_atual', 'erros_video', 'ultimo_erro',
+                 'tempo_ligada', 'endereco_ip']
+
+
+def chave_heartbeat(device_uuid):
+    return f'painel:heartbeat:{device_uuid}'
+
+
+def _intervalo_gravacao():
+    return getattr(settings, 'PAINEL_HEARTBEAT_GRAVACAO', 30)
+
+
+def registrar_heartbeat(device_uuid, dados):
+    """
+    Guarda o heartbeat no cache. Retorna True quando é a vez deste request
+    agendar a gravação em lote (no máximo uma por intervalo).
+    """
+    dados = {**dados, 'ultimo_contato': timezone.now()}
+    # Sobrevive a alguns intervalos sem gravação (worker reiniciando etc.)
+    cache.set(chave_heartbeat(device_uuid), dados, _intervalo_gravacao() * 20)
+    return cache.add(CHAVE_GRAVACAO, True, _intervalo_gravacao())
+
+
+async def aregistrar_heartbeat(device_uuid, dados):
+    """registrar_heartbeat para a view assíncrona (views_api_async)."""
+    dados = {**dados, 'ultimo_contato': timezone.now()}
+    await cache.aset(chave_heartbeat(device_uuid), dados, _intervalo_gravacao() * 20)
+    return await cache.aadd(CHAVE_GRAVACAO, True, _intervalo_gravacao())
+
+
+def gravar_heartbeats():
+    """Grava no banco os heartbeats pendentes no cache. Retorna quantos gravou."""
+    chaves = {chave_heartbeat(u): pk for u, pk in Dispositivo.objects.values_list('uuid', 'pk')}
+    pendentes = cache.get_many(chaves)
+    if not pendentes:
+        return 0
+    cache.delete_many(pendentes.keys())
+
+    StatusDispositivo.objects.bulk_create(
+        [StatusDispositivo(dispositivo_id=chaves[chave], **dados) for chave, dados in pendentes.items()],
+        update_conflicts=True, unique_fields=['dispositivo'], update_fields=CAMPOS_STATUS,
+    )
+    return len(pendentes)
+
+
+def online(status):
+    """A TV mandou heartbeat há pouco tempo (PAINEL_HEARTBEAT_OFFLINE segundos)?"""
+    if status is None:
+        return False
+    limite = getattr(settings, 'PAINEL_HEARTBEAT_OFFLINE', 180)
+    return (timezone.now() - status.ultimo_contato).total_seconds() <= limite
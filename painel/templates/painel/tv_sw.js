@@ -0,0 +1,137 @@
+{% load static %}// Service Worker do player da TV (servido por painel.views.tv_service_worker_view).
+//
+// - Mídias (vídeos e imagens): a página manda a lista de URLs do payload atual
+//   (mensagem 'midias'); baixamos o que falta para o Cache Storage, uma de cada
+//   vez, e apagamos o que saiu da playlist. O player passa a tocar do cache.
+// - Tela da TV (HTML/CSS/JS): rede primeiro, cache se a rede cair.
+// - API: nunca passa pelo cache aqui; o último payload bom é guardado pela
+//   própria página (ver guardarParaOffline em tv_app.js).
+
+const CACHE_APP = 'painel-app-v1';
+const CACHE_MIDIA = 'painel-midia-v1';
+
+const ARQUIVOS_APP = [
+    '{% url "tv_display" %}',
+    '{% static "css/painel.css" %}',
+    '{% static "js/tv_app.js" %}',
+];
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(
+        caches.open(CACHE_APP)
+            .then(cache => cache.addAll(ARQUIVOS_APP))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', (event) => {
+    const atuais = [CACHE_APP, CACHE_MIDIA];
+    event.waitUntil(
+        caches.keys()
+            .then(nomes => Promise.all(nomes.filter(n => !atuais.includes(n)).map(n => caches.delete(n))))
+            .then(() => self.clients.claim())
+    );
+});
+
+// --- MÍDIAS ---
+let sincronizacao = Promise.resolve();
+
+self.addEventListener('message', (event) => {
+    if (!event.data || event.data.tipo !== 'midias') return;
+    const urls = event.data.urls.map(u => new URL(u, self.location).href);
+    // Uma sincronização por vez: a mais nova espera a anterior terminar
+    sincronizacao = sincronizacao.then(() => sincronizarMidias(urls)).catch(e => console.error(e));
+    event.waitUntil(sincronizacao);
+});
+
+async function sincronizarMidias(urls) {
+    const cache = await caches.open(CACHE_MIDIA);
+    const desejadas = new Set(urls);
+
+    // Remove o que não está mais na playlist
+    for (const request of await cache.keys()) {
+        if (!desejadas.has(request.url)) await cache.delete(request);
+    }
+
+    // Baixa em sequência para não disputar o link da loja com o vídeo tocando
+    for (const url of desejadas) {
+        if (await cache.match(url)) continue;
+        try {
+            const response = await baixarMidia(url);
+            if (response.ok || response.type === 'opaque') await cache.put(url, response);
+        } catch (e) {
+            console.warn('Falha ao baixar mídia', url, e);
+        }
+    }
+}
+
+async function baixarMidia(url) {
+    try {
+        return await fetch(url, { mode: 'cors', credentials: 'omit' });
+    } catch (e) {
+        // CDN sem CORS: guarda a resposta opaca (toca, mas sem Range)
+        return fetch(url, { mode: 'no-cors', credentials: 'omit' });
+    }
+}
+
+// O <video> pede pedaços (Range); respondemos 206 a partir do arquivo em cache
+async function responderRange(request, response) {
+    const range = request.headers.get('Range');
+    if (!range || response.type === 'opaque') return response;
+
+    const corpo = await response.blob();
+    const [, inicioTxt, fimTxt] = /bytes=(\d*)-(\d*)/.exec(range) || [];
+    let inicio = inicioTxt ? parseInt(inicioTxt, 10) : 0;
+    let fim = fimTxt ? parseInt(fimTxt, 10) : corpo.size - 1;
+    if (!inicioTxt && fimTxt) {
+        // "bytes=-500" = últimos 500 bytes
+        inicio = Math.max(corpo.size - parseInt(fimTxt, 10), 0);
+        fim = corpo.size - 1;
+    }
+    fim = Math.min(fim, corpo.size - 1);
+
+    if (inicio >= corpo.size || inicio > fim) {
+        return new Response(null, { status: 416, headers: { 'Content-Range': `bytes */${corpo.size}` } });
+    }
+
+    return new Response(corpo.slice(inicio, fim + 1), {
+        status: 206,
+        headers: {
+            'Content-Type': response.headers.get('Content-Type') || 'application/octet-stream',
+            'Content-Range': `bytes ${inicio}-${fim}/${corpo.size}`,
+            'Content-Length': String(fim - inicio + 1),
+            'Accept-Ranges': 'bytes',
+        },
+    });
+}
+
+// --- INTERCEPTAÇÃO ---
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+
+    const url = new URL(request.url);
+    if (url.origin === self.location.origin && url.pathname.startsWith('/api/')) return;
+
+    event.respondWith((async () => {
+        const midia = await caches.match(request.url, { cacheName: CACHE_MIDIA });
+        if (midia) return responderRange(request, midia);
+
+        if (ARQUIVOS_APP.includes(url.pathname) || request.mode === 'navigate') {
+            try {
+                const response = await fetch(request);
+                if (response.ok) {
+                    const copia = response.clone();
+                    caches.open(CACHE_APP).then(cache => cache.put(request, copia));
+                }
+                return response;
+            } catch (e) {
+                const salvo = await caches.match(request, { cacheName: CACHE_APP });
+                if (salvo) return salvo;
+                throw e;
+            }
+        }
+
+        return fetch(request);
+    })());
+});
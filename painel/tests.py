@@ -1,3 +1,1069 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from .checks import verificar_cache_compartilhado
+from .delta import formatar_versao
+from .imagens import TAMANHOS
+from .importacao import COLUNAS_ESPERADAS, calcular_alteracoes, importar_planilha, ler_planilha, resolver_familias
+from .metricas import registro
+from .models import (
+    ArquivoMidia, Dispositivo, FamiliaProduto, ImportacaoPlanilha, Produto, StatusDispositivo, VideoPropaganda,
+    VideoTemplate,
+)
+from .publicacao import nome_payload, nome_ponteiro, publicar
+from .tarefas import (
+    chave_progresso_gravacao, executar_importacao, executar_video, proxima_importacao, proximo_video,
+    recuperar_importacoes_travadas,
+)
+from .telemetria import gravar_heartbeats
+from .videos import FFmpeg
+from . import views_api_async
+
+
+class PainelTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        # Vídeos são processados só quando o teste chama executar_video();
+        # estáticos sem manifest (os testes não rodam o collectstatic)
+        media = self.settings(
+            MEDIA_ROOT=media_root, PAINEL_VIDEOS_EM_THREAD=False,
+            PAINEL_METRICAS_AMOSTRAGEM=0, PAINEL_METRICAS_LENTO_MS=60000, PAINEL_HEARTBEAT_EM_THREAD=False,
+            PAINEL_PUBLICACAO_EM_THREAD=False,
+            STORAGES={**settings.STORAGES, 'staticfiles': {
+                'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'
+            }},
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.familia = FamiliaProduto.objects.create(nome='BOVINOS')
+        self.dispositivo = Dispositivo.objects.create(nome='TV do Açougue')
+
+    def criar_produto(self, codigo, **kwargs):
+        dados = {'descricao': f'PRODUTO {codigo}', 'preco': Decimal('10.00'), 'familia': self.familia}
+        dados.update(kwargs)
+        return Produto.objects.create(codigo=codigo, **dados)
+
+    def url_painel(self, dispositivo=None):
+        return reverse('api_dados_painel', args=[(dispositivo or self.dispositivo).uuid])
+
+    def video(self, nome='a.mp4'):
+        return SimpleUploadedFile(nome, b'video de teste')
+
+    def planilha(self, linhas):
+        df = pd.DataFrame(linhas, columns=COLUNAS_ESPERADAS)
+        arquivo = io.BytesIO()
+        df.to_excel(arquivo, index=False)
+        arquivo.seek(0)
+        return arquivo
+
+
+class CachePayloadTests(PainelTestCase):
+    def test_consulta_repetida_nao_toca_no_banco(self):
+        self.criar_produto('1')
+        self.client.get(self.url_painel())
+
+        with self.assertNumQueries(0):
+            resposta = self.client.get(self.url_painel())
+        self.assertEqual(len(resposta.json()['produtos']), 1)
+
+    def test_salvar_produto_invalida_payload(self):
+        produto = self.criar_produto('1')
+        self.client.get(self.url_painel())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            produto.preco = Decimal('12.90')
+            produto.save()
+
+        dados = self.client.get(self.url_painel()).json()
+        self.assertEqual(dados['produtos'][0]['preco'], '12.90')
+
+    def test_check_avisa_cache_por_processo(self):
+        self.assertEqual([aviso.id for aviso in verificar_cache_compartilhado(None)], ['painel.W001'])
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                               'LOCATION': 'painel_cache'}}):
+            self.assertEqual(verificar_cache_compartilhado(None), [])
+
+    def test_propaganda_vinculada_invalida_payload(self):
+        self.client.get(self.url_painel())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            propaganda = VideoPropaganda.objects.create(descricao='Institucional', arquivo_video=self.video())
+            self.dispositivo.exibir_propagandas.add(propaganda)
+
+        dados = self.client.get(self.url_painel()).json()
+        self.assertEqual([item['descricao'] for item in dados['playlist_final']], ['Institucional'])
+
+    def test_dispositivo_inexistente(self):
+        uuid = self.dispositivo.uuid
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dispositivo.delete()
+
+        resposta = self.client.get(reverse('api_dados_painel', args=[uuid]))
+        self.assertEqual(resposta.status_code, 404)
+
+
+class IndiceReversoTests(PainelTestCase):
+    def setUp(self):
+        super().setUp()
+        self.aves = FamiliaProduto.objects.create(nome='AVES')
+        self.tv_bovinos = Dispositivo.objects.create(nome='TV Bovinos')
+        self.tv_bovinos.exibir_apenas_familias.add(self.familia)
+        self.tv_aves = Dispositivo.objects.create(nome='TV Aves')
+        self.tv_aves.exibir_apenas_familias.add(self.aves)
+        self.picanha = self.criar_produto('1', descricao='PICANHA')
+        self.criar_produto('2', descricao='FRANGO', familia=self.aves)
+
+    def descricoes(self, dispositivo):
+        return [p['descricao'] for p in self.client.get(self.url_painel(dispositivo)).json()['produtos']]
+
+    def test_preco_invalida_so_as_tvs_da_familia(self):
+        for dispositivo in (self.dispositivo, self.tv_bovinos, self.tv_aves):
+            self.client.get(self.url_painel(dispositivo))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.picanha.preco = Decimal('59.90')
+            self.picanha.save()
+
+        with self.assertNumQueries(0):
+            self.client.get(self.url_painel(self.tv_aves))
+        for dispositivo in (self.dispositivo, self.tv_bovinos):
+            dados = self.client.get(self.url_painel(dispositivo)).json()
+            self.assertIn('59.90', [p['preco'] for p in dados['produtos']])
+
+    def test_produto_que_muda_de_familia(self):
+        self.assertEqual(self.descricoes(self.tv_bovinos), ['PICANHA'])
+        self.assertEqual(self.descricoes(self.tv_aves), ['FRANGO'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.picanha.familia = self.aves
+            self.picanha.save()
+
+        self.assertEqual(self.descricoes(self.tv_bovinos), [])
+        self.assertEqual(self.descricoes(self.tv_aves), ['FRANGO', 'PICANHA'])
+
+    def test_selecao_alterada_pelo_lado_da_familia(self):
+        self.assertEqual(self.descricoes(self.tv_bovinos), ['PICANHA'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.familia.dispositivo_set.clear()
+        # Sem filtro, a TV passa a exibir o catálogo inteiro...
+        self.assertEqual(self.descricoes(self.tv_bovinos), ['FRANGO', 'PICANHA'])
+
+        # ...e o índice já sabe disso
+        with self.captureOnCommitCallbacks(execute=True):
+            self.criar_produto('3', descricao='OVOS', familia=self.aves)
+        self.assertEqual(self.descricoes(self.tv_bovinos), ['FRANGO', 'OVOS', 'PICANHA'])
+
+
+class PayloadCompartilhadoTests(PainelTestCase):
+    def setUp(self):
+        super().setUp()
+        for codigo in range(50):
+            self.criar_produto(str(codigo))
+        self.gondola = Dispositivo.objects.create(nome='TV Gôndola')
+
+    def test_tvs_configuradas_igual_usam_a_mesma_montagem(self):
+        self.client.get(self.url_painel())
+
+        # Só a entrada da TV (dispositivo + seleções): os produtos já estão montados
+        with self.assertNumQueries(3):
+            resposta = self.client.get(self.url_painel(self.gondola), HTTP_ACCEPT_ENCODING='gzip')
+        dados = json.loads(gzip.decompress(resposta.content))
+        self.assertEqual((dados['config']['nome'], dados['config']['uuid']), ('TV Gôndola', str(self.gondola.uuid)))
+        self.assertEqual(len(dados['produtos']), 50)
+        self.assertNotEqual(resposta['ETag'], self.client.get(self.url_painel(), HTTP_ACCEPT_ENCODING='gzip')['ETag'])
+
+    @unittest.skipUnless(brotli, 'brotli não instalado')
+    def test_brotli_emendado_decodifica_igual_ao_json(self):
+        for dispositivo in (self.dispositivo, self.gondola):
+            resposta = self.client.get(self.url_painel(dispositivo), HTTP_ACCEPT_ENCODING='br')
+            self.assertEqual(resposta['Content-Encoding'], 'br')
+            self.assertEqual(brotli.decompress(resposta.content), self.client.get(self.url_painel(dispositivo)).content)
+
+    def test_mudar_uma_tv_nao_remonta_as_outras(self):
+        self.client.get(self.url_painel())
+        self.client.get(self.url_painel(self.gondola))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gondola.nome = 'Gôndola 2'
+            self.gondola.modo_exibicao = 'MISTO'
+            self.gondola.save()
+
+        with self.assertNumQueries(0):
+            self.client.get(self.url_painel())
+        config = self.client.get(self.url_painel(self.gondola)).json()['config']
+        self.assertEqual((config['nome'], config['modo_exibicao']), ('Gôndola 2', 'MISTO'))
+
+    def test_voltar_a_configuracao_sem_uso_nao_traz_payload_velho(self):
+        outra = FamiliaProduto.objects.create(nome='SUINOS')
+        self.client.get(self.url_painel())
+
+        # Com o filtro, a configuração anterior fica sem nenhuma TV...
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gondola.delete()
+            self.dispositivo.exibir_apenas_familias.add(outra)
+        with self.captureOnCommitCallbacks(execute=True):
+            produto = Produto.objects.get(codigo='0')
+            produto.preco = Decimal('99.00')
+            produto.save()
+        # ... e volta a ser usada quando o filtro sai
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dispositivo.exibir_apenas_familias.clear()
+
+        produtos = {p['codigo']: p['preco'] for p in self.client.get(self.url_painel()).json()['produtos']}
+        self.assertEqual(produtos['0'], '99.00')
+
+
+class EtagPayloadTests(PainelTestCase):
+    def test_if_none_match_responde_304(self):
+        self.criar_produto('1')
+        resposta = self.client.get(self.url_painel())
+        etag = resposta['ETag']
+
+        resposta = self.client.get(self.url_painel(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 304)
+        self.assertEqual(resposta.content, b'')
+
+    def test_etag_muda_quando_payload_muda(self):
+        produto = self.criar_produto('1')
+        etag = self.client.get(self.url_painel())['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            produto.preco = Decimal('9.99')
+            produto.save()
+
+        resposta = self.client.get(self.url_painel(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+
+
+class ConsultasPayloadTests(PainelTestCase):
+    """
+    O número de consultas para montar o payload não pode crescer com o
+    número de produtos (N+1 no serializer).
+    """
+
+    def contar_consultas_montagem(self, quantidade):
+        template = VideoTemplate.objects.create(nome='Oferta', arquivo_video=self.video())
+        Produto.objects.all().delete()
+        Produto.objects.bulk_create([
+            Produto(codigo=str(i), descricao=f'PRODUTO {i}', preco=Decimal('1.00'), familia=self.familia,
+                    template_video=template if i % 10 == 0 else None)
+            for i in range(quantidade)
+        ])
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(self.url_painel())
+        self.assertEqual(len(resposta.json()['produtos']), quantidade)
+        return len(consultas)
+
+    def test_consultas_constantes(self):
+        contagens = {n: self.contar_consultas_montagem(n) for n in (10, 1000, 10000)}
+        self.assertEqual(len(set(contagens.values())), 1, contagens)
+
+    def test_consulta_do_painel_usa_indice_parcial(self):
+        Produto.objects.bulk_create([
+            Produto(codigo=str(i), descricao=f'PRODUTO {i}', preco=Decimal('1.00'), familia=self.familia,
+                    exibir_no_painel=i % 2 == 0)
+            for i in range(500)
+        ])
+        ativos = Produto.objects.filter(exibir_no_painel=True)
+        self.assertIn('produto_painel_ordem_idx', ativos.order_by('ordem', 'descricao').explain())
+        plano = ativos.filter(familia_id__in=[self.familia.pk]).order_by('ordem', 'descricao').explain()
+        self.assertIn('produto_painel_familia_idx', plano)
+
+
+class FormatoCompactoTests(PainelTestCase):
+    def test_template_enviado_uma_vez(self):
+        template = VideoTemplate.objects.create(nome='Oferta', arquivo_video=self.video())
+        for codigo in ('1', '2', '3'):
+            self.criar_produto(codigo, template_video=template)
+
+        dados = self.client.get(self.url_painel(), {'format': 'compacto'}).json()
+
+        self.assertEqual(list(dados['templates']), [str(template.id)])
+        self.assertEqual({p['template_video'] for p in dados['produtos']}, {template.id})
+        self.assertEqual(dados['playlist_final'][0]['template_video'], template.id)
+        self.assertNotIn('descricao', dados['playlist_final'][0])
+
+    def test_negociacao_pelo_accept(self):
+        resposta = self.client.get(self.url_painel(), HTTP_ACCEPT='application/vnd.painel.compacto+json')
+        self.assertIn('templates', resposta.json())
+
+        resposta = self.client.get(self.url_painel())
+        self.assertNotIn('templates', resposta.json())
+
+
+class FormatoColunarTests(PainelTestCase):
+    def test_produtos_em_colunas(self):
+        self.criar_produto('1', descricao='PICANHA', preco=Decimal('59.90'), em_oferta=True)
+        outra = FamiliaProduto.objects.create(nome='SUÍNOS')
+        self.criar_produto('2', descricao='PERNIL', preco=Decimal('19.99'), familia=outra)
+        self.criar_produto('3', descricao='ACÉM', preco=Decimal('1234.00'))
+
+        produtos = self.client.get(self.url_painel(), {'format': 'colunar'}).json()['produtos']
+        self.assertEqual(produtos['total'], 3)
+        self.assertEqual(produtos['codigo'], ['3', '2', '1'])
+        self.assertEqual(produtos['preco_centavos'], [123400, 1999, 5990])
+        self.assertEqual(produtos['familias'], ['BOVINOS', 'SUÍNOS'])
+        self.assertEqual(produtos['familia'], [0, 1, 0])
+        self.assertEqual(produtos['em_oferta'], [0, 0, 1])
+
+    def test_resposta_comprimida_no_cache(self):
+        for codigo in range(50):
+            self.criar_produto(str(codigo))
+
+        resposta = self.client.get(self.url_painel(), {'format': 'colunar'}, HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(resposta['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', resposta['Vary'])
+        self.assertTrue(resposta['ETag'].startswith('W/"'))
+        self.assertEqual(json.loads(gzip.decompress(resposta.content))['produtos']['total'], 50)
+
+        resposta = self.client.get(self.url_painel(), {'format': 'colunar'},
+                                   HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=resposta['ETag'])
+        self.assertEqual(resposta.status_code, 304)
+
+        resposta = self.client.get(self.url_painel(), {'format': 'colunar'})
+        self.assertFalse(resposta.has_header('Content-Encoding'))
+
+
+class FiltroFamiliasTests(PainelTestCase):
+    def test_tv_recebe_so_as_familias_selecionadas(self):
+        padaria = FamiliaProduto.objects.create(nome='PADARIA')
+        self.criar_produto('1')
+        self.criar_produto('2', familia=padaria)
+        self.dispositivo.exibir_apenas_familias.add(self.familia)
+
+        dados = self.client.get(self.url_painel()).json()
+        self.assertEqual([p['codigo'] for p in dados['produtos']], ['1'])
+
+    def test_sem_selecao_recebe_catalogo_inteiro_em_ordem(self):
+        padaria = FamiliaProduto.objects.create(nome='PADARIA')
+        self.criar_produto('1', ordem=2)
+        self.criar_produto('2', familia=padaria, ordem=1)
+
+        dados = self.client.get(self.url_painel()).json()
+        self.assertEqual([p['codigo'] for p in dados['produtos']], ['2', '1'])
+
+
+class ImportacaoPlanilhaTests(PainelTestCase):
+    def test_cria_atualiza_e_ignora(self):
+        self.criar_produto('100', preco=Decimal('5.00'))
+        arquivo = self.planilha([
+            ['100', 'PICANHA', 'R$ 1.234,56', 'bovinos'],
+            ['200', 'PAO FRANCES', '12,90', 'padaria'],
+            ['300', 'SEM PRECO', 'consulte', 'padaria'],
+        ])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = importar_planilha(arquivo)
+
+        self.assertEqual(resultado, (1, 1, 1))
+        self.assertEqual(Produto.objects.get(codigo='100').preco, Decimal('1234.56'))
+        novo = Produto.objects.get(codigo='200')
+        self.assertEqual((novo.preco, novo.familia.nome), (Decimal('12.90'), 'PADARIA'))
+
+    def test_reimportar_mesma_planilha_nao_grava(self):
+        linhas = [['100', 'PICANHA', '59,90', 'BOVINOS']]
+        importar_planilha(self.planilha(linhas))
+        atualizado_em = Produto.objects.get(codigo='100').updated_at
+
+        resultado = importar_planilha(self.planilha(linhas))
+
+        self.assertEqual(resultado, (0, 0, 0))
+        self.assertEqual(Produto.objects.get(codigo='100').updated_at, atualizado_em)
+
+    def test_previa_classifica_alteracoes(self):
+        padaria = FamiliaProduto.objects.create(nome='PADARIA')
+        self.criar_produto('1', descricao='ALCATRA', preco=Decimal('40.00'))
+        self.criar_produto('2', descricao='COSTELA', preco=Decimal('30.00'))
+        self.criar_produto('3', descricao='PAO', familia=padaria)
+        self.criar_produto('4', descricao='FORA DA PLANILHA')
+
+        plano = calcular_alteracoes(ler_planilha(self.planilha([
+            ['1', 'ALCATRA', '42,00', 'BOVINOS'],
+            ['2', 'COSTELA JANELA', '30,00', 'BOVINOS'],
+            ['3', 'PAO', '10,00', 'BOVINOS'],
+            ['5', 'MAMINHA', '50,00', 'BOVINOS'],
+        ])))
+
+        self.assertEqual([i['codigo'] for i in plano.precos], ['1'])
+        self.assertEqual([i['codigo'] for i in plano.renomeados], ['2'])
+        self.assertEqual([i['codigo'] for i in plano.familias], ['3'])
+        self.assertEqual([i['codigo'] for i in plano.novos], ['5'])
+        self.assertEqual([i['codigo'] for i in plano.ausentes], ['4'])
+        self.assertEqual(Produto.objects.get(codigo='1').preco, Decimal('40.00'))
+
+    def test_csv_com_ponto_e_virgula_em_latin1(self):
+        conteudo = 'CÓDIGO DO PRODUTO;DESCRIÇÃO DO PRODUTO;PREÇO UNITÁRIO DE VENDA;FAMÍLIA DE PRODUTO\n'
+        conteudo += '0100;AÇÚCAR;R$ 4,99;MERCEARIA\n'
+        arquivo = io.BytesIO(conteudo.encode('latin-1'))
+
+        resultado = importar_planilha(arquivo, 'precos.csv')
+
+        self.assertEqual(resultado.criados, 1)
+        produto = Produto.objects.get(codigo='0100')
+        self.assertEqual((produto.descricao, produto.preco), ('AÇÚCAR', Decimal('4.99')))
+
+    def test_csv_com_ponto_decimal(self):
+        conteudo = 'CÓDIGO DO PRODUTO,DESCRIÇÃO DO PRODUTO,PREÇO UNITÁRIO DE VENDA,FAMÍLIA DE PRODUTO\n'
+        conteudo += '0100,PICANHA,12.50,BOVINOS\n0200,ALCATRA,"1.234,56",BOVINOS\n0300,CUPIM,1.234.567,BOVINOS\n'
+
+        importar_planilha(io.BytesIO(conteudo.encode()), 'precos.csv')
+
+        precos = dict(Produto.objects.values_list('codigo', 'preco'))
+        self.assertEqual(precos, {'0100': Decimal('12.50'), '0200': Decimal('1234.56'), '0300': Decimal('1234567.00')})
+
+    def test_leitura_em_pedacos_numera_as_linhas(self):
+        linhas = [[str(i), f'PRODUTO {i}', '1,00' if i != 4 else 'x', 'BOVINOS'] for i in range(5)]
+
+        pedacos = list(ler_planilha(self.planilha(linhas), tamanho=2))
+        self.assertEqual([len(p) for p in pedacos], [2, 2, 1])
+
+        plano = calcular_alteracoes(ler_planilha(self.planilha(linhas), tamanho=2))
+        self.assertEqual((plano.linhas_lidas, plano.erros[0]['linha']), (5, 6))
+
+    def test_familia_criada_por_outra_importacao_no_meio(self):
+        # O mapa foi lido antes de outro processo criar BOVINOS
+        familias = resolver_familias({'BOVINOS', 'AVES'}, {})
+
+        self.assertEqual(familias['BOVINOS'], self.familia.pk)
+        self.assertEqual(familias['AVES'], FamiliaProduto.objects.get(nome='AVES').pk)
+
+    def test_codigo_numerico_com_celula_vazia_no_pedaco(self):
+        importar_planilha(self.planilha([[123, 'PICANHA', 59.9, 'BOVINOS'], [456, 'ALCATRA', 42, 'BOVINOS']]))
+
+        plano = calcular_alteracoes(ler_planilha(self.planilha([
+            [123, 'PICANHA', 59.9, 'BOVINOS'],
+            [None, 'SEM CODIGO', 10, 'BOVINOS'],
+            [456, None, 42, 'BOVINOS'],
+        ])))
+        resultado = importar_planilha(self.planilha([
+            [123, 'PICANHA', 59.9, 'BOVINOS'],
+            [None, 'SEM CODIGO', 10, 'BOVINOS'],
+        ]))
+
+        self.assertEqual([(e['linha'], e['erro']) for e in plano.erros], [(3, 'Código vazio'), (4, 'Descrição vazia')])
+        self.assertEqual(resultado, (0, 0, 1))
+        self.assertEqual(sorted(Produto.objects.values_list('codigo', flat=True)), ['123', '456'])
+
+    def test_consultas_nao_crescem_por_linha(self):
+        linhas = [[str(i), f'PRODUTO {i}', i, 'BOVINOS'] for i in range(500)]
+
+        with CaptureQueriesContext(connection) as consultas:
+            importar_planilha(self.planilha(linhas))
+        self.assertLess(len(consultas), 20)
+
+
+@override_settings(PAINEL_IMPORTACAO_EM_THREAD=False)
+class ImportacaoAdminTests(PainelTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'senha'))
+
+    def enviar(self, linhas):
+        arquivo = self.planilha(linhas)
+        arquivo.name = 'precos.xlsx'
+        self.client.post(reverse('admin:importar_produtos_excel'), {'arquivo_excel': arquivo})
+        return ImportacaoPlanilha.objects.get()
+
+    def test_upload_so_enfileira(self):
+        importacao = self.enviar([['1', 'PICANHA', '59,90', 'BOVINOS']])
+
+        self.assertEqual(importacao.status, ImportacaoPlanilha.PENDENTE)
+        self.assertFalse(Produto.objects.exists())
+
+    def test_analise_confirmacao_e_gravacao(self):
+        importacao = self.enviar([['1', 'PICANHA', '59,90', 'BOVINOS'], ['2', 'MAMINHA', '?', 'BOVINOS']])
+        url = reverse('admin:importacao_planilha_status', args=[importacao.pk])
+
+        executar_importacao(importacao.pk)
+        importacao.refresh_from_db()
+        self.assertEqual(importacao.status, ImportacaoPlanilha.AGUARDANDO_CONFIRMACAO)
+        self.assertEqual((importacao.linhas_lidas, importacao.linhas_com_erro), (2, 1))
+        self.assertEqual(importacao.erros[0]['linha'], 3)
+        self.assertContains(self.client.get(url), 'PICANHA')
+
+        self.client.post(url, {'confirmar': '1'})
+        executar_importacao(importacao.pk)
+        importacao.refresh_from_db()
+        self.assertEqual(importacao.status, ImportacaoPlanilha.CONCLUIDA)
+        self.assertEqual(Produto.objects.get(codigo='1').preco, Decimal('59.90'))
+        self.assertEqual(importacao.linhas_processadas, 2)
+
+    def test_importacao_travada_volta_para_a_fila(self):
+        importacao = self.enviar([['1', 'PICANHA', '59,90', 'BOVINOS']])
+        url = reverse('admin:importacao_planilha_status', args=[importacao.pk])
+        # O processo morreu no meio da análise
+        antes = timezone.now() - timedelta(hours=1)
+        ImportacaoPlanilha.objects.filter(pk=importacao.pk).update(status=ImportacaoPlanilha.ANALISANDO, atualizado_em=antes)
+
+        with self.assertLogs('painel.tarefas', 'WARNING'):
+            self.assertEqual(proxima_importacao(), importacao.pk)
+        executar_importacao(importacao.pk)
+        importacao.refresh_from_db()
+        self.assertEqual((importacao.status, importacao.retomadas), (ImportacaoPlanilha.AGUARDANDO_CONFIRMACAO, 1))
+
+        # Gravação com progresso recente no cache: está andando
+        ImportacaoPlanilha.objects.filter(pk=importacao.pk).update(status=ImportacaoPlanilha.GRAVANDO, atualizado_em=antes)
+        cache.set(chave_progresso_gravacao(importacao.pk), (1000, timezone.now()))
+        self.assertEqual(recuperar_importacoes_travadas(), 0)
+        self.assertContains(self.client.get(url), '<td>1000</td>')
+
+        # Travada de novo, sem retomadas sobrando: desiste
+        cache.delete(chave_progresso_gravacao(importacao.pk))
+        with override_settings(PAINEL_IMPORTACAO_RETOMADAS=1), self.assertLogs('painel.tarefas', 'ERROR'):
+            self.client.get(url)
+        importacao.refresh_from_db()
+        self.assertEqual(importacao.status, ImportacaoPlanilha.ERRO)
+
+
+@override_settings(PAINEL_LONG_POLL_ESPERA=0, PAINEL_EVENTOS_INTERVALO=0, PAINEL_EVENTOS_DURACAO=0)
+class AvisoMudancasTests(PainelTestCase):
+    @override_settings(PAINEL_LONG_POLL_ESPERA=25)
+    def test_sem_mudanca_no_wsgi_responde_na_hora(self):
+        etag = self.client.get(self.url_painel())['ETag']
+        url = reverse('api_aguardar_mudanca', args=[self.dispositivo.uuid])
+
+        inicio = time.monotonic()
+        resposta = self.client.get(url, {'versao': etag})
+        self.assertLess(time.monotonic() - inicio, 5)
+        self.assertEqual((resposta.status_code, resposta['Retry-After']), (204, '60'))
+
+    def test_long_poll_devolve_versao_nova(self):
+        etag = self.client.get(self.url_painel())['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.criar_produto('1')
+        url = reverse('api_aguardar_mudanca', args=[self.dispositivo.uuid])
+
+        resposta = self.client.get(url, {'versao': etag})
+        self.assertEqual(resposta.json()['versao'], self.client.get(self.url_painel())['ETag'])
+
+    def test_sse_fora_do_asgi_manda_para_o_long_poll(self):
+        url = reverse('api_eventos_painel', args=[self.dispositivo.uuid])
+        self.assertEqual(self.client.get(url).status_code, 204)
+
+    async def test_sse_envia_versao(self):
+        url = reverse('api_eventos_painel', args=[self.dispositivo.uuid])
+        resposta = await self.async_client.get(url, {'format': 'compacto'})
+        corpo = b''.join([parte async for parte in resposta.streaming_content]).decode()
+
+        etag = (await self.async_client.get(self.url_painel(), {'format': 'compacto'}))['ETag']
+        self.assertIn(f'event: versao\ndata: {etag}\n\n', corpo)
+
+
+@override_settings(PAINEL_LONG_POLL_ESPERA=0)
+class ApiAssincronaTests(PainelTestCase):
+    """Views de views_api_async (rotas das TVs no ASGI), chamadas direto."""
+
+    def setUp(self):
+        super().setUp()
+        self.criar_produto('1')
+        self.fabrica = AsyncRequestFactory()
+
+    async def test_mesmo_payload_das_views_sincronas(self):
+        sincrona = await sync_to_async(self.client.get)(self.url_painel(), {'format': 'colunar'})
+
+        request = self.fabrica.get(self.url_painel(), {'format': 'colunar'}, headers={'If-None-Match': sincrona['ETag']})
+        resposta = await views_api_async.dados_painel(request, device_uuid=self.dispositivo.uuid)
+        self.assertEqual(resposta.status_code, 304)
+
+        request = self.fabrica.get(self.url_painel(), headers={'Accept': 'application/vnd.painel.colunar+json'})
+        resposta = await views_api_async.dados_painel(request, device_uuid=self.dispositivo.uuid)
+        self.assertEqual(resposta.content, sincrona.content)
+
+    async def test_long_poll_sem_mudanca_responde_204(self):
+        etag = (await sync_to_async(self.client.get)(self.url_painel()))['ETag']
+        request = self.fabrica.get('/', {'versao': etag})
+        resposta = await views_api_async.aguardar_mudanca(request, device_uuid=self.dispositivo.uuid)
+        self.assertEqual(resposta.status_code, 204)
+
+    async def test_pareamento_e_heartbeat(self):
+        request = self.fabrica.post('/', {'codigo': self.dispositivo.codigo_acesso.lower()}, content_type='application/json')
+        with self.assertLogs('painel.views_api_async', 'INFO'):
+            resposta = await views_api_async.parear_dispositivo(request)
+        self.assertEqual(json.loads(resposta.content)['uuid'], str(self.dispositivo.uuid))
+
+        request = self.fabrica.post('/', {'tempo_ligada': 60, 'erros_video': -1}, content_type='application/json')
+        resposta = await views_api_async.heartbeat_painel(request, device_uuid=self.dispositivo.uuid)
+        self.assertEqual(resposta.status_code, 400)
+
+        request = self.fabrica.post('/', {'versao_payload': 'abc', 'tempo_ligada': 60}, content_type='application/json')
+        resposta = await views_api_async.heartbeat_painel(request, device_uuid=self.dispositivo.uuid)
+        self.assertEqual(resposta.status_code, 204)
+        self.assertEqual(await sync_to_async(gravar_heartbeats)(), 1)
+
+
+@override_settings(PAINEL_DELTA_MARGEM=0)
+class DeltaPainelTests(PainelTestCase):
+    def setUp(self):
+        super().setUp()
+        self.picanha = self.criar_produto('1', descricao='PICANHA')
+        self.alcatra = self.criar_produto('2', descricao='ALCATRA')
+        self.url = reverse('api_delta_painel', args=[self.dispositivo.uuid])
+
+    def sincronizar(self, versao=None):
+        return self.client.get(self.url, {'since': versao} if versao else {}).json()
+
+    def test_primeira_consulta_manda_buscar_o_payload_completo(self):
+        dados = self.client.get(self.url, {'format': 'colunar'}).json()
+        self.assertTrue(dados['completo'])
+        self.assertNotIn('produtos', dados)
+
+        # O completo vem da API normal: do cache, com ETag (304 se a TV já tem)
+        url = self.url_painel()
+        resposta = self.client.get(url, {'format': 'colunar'}, HTTP_IF_NONE_MATCH=f'"{dados["etag"]}"')
+        self.assertEqual(resposta.status_code, 304)
+
+    def test_so_o_produto_alterado(self):
+        versao = self.sincronizar()['versao']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.picanha.preco = Decimal('59.90')
+            self.picanha.save()
+
+        dados = self.sincronizar(versao)
+        self.assertFalse(dados['completo'])
+        self.assertEqual([(p['codigo'], p['preco']) for p in dados['produtos']], [('1', '59.90')])
+        self.assertEqual(dados['removidos'], [])
+
+    def test_ocultos_e_apagados_saem_da_tela(self):
+        versao = self.sincronizar()['versao']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.picanha.exibir_no_painel = False
+            self.picanha.save()
+            self.alcatra.delete()
+
+        dados = self.sincronizar(versao)
+        self.assertFalse(dados['completo'])
+        self.assertEqual(dados['produtos'], [])
+        self.assertEqual(dados['removidos'], ['1', '2'])
+
+    def test_so_as_familias_da_tv(self):
+        aves = FamiliaProduto.objects.create(nome='AVES')
+        frango = self.criar_produto('3', descricao='FRANGO', familia=aves)
+        self.dispositivo.exibir_apenas_familias.add(self.familia)
+        versao = self.sincronizar()['versao']
+        with self.captureOnCommitCallbacks(execute=True):
+            frango.preco = Decimal('19.90')
+            frango.save()
+            self.alcatra.familia = aves
+            self.alcatra.save()
+
+        dados = self.sincronizar(versao)
+        self.assertFalse(dados['completo'])
+        self.assertEqual(dados['produtos'], [])
+        self.assertEqual(dados['removidos'], ['2'])
+
+    def test_mudanca_de_estrutura_manda_payload_completo(self):
+        versao = self.sincronizar()['versao']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dispositivo.orientacao = 'VERTICAL_DIR'
+            self.dispositivo.save()
+
+        self.assertTrue(self.sincronizar(versao)['completo'])
+        self.assertTrue(self.sincronizar('lixo')['completo'])
+
+
+    def test_importacao_longa_nao_fica_atras_das_versoes_entregues(self):
+        estrutura = self.sincronizar()['versao'].split('.', 1)[1]
+        entregues = []
+
+        def ler_devagar(arquivo, nome=None):
+            for lote in ler_planilha(arquivo, nome, tamanho=1):
+                yield lote
+                # Outra TV sincroniza enquanto a importação ainda não terminou
+                entregues.append(formatar_versao(timezone.now(), estrutura))
+
+        linhas = [['1', 'PICANHA', '79,90', 'BOVINOS'], ['2', 'ALCATRA', '49,90', 'BOVINOS']]
+        with mock.patch('painel.importacao.ler_planilha', ler_devagar), self.captureOnCommitCallbacks(execute=True):
+            importar_planilha(self.planilha(linhas))
+
+        dados = self.sincronizar(entregues[0])
+        self.assertEqual(sorted(p['codigo'] for p in dados['produtos']), ['1', '2'])
+
+@override_settings(PAINEL_PUBLICACAO=True)
+class PublicacaoTests(PainelTestCase):
+    def setUp(self):
+        super().setUp()
+        self.criar_produto('1', descricao='PICANHA')
+        self.gondola = Dispositivo.objects.create(nome='TV Gôndola')
+
+    def ponteiro(self, dispositivo):
+        with default_storage.open(nome_ponteiro(dispositivo.uuid)) as arquivo:
+            return json.load(arquivo)
+
+    def test_ponteiro_aponta_para_payload_compartilhado(self):
+        em_uso = publicar()
+
+        ponteiro = self.ponteiro(self.dispositivo)
+        delta = self.client.get(reverse('api_delta_painel', args=[self.dispositivo.uuid]), {'format': 'colunar'}).json()
+        self.assertEqual(ponteiro['etag'], delta['etag'])
+        self.assertEqual(delta['ponteiro'], default_storage.url(nome_ponteiro(self.dispositivo.uuid)))
+
+        # Mesma configuração: o mesmo arquivo de payload, ponteiros diferentes
+        self.assertEqual(len(em_uso), 1)
+        self.assertEqual(ponteiro['url'], self.ponteiro(self.gondola)['url'])
+        self.assertNotEqual(ponteiro['etag'], self.ponteiro(self.gondola)['etag'])
+        with default_storage.open(em_uso.pop()) as arquivo:
+            dados = json.load(arquivo)
+        self.assertEqual(dados['produtos']['descricao'], ['PICANHA'])
+
+    def test_mudanca_republica_so_as_tvs_afetadas(self):
+        publicar()
+        antes = self.ponteiro(self.dispositivo)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gondola.orientacao = 'VERTICAL_DIR'
+            self.gondola.save()
+        publicar([self.dispositivo.uuid, self.gondola.uuid])
+
+        self.assertEqual(self.ponteiro(self.dispositivo), antes)
+        self.assertNotEqual(self.ponteiro(self.gondola)['url'], antes['url'])
+        self.assertTrue(default_storage.exists(nome_payload(antes['url'].rsplit('/', 1)[1][:-5])))
+
+
+    def test_ponteiro_gravado_por_outro_processo_no_meio(self):
+        storage = FileSystemStorage(location=settings.MEDIA_ROOT)
+        apagar = storage.delete
+
+        def concorrente(nome):
+            # Outro processo regrava o ponteiro logo depois do nosso delete
+            apagar(nome)
+            if nome == nome_ponteiro(self.dispositivo.uuid) and not storage.exists(nome):
+                FileSystemStorage.save(storage, nome, ContentFile(b'{"etag": "velho"}'))
+                storage.delete = apagar
+
+        storage.delete = concorrente
+        publicar([self.dispositivo.uuid], storage=storage)
+
+        self.assertNotEqual(self.ponteiro(self.dispositivo)['etag'], 'velho')
+        self.assertEqual(storage.listdir('painel/publicado/dispositivos')[1], [f'{self.dispositivo.uuid}.json'])
+
+
+class ManifestoMidiasTests(PainelTestCase):
+    def test_hash_calculado_no_upload_e_url_versionada(self):
+        conteudo = b'video de teste' * 100
+        propaganda = VideoPropaganda.objects.create(
+            descricao='Institucional', arquivo_video=SimpleUploadedFile('inst.mp4', conteudo)
+        )
+        self.dispositivo.exibir_propagandas.add(propaganda)
+
+        midia = ArquivoMidia.objects.get(caminho=propaganda.arquivo_video.name)
+        self.assertEqual(midia.tamanho, len(conteudo))
+        self.assertEqual(midia.hash_conteudo, hashlib.sha256(conteudo).hexdigest())
+        self.assertEqual(midia.tipo_mime, 'video/mp4')
+
+        with CaptureQueriesContext(connection) as consultas:
+            propaganda.save()
+        self.assertEqual(ArquivoMidia.objects.count(), 1)
+        self.assertFalse(any('INSERT' in c['sql'] for c in consultas.captured_queries))
+
+        dados = self.client.get(self.url_painel()).json()
+        url = dados['playlist_final'][0]['url']
+        self.assertTrue(url.endswith('?v=' + midia.hash_conteudo[:16]))
+        self.assertEqual(dados['midias'], [{
+            'url': url, 'hash': midia.hash_conteudo, 'tamanho': len(conteudo),
+            'tipo_mime': 'video/mp4', 'duracao': None,
+        }])
+
+
+class ImagensDerivadasTests(PainelTestCase):
+    def foto(self, largura, altura):
+        arquivo = io.BytesIO()
+        Image.new('RGB', (largura, altura), (200, 30, 30)).save(arquivo, 'JPEG')
+        return SimpleUploadedFile('foto.jpg', arquivo.getvalue())
+
+    def test_tv_recebe_a_versao_da_sua_orientacao(self):
+        produto = self.criar_produto('1', imagem=self.foto(4000, 3000))
+        derivadas = produto.imagem_derivadas
+        self.assertEqual(Produto.objects.get(pk=produto.pk).imagem_derivadas, derivadas)
+
+        for variante, lado in TAMANHOS.items():
+            with default_storage.open(derivadas[variante]) as arquivo:
+                self.assertEqual(max(Image.open(arquivo).size), lado)
+
+        vertical = Dispositivo.objects.create(nome='TV Vertical', orientacao='VERTICAL_DIR')
+        imagem_horizontal = self.client.get(self.url_painel()).json()['produtos'][0]['imagem']
+        imagem_vertical = self.client.get(self.url_painel(vertical)).json()['produtos'][0]['imagem']
+        self.assertIn(derivadas['horizontal'], imagem_horizontal)
+        self.assertIn(derivadas['vertical'], imagem_vertical)
+        self.assertIn('?v=', imagem_vertical)
+
+    def test_derivadas_refeitas_quando_a_imagem_muda(self):
+        produto = self.criar_produto('1', imagem=self.foto(1000, 1000))
+        antigas = produto.imagem_derivadas
+
+        with self.captureOnCommitCallbacks(execute=True):
+            produto.imagem = self.foto(1200, 900)
+            produto.save()
+
+        self.assertNotEqual(produto.imagem_derivadas['origem'], antigas['origem'])
+        self.assertFalse(default_storage.exists(antigas['horizontal']))
+
+    def test_rollback_mantem_as_derivadas_antigas(self):
+        produto = self.criar_produto('1', imagem=self.foto(1000, 1000))
+        antigas = produto.imagem_derivadas
+
+        try:
+            with transaction.atomic():
+                produto.imagem = self.foto(1200, 900)
+                produto.save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertEqual(Produto.objects.get(pk=produto.pk).imagem_derivadas, antigas)
+        self.assertTrue(default_storage.exists(antigas['horizontal']))
+
+
+class TranscodificadorFalso:
+    """Stand-in do ffmpeg para os testes (PAINEL_TRANSCODIFICADOR)."""
+    extensao = 'mp4'
+
+    def duracao(self, caminho):
+        return 12.3
+
+    def transcodificar(self, origem, destino):
+        with open(origem, 'rb') as entrada, open(destino, 'wb') as saida:
+            saida.write(b'h264:' + entrada.read())
+        return True
+
+
+@override_settings(PAINEL_TRANSCODIFICADOR='painel.tests.TranscodificadorFalso')
+class ProcessamentoVideoTests(PainelTestCase):
+    def test_mede_duracao_e_tv_recebe_versao_processada(self):
+        propaganda = VideoPropaganda.objects.create(descricao='Institucional', arquivo_video=self.video(), duracao=30)
+        self.dispositivo.exibir_propagandas.add(propaganda)
+        self.assertEqual(proximo_video(), (VideoPropaganda, propaganda.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(executar_video(VideoPropaganda, propaganda.pk))
+        self.assertFalse(executar_video(VideoPropaganda, propaganda.pk))
+
+        propaganda.refresh_from_db()
+        self.assertEqual(propaganda.status_processamento, VideoPropaganda.PRONTO)
+        self.assertEqual(propaganda.duracao, 13)
+        self.assertEqual(propaganda.video_processado.read(), b'h264:video de teste')
+
+        item = self.client.get(self.url_painel()).json()['playlist_final'][0]
+        self.assertEqual(item['duracao'], 13)
+        self.assertIn(propaganda.video_processado.url, item['url'])
+
+    def test_novo_upload_volta_para_a_fila(self):
+        template = VideoTemplate.objects.create(nome='Oferta', arquivo_video=self.video())
+        executar_video(VideoTemplate, template.pk)
+
+        template.refresh_from_db()
+        template.arquivo_video = self.video('b.mp4')
+        template.save()
+
+        template.refresh_from_db()
+        self.assertEqual(template.status_processamento, VideoTemplate.PENDENTE)
+        self.assertEqual(template.video_exibicao, template.arquivo_video)
+
+    @override_settings(PAINEL_VIDEO_TIMEOUT=60, PAINEL_VIDEO_RETOMADAS=1)
+    def test_video_travado_volta_para_a_fila(self):
+        propaganda = VideoPropaganda.objects.create(descricao='Institucional', arquivo_video=self.video())
+        # O processo morreu com o ffmpeg rodando
+        travado = {'status_processamento': VideoPropaganda.PROCESSANDO, 'processando_desde': timezone.now() - timedelta(hours=1)}
+        VideoPropaganda.objects.filter(pk=propaganda.pk).update(**travado)
+
+        with self.assertLogs('painel.tarefas', 'WARNING'):
+            self.assertEqual(proximo_video(), (VideoPropaganda, propaganda.pk))
+        self.assertTrue(executar_video(VideoPropaganda, propaganda.pk))
+
+        # Travou de novo depois da última retomada: desiste
+        VideoPropaganda.objects.filter(pk=propaganda.pk).update(**travado)
+        with self.assertLogs('painel.tarefas', 'ERROR'):
+            self.assertIsNone(proximo_video())
+        propaganda.refresh_from_db()
+        self.assertEqual((propaganda.status_processamento, propaganda.retomadas), (VideoPropaganda.ERRO, 1))
+
+
+@unittest.skipUnless(shutil.which('ffmpeg') and shutil.which('ffprobe'), 'ffmpeg não instalado')
+class FFmpegTests(PainelTestCase):
+    def dimensoes(self, largura, altura):
+        with tempfile.TemporaryDirectory() as pasta:
+            origem, destino = os.path.join(pasta, 'origem.mp4'), os.path.join(pasta, 'saida.mp4')
+            subprocess.run(
+                ['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', f'testsrc=size={largura}x{altura}:duration=1',
+                 '-pix_fmt', 'yuv420p', origem],
+                check=True,
+            )
+            FFmpeg().transcodificar(origem, destino)
+            saida = subprocess.run(
+                ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=width,height',
+                 '-of', 'csv=p=0', destino],
+                capture_output=True, text=True, check=True,
+            ).stdout
+        return tuple(int(n) for n in saida.strip().split(','))
+
+    def test_vertical_mantem_a_resolucao_da_tv_em_pe(self):
+        self.assertEqual(self.dimensoes(1080, 1920), (1080, 1920))
+        self.assertEqual(self.dimensoes(2160, 3840), (1080, 1920))
+
+    def test_horizontal_reduzido_para_1080p(self):
+        self.assertEqual(self.dimensoes(3840, 2160), (1920, 1080))
+
+
+class CompressaoRespostasTests(PainelTestCase):
+    def test_json_da_api_sai_comprimido(self):
+        for codigo in range(20):
+            self.criar_produto(str(codigo))
+        url = reverse('api_delta_painel', args=[self.dispositivo.uuid])
+        versao = self.client.get(url).json()['versao']
+        Produto.objects.update(preco=Decimal('11.00'), updated_at=timezone.now())
+
+        resposta = self.client.get(url, {'since': versao}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(resposta['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(resposta.content))['produtos']), 20)
+
+    def test_pagina_da_tv_sempre_revalida(self):
+        self.assertEqual(self.client.get(reverse('tv_display'))['Cache-Control'], 'no-cache')
+
+
+class ServiceWorkerTests(PainelTestCase):
+    def test_service_worker_no_escopo_da_tv(self):
+        resposta = self.client.get(reverse('tv_service_worker'))
+        self.assertEqual(resposta['Content-Type'], 'application/javascript')
+        self.assertEqual(resposta['Cache-Control'], 'no-cache')
+        self.assertTrue(resposta.wsgi_request.path.startswith(reverse('tv_display')))
+        self.assertContains(resposta, "'/static/js/tv_app.js'")
+
+
+class PaginasTabelaTests(PainelTestCase):
+    def test_tamanho_da_pagina_por_dispositivo(self):
+        self.criar_produto('1', preco=Decimal('1234.5'))
+        dados = self.client.get(self.url_painel()).json()
+        self.assertEqual(dados['config']['itens_por_pagina'], 18)
+        self.assertEqual(dados['produtos'][0]['preco_exibicao'], 'R$ 1.234,50')
+
+        vertical = Dispositivo.objects.create(nome='TV Vertical', orientacao='VERTICAL_ESQ')
+        self.assertEqual(self.client.get(self.url_painel(vertical)).json()['config']['itens_por_pagina'], 15)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            vertical.itens_por_pagina = 12
+            vertical.save()
+        self.assertEqual(self.client.get(self.url_painel(vertical)).json()['config']['itens_por_pagina'], 12)
+
+
+class MetricasTests(PainelTestCase):
+    def setUp(self):
+        super().setUp()
+        registro.zerar()
+
+    def test_requisicoes_da_tv_aparecem_no_metrics(self):
+        self.criar_produto('1')
+        self.client.get(self.url_painel())
+        self.client.get(self.url_painel())
+
+        with self.settings(PAINEL_METRICAS_TOKEN='segredo'):
+            texto = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer segredo').content.decode()
+        self.assertIn('painel_requisicoes_total{endpoint="dados",status="200"} 2', texto)
+        self.assertIn('painel_latencia_ms_count{endpoint="dados"} 2', texto)
+        # UUIDs das TVs não aparecem (são a credencial delas)
+        self.assertNotIn(str(self.dispositivo.uuid), texto)
+        self.assertIn('painel_cache_payload_total{resultado="acerto"} 1', texto)
+        self.assertIn('painel_cache_payload_total{resultado="falta"} 1', texto)
+
+    def test_requisicao_lenta_sempre_logada(self):
+        with self.settings(PAINEL_METRICAS_LENTO_MS=0), self.assertLogs('painel.requisicoes') as logs:
+            self.client.get(self.url_painel())
+        medida = json.loads(logs.records[0].getMessage())
+        self.assertEqual(medida['endpoint'], 'dados')
+        self.assertGreater(medida['consultas'], 0)
+
+    def test_metrics_exige_token_ou_staff(self):
+        # Nem o IP local basta (proxy reverso na mesma máquina)
+        self.assertEqual(self.client.get(reverse('metricas'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+        with self.settings(PAINEL_METRICAS_TOKEN='segredo'):
+            resposta = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer outro')
+        self.assertEqual(resposta.status_code, 403)
+
+        self.client.force_login(User.objects.create_user('gerente', is_staff=True))
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 200)
+
+
+class HeartbeatTests(PainelTestCase):
+    def heartbeat(self, dispositivo=None, **dados):
+        url = reverse('api_heartbeat_painel', args=[(dispositivo or self.dispositivo).uuid])
+        return self.client.post(url, {'versao_payload': 'abc', 'tempo_ligada': 60, **dados}, content_type='application/json')
+
+    def test_ping_nao_escreve_no_banco(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.heartbeat(item_atual='Tabela, página 1 de 2').status_code, 204)
+        self.assertFalse(StatusDispositivo.objects.exists())
+
+        self.assertEqual(gravar_heartbeats(), 1)
+        status = StatusDispositivo.objects.get(dispositivo=self.dispositivo)
+        self.assertEqual(status.item_atual, 'Tabela, página 1 de 2')
+        self.assertEqual(status.endereco_ip, '127.0.0.1')
+
+        # O ping seguinte atualiza a mesma linha
+        self.heartbeat(erros_video=2, ultimo_erro='Picanha: código 4')
+        gravar_heartbeats()
+        status.refresh_from_db()
+        self.assertEqual((status.erros_video, status.ultimo_erro), (2, 'Picanha: código 4'))
+        self.assertEqual(gravar_heartbeats(), 0)
+
+    def test_gravacao_em_lote(self):
+        outras = [Dispositivo.objects.create(nome=f'TV {n}') for n in range(5)]
+        for dispositivo in [self.dispositivo, *outras]:
+            self.heartbeat(dispositivo)
+        # Lista dos dispositivos + um upsert, independente de quantas TVs
+        with self.assertNumQueries(2):
+            self.assertEqual(gravar_heartbeats(), 6)
+        self.assertEqual(StatusDispositivo.objects.count(), 6)
+
+    def test_heartbeat_invalido(self):
+        self.assertEqual(self.heartbeat(erros_video=-1).status_code, 400)
+
+    def test_frota_no_admin(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@teste.com', 'senha'))
+        Dispositivo.objects.create(nome='TV Nova')
+        etag = self.client.get(reverse('api_delta_painel', args=[self.dispositivo.uuid]) + '?format=colunar').json()['etag']
+        self.heartbeat(versao_payload=etag)
+        gravar_heartbeats()
+
+        # Compara com o ETag do cache, sem montar o payload de nenhuma TV
+        with mock.patch('painel.cache.montar_compartilhado') as montar:
+            resposta = self.client.get(reverse('admin:painel_frota'))
+        montar.assert_not_called()
+        self.assertContains(resposta, '1 de 2 online')
+        self.assertContains(resposta, 'Em dia')
+        self.assertContains(resposta, 'Nunca enviou heartbeat')
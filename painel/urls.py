@@ -1,12 +1,24 @@
+from django.conf import settings
 from django.urls import path
 from . import views_api
+from . import views_api_async
 from . import views
 from . import views_editor
 
+# Rotas das TVs: no ASGI (PAINEL_API_ASYNC, ligado pelo core/asgi.py) as
+# versões assíncronas, que não prendem uma thread por conexão
+api = views_api_async if settings.PAINEL_API_ASYNC else views_api
+
 urlpatterns = [
-    path('api/painel/parear/', views_api.parear_dispositivo, name='api_parear'), # <--- Nova rota
-    path('api/painel/<uuid:device_uuid>/', views_api.dados_painel, name='api_dados_painel'),
+    path('api/painel/parear/', api.parear_dispositivo, name='api_parear'), # <--- Nova rota
+    path('api/painel/<uuid:device_uuid>/', api.dados_painel, name='api_dados_painel'),
+    path('api/painel/<uuid:device_uuid>/delta/', api.delta_painel, name='api_delta_painel'),
+    path('api/painel/<uuid:device_uuid>/eventos/', api.eventos_painel, name='api_eventos_painel'),
+    path('api/painel/<uuid:device_uuid>/aguardar/', api.aguardar_mudanca, name='api_aguardar_mudanca'),
+    path('api/painel/<uuid:device_uuid>/heartbeat/', api.heartbeat_painel, name='api_heartbeat_painel'),
+    path('metrics/', views_api.metricas, name='metricas'),
     path('tv/', views.tv_display_view, name='tv_display'),
+    path('tv/sw.js', views.tv_service_worker_view, name='tv_service_worker'),
     path('editor/<int:template_id>/', views_editor.editor_visual, name='editor_visual'),
     path('api/editor/salvar/<int:template_id>/', views_editor.salvar_layout, name='api_salvar_layout'),
 ]
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Preparo dos vídeos para as TVs (templates e propagandas).
+
+Depois do upload o vídeo fica PENDENTE e um job em segundo plano (mesmo
+esquema das importações, ver painel/tarefas.py) mede a duração real, grava em
+'duracao' e gera uma versão H.264 sem áudio, limitada à resolução e ao bitrate
+das TVs, que passa a ser a URL enviada no payload.
+
+O transcodificador é plugável (PAINEL_TRANSCODIFICADOR, caminho da classe).
+Sem configuração, usa o ffmpeg se estiver instalado; sem ffmpeg, mantém o
+arquivo original e só mede a duração (se houver ffprobe).
+"""
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils.module_loading import import_string
+
+from .midia import sondar_duracao
+
+
+def _config(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+@contextmanager
+def arquivo_local(nome, storage=default_storage):
+    """Caminho local do arquivo; em storage remoto baixa para um temporário."""
+    try:
+        caminho = storage.path(nome)
+    except NotImplementedError:
+        caminho = None
+    if caminho:
+        yield caminho
+        return
+
+    extensao = os.path.splitext(nome)[1]
+    with tempfile.NamedTemporaryFile(suffix=extensao) as temporario:
+        with storage.open(nome, 'rb') as origem:
+            shutil.copyfileobj(origem, temporario)
+        temporario.flush()
+        yield temporario.name
+
+
+class SemTranscodificacao:
+    """Mantém o arquivo original; só mede a duração."""
+
+    extensao = None
+
+    def duracao(self, caminho):
+        return sondar_duracao(caminho)
+
+    def transcodificar(self, origem, destino):
+        return False
+
+
+class FFmpeg(SemTranscodificacao):
+    """H.264 (perfil high, yuv420p) com bitrate limitado, sem áudio, faststart."""
+
+    extensao = 'mp4'
+
+    def transcodificar(self, origem, destino):
+        lados = (_config('PAINEL_VIDEO_LARGURA', 1920), _config('PAINEL_VIDEO_ALTURA', 1080))
+        maior, menor = max(lados), min(lados)
+        bitrate = _config('PAINEL_VIDEO_BITRATE_KBPS', 4000)
+        # Reduz (nunca amplia) para caber na tela, mantendo dimensões pares.
+        # A caixa segue a orientação do vídeo: 1920x1080 para os horizontais e
+        # 1080x1920 para os verticais (TVs em pé), senão um vídeo em pé
+        # encolheria para caber na altura de uma tela deitada.
+        escala = (
+            f"scale='min(if(gte(iw,ih),{maior},{menor}),iw)':'min(if(gte(iw,ih),{menor},{maior}),ih)'"
+            ":force_original_aspect_ratio=decrease,"
+            "scale=trunc(iw/2)*2:trunc(ih/2)*2"
+        )
+        subprocess.run(
+            [shutil.which('ffmpeg'), '-y', '-v', 'error', '-i', origem,
+             '-vf', escala, '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '23',
+             '-maxrate', f'{bitrate}k', '-bufsize', f'{bitrate * 2}k',
+             '-profile:v', 'high', '-pix_fmt', 'yuv420p', '-movflags', '+faststart',
+             # As TVs tocam mudo (video.muted no tv_app.js)
+             '-an', destino],
+            capture_output=True, check=True, timeout=_config('PAINEL_VIDEO_TIMEOUT', 1800),
+        )
+        return True
+
+
+def obter_transcodificador():
+    caminho = _config('PAINEL_TRANSCODIFICADOR', None)
+    if caminho:
+        return import_string(caminho)()
+    return FFmpeg() if shutil.which('ffmpeg') else SemTranscodificacao()
+
+
+def processar_video(video, transcodificador=None):
+    """
+    Mede e transcodifica o arquivo_video atual. Retorna o dicionário de campos
+    a gravar no modelo (duracao, video_processado, processado_de).
+    """
+    transcodificador = transcodificador or obter_transcodificador()
+    nome_original = video.arquivo_video.name
+    campos = {'processado_de': nome_original, 'video_processado': ''}
+
+    with arquivo_local(nome_original) as origem:
+        duracao = transcodificador.duracao(origem)
+        if transcodificador.extensao:
+            with tempfile.TemporaryDirectory() as pasta:
+                destino = os.path.join(pasta, f"saida.{transcodificador.extensao}")
+                if transcodificador.transcodificar(origem, destino):
+                    base = os.path.splitext(os.path.basename(nome_original))[0]
+                    nome = f"videos_processados/{base}.{transcodificador.extensao}"
+                    with open(destino, 'rb') as saida:
+                        campos['video_processado'] = default_storage.save(nome, File(saida))
+
+    if duracao:
+        # Arredonda para cima: melhor sobrar meio segundo do que cortar o fim
+        campos['duracao'] = max(1, math.ceil(duracao))
+    return campos
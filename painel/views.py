@@ -1,8 +1,23 @@
 from django.shortcuts import render
+from django.views.decorators.cache import cache_control
 
+
+# A página é pequena e aponta para o JS/CSS com hash no nome (cache longo):
+# revalidar sempre faz a TV pegar a versão nova do player sem baixar o resto
+@cache_control(no_cache=True)
 def tv_display_view(request):
     """
     Renderiza o HTML vazio da TV. 
     Toda a inteligência virá via Javascript (API).
     """
-    return render(request, 'painel/tv_display.html')
\ No newline at end of file
+    return render(request, 'painel/tv_display.html')
+
+def tv_service_worker_view(request):
+    """
+    Service Worker do player (cache offline das mídias).
+    Servido em /tv/ para que o escopo dele cubra a página da TV.
+    """
+    response = render(request, 'painel/tv_sw.js', content_type='application/javascript')
+    # O navegador precisa ver logo as versões novas do worker
+    response['Cache-Control'] = 'no-cache'
+    return response
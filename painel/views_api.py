@@ -1,103 +1,231 @@
-from rest_framework.decorators import api_view, permission_classes, authentication_classes
+import asyncio
+import hmac
+import logging
+import time
+
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, renderer_classes
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from django.views.decorators.csrf import csrf_exempt
-from django.shortcuts import get_object_or_404
-from .models import Dispositivo, Produto, VideoPropaganda
-from .serializers import ProdutoSerializer, DispositivoConfigSerializer
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from .models import Dispositivo
+from .cache import aobter_payload, obter_payload
+from .delta import montar_delta
+from .metricas import instrumentar, registro
+from .payload import FORMATO_COLUNAR, FORMATO_COMPACTO, FORMATO_COMPLETO, FORMATOS
+from .publicacao import publicacao_ativa, url_ponteiro
+from .renderers import PayloadColunarRenderer, PayloadCompactoRenderer
+from .serializers import HeartbeatSerializer
+from .tarefas import enfileirar_gravacao_heartbeats
+from .telemetria import registrar_heartbeat
+
+logger = logging.getLogger(__name__)
+
 
+@instrumentar('parear')
 @csrf_exempt
 @api_view(['POST'])
 @authentication_classes([])
 @permission_classes([AllowAny])
 def parear_dispositivo(request):
-    print(f"Tentativa de pareamento recebida: {request.data}")
-    
     codigo = request.data.get('codigo', '').strip().upper()
     
     try:
         dispositivo = Dispositivo.objects.get(codigo_acesso=codigo)
-        print(f"Sucesso! Dispositivo encontrado: {dispositivo.nome}")
+        logger.info("Pareamento: código %s -> dispositivo %s (%s)", codigo, dispositivo.nome, dispositivo.uuid)
         return Response({"uuid": dispositivo.uuid, "nome": dispositivo.nome})
     except Dispositivo.DoesNotExist:
-        print(f"Falha: Código '{codigo}' não existe no banco.")
+        logger.warning("Pareamento recusado: código %r não existe", codigo)
         return Response({"erro": "Código inválido"}, status=404)
 
-# Serializer simples manual para propaganda (não precisa criar arquivo novo se for simples)
-def serializar_propaganda(propaganda):
-    return {
-        "tipo": "propaganda",
-        "url": propaganda.arquivo_video.url,
-        "descricao": propaganda.descricao,
-        "duracao": propaganda.duracao
-    }
-
+@instrumentar('dados')
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@renderer_classes([JSONRenderer, PayloadCompactoRenderer, PayloadColunarRenderer])
 def dados_painel(request, device_uuid):
-    dispositivo = get_object_or_404(Dispositivo, uuid=device_uuid)
-    
-    # ... (lógica de título mantida) ...
-    titulo_exibicao = dispositivo.titulo_exibicao if hasattr(dispositivo, 'titulo_exibicao') else ""
-
-    response_data = {
-        "config": {
-            **DispositivoConfigSerializer(dispositivo).data,
-            "titulo_exibicao": titulo_exibicao
-        },
-        "produtos": [],
-        "playlist_final": []
-    }
-
-    # Query Produtos (Só os ativos)
-    query_produtos = Produto.objects.filter(exibir_no_painel=True)
-    familias_alvo = dispositivo.familias.all() if hasattr(dispositivo, 'familias') else None
-    if familias_alvo and familias_alvo.exists():
-        query_produtos = query_produtos.filter(familia__in=familias_alvo)
-    
-    # Serializa todos (para a tabela)
-    serializer = ProdutoSerializer(query_produtos, many=True, context={'request': request})
-    dados_produtos = serializer.data
-    response_data["produtos"] = dados_produtos
-
-    # --- MONTAR PLAYLIST ORDENADA (Vídeos e Propagandas) ---
-    lista_mista = []
-
-    # 1. Adiciona Produtos com Vídeo
-    for p in dados_produtos:
-        if p['template_video']:
-            item = p.copy()
-            item['tipo'] = 'produto'
-            # Pega a ordem do objeto original (precisamos buscar no queryset ou passar no serializer)
-            # O jeito mais limpo é adicionar 'ordem' no serializer, mas vamos fazer um map rápido:
-            # (Simplificação: O serializer já deve mandar a ordem se atualizarmos ele, 
-            #  mas vamos assumir que o 'p' tem os campos do serializer)
-            
-            # Se 'ordem' não estiver no serializer, precisamos adicionar no painel/serializers.py
-            # Vamos assumir que adicionamos (veja nota abaixo) ou usar 0 default.
-            item['ordem_visual'] = p.get('ordem', 0) 
-            
-            # Injeta a duração definida no template
-            if 'template_video' in item and item['template_video']:
-                item['duracao'] = item['template_video'].get('duracao', 15)
-                
-            lista_mista.append(item)
-
-    # 2. Adiciona Propagandas
-    propagandas = dispositivo.exibir_propagandas.filter(ativo=True)
-    for prop in propagandas:
-        lista_mista.append({
-            "tipo": "propaganda",
-            "url": prop.arquivo_video.url,
-            "descricao": prop.descricao,
-            "duracao": prop.duracao,
-            "ordem_visual": prop.ordem
-        })
-
-    # 3. Ordena a lista final pelo campo 'ordem_visual'
-    # Sort é estável, então itens com mesma ordem ficam na sequência de inserção
-    lista_mista.sort(key=lambda x: x['ordem_visual'])
-
-    response_data["playlist_final"] = lista_mista
-
-    return Response(response_data)
\ No newline at end of file
+    # O payload já vem renderizado do cache (ver painel/cache.py), no formato
+    # negociado pelo Accept ou por ?format=
+    renderer = request.accepted_renderer
+    payload = obter_payload(device_uuid, renderer.format)
+    if payload is None:
+        raise Http404
+    return responder_payload(request, payload, renderer.media_type)
+
+
+def responder_payload(request, payload, media_type):
+    """Resposta com o payload do cache (também usada por views_api_async)."""
+    # Versão já comprimida no cache, conforme o Accept-Encoding
+    codificacao = _escolher_codificacao(request, payload.comprimidos)
+
+    # GET condicional: a maioria das consultas da TV não tem novidade.
+    # Comprimido, o ETag vira fraco (mesmo critério do GZipMiddleware);
+    # a comparação ignora o W/.
+    etag = quote_etag(payload.etag)
+    etags_cliente = [e.removeprefix('W/') for e in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))]
+    if etag in etags_cliente or '*' in etags_cliente:
+        response = HttpResponseNotModified()
+    elif codificacao:
+        response = HttpResponse(payload.comprimidos[codificacao], content_type=media_type)
+        response['Content-Encoding'] = codificacao
+    else:
+        response = HttpResponse(payload.conteudo, content_type=media_type)
+
+    response['ETag'] = f'W/{etag}' if codificacao else etag
+    patch_vary_headers(response, ['Accept', 'Accept-Encoding'])
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _escolher_codificacao(request, comprimidos):
+    aceitas = {}
+    for parte in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        nome, _, parametros = parte.strip().partition(';')
+        qualidade = 1.0
+        if parametros.strip().startswith('q='):
+            try:
+                qualidade = float(parametros.strip()[2:])
+            except ValueError:
+                qualidade = 0.0
+        aceitas[nome.strip().lower()] = qualidade
+
+    for codificacao in ('br', 'gzip'):
+        if codificacao in comprimidos and aceitas.get(codificacao, 0) > 0:
+            return codificacao
+    return None
+
+
+@instrumentar('delta')
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([JSONRenderer, PayloadCompactoRenderer, PayloadColunarRenderer])
+def delta_painel(request, device_uuid):
+    # Só o que mudou desde a versão que a TV já tem (ver painel/delta.py).
+    # O payload completo vai compacto, ou colunar com ?format=colunar.
+    formato = FORMATO_COLUNAR if request.accepted_renderer.format == FORMATO_COLUNAR else FORMATO_COMPACTO
+    resposta = montar_delta(device_uuid, request.query_params.get('since'), formato)
+    if resposta is None:
+        raise Http404
+    if publicacao_ativa():
+        # A partir daqui a TV acompanha o ponteiro publicado no storage
+        resposta['ponteiro'] = url_ponteiro(device_uuid)
+
+    response = Response(resposta)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+# --- AVISO DE MUDANÇAS (PUSH) ---
+# A TV assina /eventos/ (SSE) e só baixa o payload quando a versão (ETag) muda.
+# SSE só faz sentido no servidor ASGI (core/asgi.py, que usa as versões de
+# views_api_async): no WSGI cada conexão prenderia um worker, então /eventos/
+# responde 204 e a TV cai para /aguardar/. No ASGI ele é um long-poll (volta
+# assim que a versão muda); aqui, para também não prender o worker, responde
+# na hora e manda a TV voltar depois de PAINEL_SHORT_POLL_INTERVALO segundos
+# (Retry-After).
+
+def formato_pedido(request):
+    formato = request.GET.get('format')
+    return formato if formato in FORMATOS else FORMATO_COMPLETO
+
+
+def _versao_atual(device_uuid, formato):
+    payload = obter_payload(device_uuid, formato)
+    return quote_etag(payload.etag) if payload else None
+
+
+async def _aversao_atual(device_uuid, formato):
+    payload = await aobter_payload(device_uuid, formato)
+    return quote_etag(payload.etag) if payload else None
+
+
+async def stream_eventos(device_uuid, formato):
+    intervalo = getattr(settings, 'PAINEL_EVENTOS_INTERVALO', 2)
+    duracao = getattr(settings, 'PAINEL_EVENTOS_DURACAO', 300)
+
+    # Ao reconectar, o EventSource espera 'retry' ms
+    yield f"retry: {int(intervalo * 1000)}\n\n"
+
+    enviada = None
+    inicio = time.monotonic()
+    ultimo_envio = inicio
+    while True:
+        versao = await _aversao_atual(device_uuid, formato)
+        if versao is None:
+            yield "event: removido\ndata: \n\n"
+            return
+        if versao != enviada:
+            enviada = versao
+            ultimo_envio = time.monotonic()
+            yield f"event: versao\ndata: {versao}\n\n"
+        elif time.monotonic() - ultimo_envio > 15:
+            # Comentário para proxies não derrubarem a conexão ociosa
+            ultimo_envio = time.monotonic()
+            yield ": ping\n\n"
+
+        if time.monotonic() - inicio >= duracao:
+            # Conexões são recicladas; o navegador reconecta sozinho
+            return
+        await asyncio.sleep(intervalo)
+
+
+@instrumentar('eventos')
+def eventos_painel(request, device_uuid):
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    formato = formato_pedido(request)
+    response = StreamingHttpResponse(stream_eventos(device_uuid, formato), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@instrumentar('aguardar')
+def aguardar_mudanca(request, device_uuid):
+    versao = _versao_atual(device_uuid, formato_pedido(request))
+    if versao is None:
+        raise Http404
+    if versao != request.GET.get('versao', ''):
+        response = JsonResponse({"versao": versao})
+    else:
+        response = HttpResponse(status=204)
+        response['Retry-After'] = getattr(settings, 'PAINEL_SHORT_POLL_INTERVALO', 60)
+
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+# --- HEARTBEAT (ver painel/telemetria.py) ---
+@instrumentar('heartbeat')
+@csrf_exempt
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def heartbeat_painel(request, device_uuid):
+    serializer = HeartbeatSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    # Só vai para o cache; o banco é atualizado em lote
+    dados = {**serializer.validated_data, 'endereco_ip': request.META.get('REMOTE_ADDR')}
+    if registrar_heartbeat(device_uuid, dados):
+        enfileirar_gravacao_heartbeats()
+    return Response(status=204)
+
+
+# --- MÉTRICAS (ver painel/metricas.py) ---
+def metricas(request):
+    """
+    Números deste processo no formato do Prometheus. Só para staff ou com o
+    token PAINEL_METRICAS_TOKEN (Authorization: Bearer <token>). O IP não
+    vale como credencial: atrás do proxy toda requisição vem de 127.0.0.1.
+    """
+    token = getattr(settings, 'PAINEL_METRICAS_TOKEN', '')
+    enviado = request.META.get('HTTP_AUTHORIZATION', '').removeprefix('Bearer ')
+    if not request.user.is_staff and not (token and hmac.compare_digest(enviado, token)):
+        return HttpResponse(status=403)
+    return HttpResponse(registro.exportar(), content_type='text/plain; version=0.0.4')
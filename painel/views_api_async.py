@@ -0,0 +1,175 @@
+"""
+Versões assíncronas das views das TVs, usadas quando o Django roda no ASGI
+(core/asgi.py liga PAINEL_API_ASYNC, ver painel/urls.py).
+
+No WSGI cada TV conectada prende um worker enquanto espera; aqui a espera
+(long-poll, SSE, cache) não prende thread nenhuma, então um processo atende
+milhares de TVs. O caminho comum (payload no cache, heartbeat, pareamento)
+usa só o cache e o ORM assíncronos; montar o payload ou o delta continua
+síncrono e vai para uma thread (sync_to_async) só quando falta no cache.
+
+As respostas são as mesmas de views_api: formatos, ETag, compressão e erros.
+"""
+import asyncio
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .cache import aobter_payload
+from .delta import montar_delta
+from .metricas import instrumentar
+from .models import Dispositivo
+from .payload import FORMATO_COLUNAR, FORMATO_COMPACTO
+from .publicacao import publicacao_ativa, url_ponteiro
+from .renderers import PayloadColunarRenderer, PayloadCompactoRenderer
+from .serializers import HeartbeatSerializer
+from .tarefas import enfileirar_gravacao_heartbeats
+from .telemetria import aregistrar_heartbeat
+from .views_api import formato_pedido, responder_payload, stream_eventos
+
+logger = logging.getLogger(__name__)
+
+RENDERERS = [JSONRenderer(), PayloadCompactoRenderer(), PayloadColunarRenderer()]
+
+
+def _negociar(request):
+    """Renderer pelo Accept ou ?format=, com as mesmas regras do @api_view."""
+    renderer, _ = DefaultContentNegotiation().select_renderer(Request(request), RENDERERS)
+    return renderer
+
+
+def _ler_json(request):
+    try:
+        dados = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return dados if isinstance(dados, dict) else None
+
+
+@instrumentar('parear')
+@csrf_exempt
+@require_POST
+async def parear_dispositivo(request):
+    dados = _ler_json(request) or request.POST
+    codigo = str(dados.get('codigo', '')).strip().upper()
+
+    try:
+        dispositivo = await Dispositivo.objects.aget(codigo_acesso=codigo)
+    except Dispositivo.DoesNotExist:
+        logger.warning("Pareamento recusado: código %r não existe", codigo)
+        return JsonResponse({"erro": "Código inválido"}, status=404)
+    logger.info("Pareamento: código %s -> dispositivo %s (%s)", codigo, dispositivo.nome, dispositivo.uuid)
+    return JsonResponse({"uuid": dispositivo.uuid, "nome": dispositivo.nome})
+
+
+@instrumentar('dados')
+@require_GET
+async def dados_painel(request, device_uuid):
+    try:
+        renderer = _negociar(request)
+    except NotAcceptable:
+        return HttpResponse(status=406)
+
+    payload = await aobter_payload(device_uuid, renderer.format)
+    if payload is None:
+        raise Http404
+    return responder_payload(request, payload, renderer.media_type)
+
+
+@instrumentar('delta')
+@require_GET
+async def delta_painel(request, device_uuid):
+    try:
+        renderer = _negociar(request)
+    except NotAcceptable:
+        return HttpResponse(status=406)
+
+    formato = FORMATO_COLUNAR if renderer.format == FORMATO_COLUNAR else FORMATO_COMPACTO
+    resposta = await sync_to_async(montar_delta)(device_uuid, request.GET.get('since'), formato)
+    if resposta is None:
+        raise Http404
+    if publicacao_ativa():
+        resposta['ponteiro'] = url_ponteiro(device_uuid)
+
+    response = HttpResponse(renderer.render(resposta), content_type=renderer.media_type)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+# --- AVISO DE MUDANÇAS (PUSH) ---
+# Mesmo esquema de views_api: SSE, e long-poll para quem não tem EventSource.
+
+@instrumentar('eventos')
+@require_GET
+async def eventos_painel(request, device_uuid):
+    if not isinstance(request, ASGIRequest):
+        # PAINEL_API_ASYNC ligado num servidor WSGI
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(
+        stream_eventos(device_uuid, formato_pedido(request)), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@instrumentar('aguardar')
+@require_GET
+async def aguardar_mudanca(request, device_uuid):
+    formato = formato_pedido(request)
+    versao_cliente = request.GET.get('versao', '')
+    # PAINEL_API_ASYNC ligado num servidor WSGI: a espera prenderia o worker,
+    # então responde na hora, como o short-poll de views_api
+    long_poll = isinstance(request, ASGIRequest)
+    espera = getattr(settings, 'PAINEL_LONG_POLL_ESPERA', 25) if long_poll else 0
+    intervalo = getattr(settings, 'PAINEL_EVENTOS_INTERVALO', 2)
+
+    limite = time.monotonic() + espera
+    while True:
+        payload = await aobter_payload(device_uuid, formato)
+        if payload is None:
+            raise Http404
+        versao = quote_etag(payload.etag)
+        if versao != versao_cliente:
+            response = JsonResponse({"versao": versao})
+            break
+        if time.monotonic() >= limite:
+            response = HttpResponse(status=204)
+            if not long_poll:
+                response['Retry-After'] = getattr(settings, 'PAINEL_SHORT_POLL_INTERVALO', 60)
+            break
+        await asyncio.sleep(intervalo)
+
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+# --- HEARTBEAT (ver painel/telemetria.py) ---
+@instrumentar('heartbeat')
+@csrf_exempt
+@require_POST
+async def heartbeat_painel(request, device_uuid):
+    dados = _ler_json(request)
+    if dados is None:
+        return JsonResponse({"detail": "JSON inválido."}, status=400)
+    serializer = HeartbeatSerializer(data=dados)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    dados = {**serializer.validated_data, 'endereco_ip': request.META.get('REMOTE_ADDR')}
+    if await aregistrar_heartbeat(device_uuid, dados):
+        enfileirar_gravacao_heartbeats()
+    return HttpResponse(status=204)